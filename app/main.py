@@ -3,25 +3,60 @@
 Punto de entrada FastAPI para Monitor360.
 
 - Expone rutas de monitoreo, alarmas y topología.
+- Ejecuta monitoreo y descubrimiento como trabajos en segundo plano (/api/jobs).
+- Empuja alarmas y cambios de topología por SSE (/api/events/stream).
+- Serializa con `FastJSONResponse` y comprime (brotli/gzip) las
+  respuestas grandes.
+- Expone métricas en formato Prometheus (/metrics) y `Server-Timing`
+  por request, con perfilado por muestreo opcional (?profile=1).
+- Arranca sin importar pandas ni crear el cliente de Supabase: eso lo
+  hace un precalentamiento en segundo plano (`lifecycle`).
+- Loguea en JSON por línea desde un hilo de fondo (campos `run_id`,
+  `router_ip`, `duration_ms` para Loki).
 - Habilita CORS para permitir el consumo desde el frontend (Next.js).
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers.alarms import router as alarms_router
+from app.routers.events import router as events_router
+from app.routers.jobs import router as jobs_router
+from app.routers.metrics import router as metrics_router
 
 # Routers ─────────────────────────────────────────────────────────────
 from app.routers.monitoring import router as monitoring_router
 from app.routers.topologia import router as topologia_router
+from app.services import lifecycle
+from app.services.timing import ServerTimingMiddleware
+from app.utils.responses import CompressionMiddleware, FastJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging y precalentamiento en segundo plano; al salir, apagado ordenado
+    lifecycle.start()
+    yield
+    lifecycle.stop()
+
 
 # ──────────────────────────────────────────────────────────────────────
 app = FastAPI(
+    lifespan=lifespan,
     title="Monitor360",
     description="Sistema profesional de monitoreo de red para ISPs",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
+# Compresión por tamaño (no toca SSE ni NDJSON)
+app.add_middleware(CompressionMiddleware)
+
+# Server-Timing por etapa y perfilado opcional (?profile=1)
+app.add_middleware(ServerTimingMiddleware)
+
 # CORS (ajusta allow_origins si quieres restringir a tu dominio)
 app.add_middleware(
     CORSMiddleware,
@@ -42,3 +77,6 @@ def root() -> dict[str, str]:
 app.include_router(monitoring_router, prefix="/api/monitoring", tags=["Monitoreo"])
 app.include_router(alarms_router, prefix="/api/alarms", tags=["Alarmas"])
 app.include_router(topologia_router, prefix="/api", tags=["Topología"])
+app.include_router(events_router, prefix="/api/events", tags=["Eventos"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["Trabajos"])
+app.include_router(metrics_router, tags=["Métricas"])
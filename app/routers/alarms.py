@@ -1,10 +1,19 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, ConfigDict
 
-from app.supabase_client import supabase
+from app.services.alarm_correlator import get_alarm_correlator
+from app.services.alarms_service import (
+    ALARM_FIELDS,
+    ALARMS_MAX_PAGE,
+    SEVERITIES,
+    get_alarm,
+    query_alarms,
+    summarize_alarms,
+)
+from app.utils.responses import versioned_response
 
 router = APIRouter()
 
@@ -17,34 +26,104 @@ class AlarmResponse(BaseModel):
     message: str
     timestamp: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-@router.get("/", response_model=List[AlarmResponse])
-def get_all_alarms():
+class AlarmItem(BaseModel):
+    """Alarma con proyección de columnas: solo trae los campos pedidos."""
+
+    id: Optional[int] = None
+    client_id: Optional[int] = None
+    severity: Optional[str] = None
+    message: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+class AlarmPage(BaseModel):
+    version: Optional[str] = None
+    items: List[AlarmItem]
+    next_cursor: Optional[str]
+
+
+class AlarmSummary(BaseModel):
+    generated_at: datetime
+    last_hour: Dict[str, int]
+    last_day: Dict[str, int]
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = sorted(set(wanted) - set(ALARM_FIELDS))
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {invalid}")
+    return wanted
+
+
+@router.get("/", response_model=AlarmPage, response_model_exclude_unset=True)
+def get_all_alarms(
+    request: Request,
+    limit: int = Query(100, ge=1, le=ALARMS_MAX_PAGE),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página previa"),
+    severity: Optional[List[str]] = Query(None),
+    client_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Columnas separadas por coma"),
+):
+    """
+    Alarmas paginadas por cursor (keyset sobre timestamp,id, más nuevas
+    primero) con filtros de severidad, cliente y rango de tiempo.
+    Incluye `version`/ETag: con `If-None-Match` igual responde 304.
+    """
+    if severity and set(severity) - set(SEVERITIES):
+        raise HTTPException(status_code=400, detail=f"Severidad inválida: {severity}")
     try:
-        response = (
-            supabase.table("alarmas")
-            .select("*")
-            .order("timestamp", desc=True)
-            .execute()
+        page = query_alarms(
+            limit=limit,
+            cursor=cursor,
+            severity=severity,
+            client_id=client_id,
+            since=since,
+            until=until,
+            fields=_parse_fields(fields),
         )
-        if response.error:
-            raise HTTPException(status_code=500, detail=str(response.error))
-        return response.data
+        return versioned_response(request, page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/summary", response_model=AlarmSummary)
+def get_alarm_summary():
+    """Cantidad de alarmas por severidad en la última hora y el último día."""
+    try:
+        return summarize_alarms()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/active", response_model=List[Dict[str, Any]])
+def get_active_alarms():
+    """
+    Alarmas activas en memoria con su contador de ocurrencias, repeticiones
+    suprimidas y alarmas derivadas agrupadas bajo cada causa raíz.
+    """
+    return get_alarm_correlator().snapshot()
+
+
 @router.get("/{alarm_id}", response_model=AlarmResponse)
 def get_alarm_by_id(alarm_id: int):
     try:
-        response = (
-            supabase.table("alarmas").select("*").eq("id", alarm_id).single().execute()
-        )
-        if response.error:
+        alarm = get_alarm(alarm_id)
+        if alarm is None:
             raise HTTPException(status_code=404, detail="Alarma no encontrada")
-        return response.data
+        return alarm
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
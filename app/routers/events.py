@@ -0,0 +1,61 @@
+# File: app/routers/events.py
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.event_bus import get_event_bus
+
+router = APIRouter()
+
+# Cada cuánto se envía un comentario keep-alive si no hay eventos
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+# Espera sugerida al navegador antes de reconectar (ms)
+EVENT_RETRY_MS = int(os.getenv("EVENT_RETRY_MS", "3000"))
+
+
+@router.get("/stream")
+async def event_stream(
+    request: Request,
+    last_event_id: Optional[int] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events con alarmas nuevas (`alarm`, `alarm_resolved`) y
+    diffs de topología (`topology`). Al reconectar, EventSource envía
+    `Last-Event-ID` y se reenvían los eventos perdidos que sigan en el
+    historial; si no alcanzan, llega un evento `resync`.
+    """
+    if last_event_id is None and last_event_id_header:
+        try:
+            last_event_id = int(last_event_id_header)
+        except ValueError:
+            last_event_id = None
+
+    bus = get_event_bus()
+    sub = bus.subscribe(last_event_id)
+
+    async def frames():
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n\n"
+            while not await request.is_disconnected():
+                pending = await sub.wait(EVENT_KEEPALIVE_SECONDS)
+                if pending:
+                    yield "".join(pending)
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def event_stats():
+    """Conexiones abiertas y eventos publicados."""
+    return get_event_bus().stats()
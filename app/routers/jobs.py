@@ -0,0 +1,80 @@
+# File: app/routers/jobs.py
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from app.routers.monitoring import RunRequest, TopologyRequest
+from app.services.jobs import Job, JobQueueFull, get_job_manager
+from app.services.monitoring_service import monitor_and_store
+from app.services.topology_enricher import get_enriched_topology
+from app.services.trunk_service import get_trunk_topology
+
+router = APIRouter()
+
+
+def _submit(job_type: str, fn, *args) -> Dict[str, Any]:
+    try:
+        job = get_job_manager().submit(job_type, fn, *args)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Cola de trabajos llena: {e}")
+    return {**job.to_dict(include_result=False), "url": f"/api/jobs/{job.id}"}
+
+
+def _get(job_id: str) -> Job:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+
+# ──────────────────────────────────────────────
+# Envío (responden 202 con el id del trabajo)
+# ──────────────────────────────────────────────
+
+
+@router.post("/run", status_code=202, response_model=Dict[str, Any])
+def submit_run(request: RunRequest):
+    """Test de capacidad en segundo plano (equivale a /api/monitoring/run)."""
+    return _submit("run", monitor_and_store, request.router_ips, request.client_ips)
+
+
+@router.post("/topology", status_code=202, response_model=Dict[str, Any])
+def submit_topology(request: TopologyRequest):
+    """Topología enriquecida en segundo plano (equivale a /api/monitoring/topology)."""
+    return _submit("topology", get_enriched_topology, request.ip_list)
+
+
+@router.post("/trunk", status_code=202, response_model=Dict[str, Any])
+def submit_trunk(request: TopologyRequest):
+    """Topología troncal en segundo plano (equivale a /api/monitoring/trunk)."""
+    return _submit("trunk", get_trunk_topology, request.ip_list)
+
+
+# ──────────────────────────────────────────────
+# Consulta y cancelación
+# ──────────────────────────────────────────────
+
+
+@router.get("/", response_model=List[Dict[str, Any]])
+def list_jobs(type: Optional[str] = None):
+    """Trabajos retenidos (sin resultados), más recientes primero."""
+    jobs = sorted(get_job_manager().list(type), key=lambda j: -j.created_at)
+    return [j.to_dict(include_result=False) for j in jobs]
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+def job_stats():
+    return get_job_manager().stats()
+
+
+@router.get("/{job_id}", response_model=Dict[str, Any])
+def get_job(job_id: str):
+    """Estado, progreso, resultados parciales y resultado final del trabajo."""
+    return _get(job_id).to_dict()
+
+
+@router.delete("/{job_id}", response_model=Dict[str, Any])
+def cancel_job(job_id: str):
+    """Cancela el trabajo (en cola: no corre; en curso: se corta en el próximo paso)."""
+    _get(job_id)
+    return get_job_manager().cancel(job_id).to_dict(include_result=False)
@@ -0,0 +1,26 @@
+# File: app/routers/metrics.py
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import render
+from app.services.timing import get_profile
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/api/profiles/{profile_id}", response_class=PlainTextResponse)
+def request_profile(profile_id: str):
+    """
+    Perfil por muestreo de un request pedido con `?profile=1` (ver cabecera
+    `X-Profile`), en formato "folded" para flamegraph.pl o speedscope.
+    """
+    folded = get_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return PlainTextResponse(folded)
@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 # File: app/routers/monitoring.py
 
+import json
 import logging
 import traceback
 from typing import Any, Dict, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.services.mikrotik_service import scan_mikrotiks
 from app.services.monitoring_service import monitor_and_store
-from app.services.topology_enricher import get_enriched_topology
-from app.services.trunk_service import get_trunk_topology
+from app.services.topology_enricher import (
+    get_enriched_topology,
+    get_topology_snapshot,
+    iter_enriched_topology,
+)
+from app.services.trunk_service import get_trunk_snapshot, get_trunk_topology
 from app.services.uisp_service import get_uisp_devices
+from app.utils.responses import FastJSONResponse, versioned_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -55,7 +62,7 @@ def get_full_status(request: StatusRequest):
     try:
         mikrotik_status = scan_mikrotiks(request.ip_list)
         uisp_devices = get_uisp_devices()
-        return {"mikrotik": mikrotik_status, "uisp": uisp_devices}
+        return FastJSONResponse({"mikrotik": mikrotik_status, "uisp": uisp_devices})
     except Exception as e:
         logger.error("Error en /status", exc_info=e)
         raise HTTPException(status_code=500, detail=f"Error en status: {e}")
@@ -77,9 +84,10 @@ def run_monitor(request: RunRequest):
 def enriched_topology(request: TopologyRequest):
     """
     Genera la topología enriquecida (routers, switches, APs y clientes asociados).
+    La última queda disponible con ETag en GET /topology/snapshot.
     """
     try:
-        return get_enriched_topology(request.ip_list)
+        return FastJSONResponse(get_enriched_topology(request.ip_list))
     except Exception:
         # 📌 Capturamos y logueamos el traceback completo
         tb = traceback.format_exc()
@@ -88,15 +96,72 @@ def enriched_topology(request: TopologyRequest):
         raise HTTPException(status_code=500, detail=tb)
 
 
+@router.get("/topology/snapshot", response_model=Dict[str, Any], tags=["Topología"])
+def topology_snapshot(http_request: Request):
+    """
+    Última topología enriquecida generada, sin volver a descubrir. Pensado
+    para sondeo: con `If-None-Match` igual a la versión vigente responde 304.
+    """
+    snapshot = get_topology_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Aún no hay topología generada")
+    return versioned_response(http_request, snapshot)
+
+
+@router.post("/topology/stream", tags=["Topología"])
+def enriched_topology_stream(request: TopologyRequest):
+    """
+    Igual que /topology pero en NDJSON: un registro por línea con nodos y
+    aristas a medida que se recorre cada router, luego los parches de
+    asociación de clientes y un registro final `done`.
+    """
+
+    def lines():
+        try:
+            for record in iter_enriched_topology(request.ip_list):
+                yield json.dumps(record, default=str) + "\n"
+        except Exception as e:
+            logger.error("Fallo en /topology/stream", exc_info=e)
+            yield json.dumps({"kind": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/trunk", response_model=Dict[str, Any], tags=["Topología Troncal"])
 def trunk_topology(request: TopologyRequest):
     """
     Devuelve subgrafo de la red centrado en routers troncal y sus enlaces WAN.
+    El último queda disponible con ETag en GET /trunk/snapshot.
     """
     try:
-        return get_trunk_topology(request.ip_list)
+        return FastJSONResponse(get_trunk_topology(request.ip_list))
     except Exception as e:
         logger.error("Error en /trunk", exc_info=e)
         raise HTTPException(
             status_code=500, detail=f"Error generando topología troncal: {e}"
         )
+
+
+@router.get(
+    "/trunk/snapshot", response_model=Dict[str, Any], tags=["Topología Troncal"]
+)
+def trunk_snapshot(http_request: Request):
+    """
+    Último subgrafo troncal generado en este proceso, sin consultar routers.
+    Con `If-None-Match` igual a la versión vigente responde 304.
+    """
+    snapshot = get_trunk_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Aún no hay topología troncal")
+    return versioned_response(http_request, snapshot)
+
+
+@router.get("/associations", response_model=Dict[str, Any], tags=["Topología"])
+def association_table():
+    """
+    Devuelve la última tabla de asociaciones cliente ↔ UISP desde cache,
+    sin volver a descubrir ni asociar.
+    """
+    from app.services.association_cache import get_association_table
+
+    return FastJSONResponse(get_association_table())
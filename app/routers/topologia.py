@@ -1,15 +1,17 @@
 # File: app/routers/topologia.py
 from typing import List
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 
 from app.services.topology_enricher import get_enriched_topology
+from app.utils.responses import versioned_response
 
 router = APIRouter()
 
 
 @router.get("/topologia/full")
 def obtener_topologia(
+    request: Request,
     seed_ips: List[str] = Query(["10.0.0.1", "10.0.0.2"]),
     clients_csv: str = "clientes.csv",
 ):
@@ -17,4 +19,4 @@ def obtener_topologia(
     Devuelve la topología completa y enriquecida desde MikroTik, UISP y CSV
     """
     topologia = get_enriched_topology(seed_ips, clients_csv)
-    return topologia
+    return versioned_response(request, topologia)
@@ -0,0 +1,235 @@
+# File: app/services/alarm_correlator.py
+"""
+Correlación de alarmas antes de escribirlas.
+
+- Clave de alarma: (source, metric, target). Si no se indica, se usa el
+  texto del mensaje como target.
+- Supresión: una alarma repetida dentro de `ALARM_SUPPRESS_SECONDS` no se
+  vuelve a escribir; se incrementa su contador de ocurrencias, que se
+  informa en la siguiente emisión.
+- Causa raíz: con la topología (router → AP → cliente), si un ancestro del
+  target tiene una alarma crítica activa, la alarma del descendiente se
+  agrupa bajo esa causa raíz en lugar de escribirse.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+ALARM_SUPPRESS_SECONDS = float(os.getenv("ALARM_SUPPRESS_SECONDS", "900"))
+
+EMIT = "emit"
+SUPPRESS = "suppress"
+FOLD = "fold"
+
+AlarmKey = Tuple[str, str, str]
+
+
+@dataclass
+class AlarmState:
+    """Estado en memoria de una alarma activa."""
+
+    key: AlarmKey
+    severity: str
+    message: str
+    first_seen: float
+    last_seen: float
+    last_emitted: float
+    occurrences: int = 1
+    suppressed: int = 0
+    folded: Dict[AlarmKey, int] = field(default_factory=dict)
+    root: Optional[AlarmKey] = None
+
+
+@dataclass
+class Decision:
+    """Qué hacer con una alarma entrante y con qué mensaje escribirla."""
+
+    action: str
+    message: str
+    root: Optional[AlarmKey] = None
+
+
+class AlarmCorrelator:
+    """Deduplica alarmas y las agrupa por causa raíz según la topología."""
+
+    def __init__(
+        self,
+        window: float = ALARM_SUPPRESS_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._states: Dict[AlarmKey, AlarmState] = {}
+        self._parents: Dict[str, Set[str]] = {}
+        self._calls = 0
+        self.stats = {EMIT: 0, SUPPRESS: 0, FOLD: 0}
+
+    # ── Topología ────────────────────────────────────────────────
+    def set_topology(
+        self, edges: Iterable[Tuple[str, str]], keep_parents: Iterable[str] = ()
+    ):
+        """
+        Reemplaza el grafo padre → hijo (p. ej. aristas de discover_topology).
+
+        Se conservan las aristas previas cuyo padre está en `keep_parents`
+        (routers inalcanzables en esta corrida, de los que no hay datos nuevos).
+        """
+        keep = set(keep_parents)
+        parents: Dict[str, Set[str]] = {}
+        for parent, child in edges:
+            if parent and child and parent != child:
+                parents.setdefault(child, set()).add(parent)
+        with self._lock:
+            for child, old in self._parents.items():
+                for parent in old & keep:
+                    parents.setdefault(child, set()).add(parent)
+            self._parents = parents
+
+    def add_edges(self, edges: Iterable[Tuple[str, str]]):
+        with self._lock:
+            for parent, child in edges:
+                if parent and child and parent != child:
+                    self._parents.setdefault(child, set()).add(parent)
+
+    def _ancestors(self, target: str) -> List[str]:
+        """Ancestros en orden BFS (más cercano primero), sin ciclos."""
+        seen, order = {target}, []
+        pending = deque(sorted(self._parents.get(target, ())))
+        while pending:
+            node = pending.popleft()
+            if node in seen:
+                continue
+            seen.add(node)
+            order.append(node)
+            pending.extend(sorted(self._parents.get(node, ())))
+        return order
+
+    def _active(self, state: AlarmState, now: float) -> bool:
+        return now - state.last_seen <= self.window
+
+    def _root_cause(self, target: str, now: float) -> Optional[AlarmState]:
+        ancestors = self._ancestors(target)
+        if not ancestors:
+            return None
+        by_target: Dict[str, AlarmState] = {}
+        for state in self._states.values():
+            if state.severity == "critical" and self._active(state, now):
+                by_target.setdefault(state.key[2], state)
+        for node in ancestors:
+            if node in by_target:
+                return by_target[node]
+        return None
+
+    # ── Entrada de alarmas ───────────────────────────────────────
+    def process(
+        self,
+        severity: str,
+        message: str,
+        source: Optional[str] = None,
+        metric: Optional[str] = None,
+        target: Optional[str] = None,
+    ) -> Decision:
+        key: AlarmKey = (source or "", metric or "", target or message)
+        now = self.clock()
+        with self._lock:
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                self._prune(now)
+
+            state = self._states.get(key)
+            if state is not None and self._active(state, now):
+                state.last_seen = now
+                state.occurrences += 1
+                state.severity, state.message = severity, message
+                root = self._states.get(state.root) if state.root else None
+                root_gone = state.root is not None and (
+                    root is None or not self._active(root, now)
+                )
+                if now - state.last_emitted < self.window and not root_gone:
+                    state.suppressed += 1
+                    self.stats[SUPPRESS] += 1
+                    return Decision(SUPPRESS, message, state.root)
+            elif state is None or not self._active(state, now):
+                state = AlarmState(key, severity, message, now, now, 0.0)
+                self._states[key] = state
+
+            # Causa raíz: un ancestro con alarma crítica activa
+            if target:
+                root = self._root_cause(target, now)
+                if root is not None and root.key != key:
+                    root.folded[key] = root.folded.get(key, 0) + 1
+                    state.root = root.key
+                    state.last_emitted = now
+                    self.stats[FOLD] += 1
+                    return Decision(FOLD, message, root.key)
+
+            state.root = None
+            text = message
+            notes = []
+            if state.suppressed:
+                notes.append(f"repetida {state.suppressed} veces")
+            if state.folded:
+                notes.append(
+                    f"{sum(state.folded.values())} alarmas derivadas agrupadas"
+                )
+            if notes:
+                text = f"{message} ({', '.join(notes)})"
+            state.suppressed = 0
+            state.folded = {}
+            state.last_emitted = now
+            self.stats[EMIT] += 1
+            return Decision(EMIT, text)
+
+    def clear(self, source: str, metric: str, target: str):
+        """
+        Marca una alarma como resuelta (p. ej. el router volvió a responder).
+        Devuelve True si estaba activa.
+        """
+        with self._lock:
+            return (
+                self._states.pop((source or "", metric or "", target), None) is not None
+            )
+
+    def _prune(self, now: float):
+        expired = [
+            k for k, s in self._states.items() if now - s.last_seen > 2 * self.window
+        ]
+        for k in expired:
+            del self._states[k]
+
+    def snapshot(self) -> List[Dict]:
+        """Alarmas activas con contadores (para la API)."""
+        now = self.clock()
+        with self._lock:
+            return [
+                {
+                    "source": s.key[0],
+                    "metric": s.key[1],
+                    "target": s.key[2],
+                    "severity": s.severity,
+                    "message": s.message,
+                    "occurrences": s.occurrences,
+                    "suppressed": s.suppressed,
+                    "folded": sum(s.folded.values()),
+                    "root_cause": list(s.root) if s.root else None,
+                    "first_seen": s.first_seen,
+                    "last_seen": s.last_seen,
+                }
+                for s in self._states.values()
+                if self._active(s, now)
+            ]
+
+
+_correlator = AlarmCorrelator()
+
+
+def get_alarm_correlator() -> AlarmCorrelator:
+    return _correlator
+
+
+__all__ = ["AlarmCorrelator", "Decision", "get_alarm_correlator", "EMIT", "FOLD"]
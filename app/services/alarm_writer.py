@@ -0,0 +1,336 @@
+# File: app/services/alarm_writer.py
+"""
+Escritura no bloqueante de alarmas.
+
+Las alarmas se encolan en memoria (cola acotada) y un hilo de fondo las
+inserta en lotes multi-fila cada `ALARM_FLUSH_MS` ms o cada
+`ALARM_BATCH_SIZE` alarmas, lo que ocurra primero.
+
+- Si la inserción falla (p. ej. Supabase inaccesible) el lote se guarda en
+  un spool en disco (JSON Lines) y se reintenta antes del siguiente lote.
+- Si la cola se llena se aplica la política `ALARM_BACKPRESSURE`:
+  `spool` (a disco, por defecto), `block`, `drop_new` o `drop_oldest`.
+- `close()` vacía la cola al apagar el proceso (registrado con atexit).
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.services.metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+ALARM_QUEUE_SIZE = int(os.getenv("ALARM_QUEUE_SIZE", "10000"))
+ALARM_BATCH_SIZE = int(os.getenv("ALARM_BATCH_SIZE", "200"))
+ALARM_FLUSH_MS = int(os.getenv("ALARM_FLUSH_MS", "500"))
+ALARM_BACKPRESSURE = os.getenv("ALARM_BACKPRESSURE", "spool")
+ALARM_SPOOL_PATH = os.getenv("ALARM_SPOOL_PATH", "alarmas_spool.jsonl")
+# Espera máxima con la política `block` antes de caer al spool
+ALARM_BLOCK_TIMEOUT = float(os.getenv("ALARM_BLOCK_TIMEOUT", "2"))
+# Pausa entre reintentos del spool mientras el almacenamiento no responde
+ALARM_RETRY_SECONDS = float(os.getenv("ALARM_RETRY_SECONDS", "5"))
+
+BACKPRESSURE_POLICIES = ("spool", "block", "drop_new", "drop_oldest")
+
+_STOP = object()
+
+
+def _insert_alarms(rows: List[Dict]):
+    """Inserción multi-fila en la tabla `alarmas` del almacenamiento global."""
+    from app.services.storage import get_storage
+
+    get_storage().insert_alarms(rows)
+
+
+class AlarmWriter:
+    """Sumidero de alarmas con cola acotada, lotes y spool en disco."""
+
+    def __init__(
+        self,
+        insert_fn: Callable[[List[Dict]], None] = _insert_alarms,
+        max_queue: int = ALARM_QUEUE_SIZE,
+        batch_size: int = ALARM_BATCH_SIZE,
+        flush_ms: int = ALARM_FLUSH_MS,
+        backpressure: str = ALARM_BACKPRESSURE,
+        spool_path: Optional[str] = ALARM_SPOOL_PATH,
+        retry_seconds: float = ALARM_RETRY_SECONDS,
+    ):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Política de backpressure inválida: {backpressure}")
+        self.insert_fn = insert_fn
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(flush_ms, 1) / 1000
+        self.backpressure = backpressure
+        self.spool_path = spool_path
+        self.retry_seconds = retry_seconds
+        self._next_retry = 0.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "batches": 0,
+            "failures": 0,
+            "spooled": 0,
+            "dropped": 0,
+            "corrupt": 0,
+        }
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # ── Productores ──────────────────────────────────────────────
+    def submit(self, row: Dict) -> bool:
+        """Encola una alarma sin bloquear (salvo política `block`)."""
+        if self._closed:
+            self._spool([row])
+            return False
+        self._ensure_worker()
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            return self._on_full(row)
+
+    def _on_full(self, row: Dict) -> bool:
+        if self.backpressure == "block":
+            try:
+                self._queue.put(row, timeout=ALARM_BLOCK_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        elif self.backpressure == "drop_new":
+            self._count("dropped")
+            logger.warning("Cola de alarmas llena: alarma descartada")
+            return False
+        elif self.backpressure == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._count("dropped")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(row)
+                return True
+            except queue.Full:
+                pass
+        # `spool` (o `block` que agotó la espera): directo a disco
+        self._spool([row])
+        return False
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    # ── Consumidor ───────────────────────────────────────────────
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="alarm-writer", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                try:
+                    self._replay_spool()
+                except Exception as e:
+                    # El hilo no puede morir: las alarmas siguientes se perderían
+                    logger.error(f"Error al reenviar el spool de alarmas: {e}")
+                continue
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._count("dropped", len(batch))
+                logger.error(f"No se pudieron guardar {len(batch)} alarmas: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict]):
+        # Primero lo pendiente en disco, para conservar el orden
+        if not self._replay_spool():
+            self._spool(batch)
+            return
+        try:
+            self.insert_fn(batch)
+            self._count("written", len(batch))
+            self._count("batches")
+        except Exception as e:
+            self._count("failures")
+            self._next_retry = time.monotonic() + self.retry_seconds
+            logger.error(f"Error al guardar {len(batch)} alarmas, van al spool: {e}")
+            self._spool(batch)
+
+    # ── Spool en disco ───────────────────────────────────────────
+    def _spool(self, rows: List[Dict]):
+        if not self.spool_path:
+            self._count("dropped", len(rows))
+            return
+        with self._spool_lock:
+            with open(self.spool_path, "a+", encoding="utf-8") as f:
+                # Una línea cortada por un crash no se pega a la siguiente
+                if f.tell() and not self._ends_with_newline():
+                    f.write("\n")
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self._count("spooled", len(rows))
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.spool_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _decode_spool(self, data: bytes) -> List[Dict]:
+        """Filas del spool; las líneas corruptas o cortadas se descartan."""
+        rows = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                self._count("corrupt")
+                logger.warning("Spool de alarmas: línea corrupta descartada")
+        return rows
+
+    def spool_size(self) -> int:
+        try:
+            return os.path.getsize(self.spool_path) if self.spool_path else 0
+        except OSError:
+            return 0
+
+    def _replay_spool(self) -> bool:
+        """Reenvía el spool en lotes. Devuelve False si quedó pendiente."""
+        if not self.spool_size():
+            return True
+        if time.monotonic() < self._next_retry:
+            return False
+        # El lock solo cubre el acceso al archivo: `insert_fn` (red) corre
+        # sin él, así un productor que cae al spool no espera a Supabase
+        with self._spool_lock:
+            with open(self.spool_path, "rb") as f:
+                data = f.read()
+        rows = self._decode_spool(data)
+        sent = 0
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start : start + self.batch_size]
+                self.insert_fn(chunk)
+                sent += len(chunk)
+                self._count("written", len(chunk))
+                self._count("batches")
+        except Exception as e:
+            self._count("failures")
+            self._next_retry = time.monotonic() + self.retry_seconds
+            logger.warning(f"Spool de alarmas pendiente ({len(rows) - sent}): {e}")
+        with self._spool_lock:
+            # Lo agregado mientras se enviaba va después de lo no enviado
+            with open(self.spool_path, "rb") as f:
+                f.seek(len(data))
+                tail = f.read()
+            tmp = f"{self.spool_path}.tmp"
+            with open(tmp, "wb") as f:
+                for row in rows[sent:]:
+                    f.write(json.dumps(row, ensure_ascii=False).encode() + b"\n")
+                if data and not data.endswith(b"\n") and tail:
+                    tail = tail.lstrip(b"\n")
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.spool_path)
+        if sent:
+            logger.info(f"Spool de alarmas: {sent} reenviadas")
+        return sent == len(rows) and not tail
+
+    # ── Apagado ──────────────────────────────────────────────────
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que la cola quede vacía (True si lo logró a tiempo)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Vacía la cola y detiene el hilo; lo pendiente queda en el spool."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._worker is not None and self._worker.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._worker.join(timeout)
+        # Lo que no alcanzó a escribirse se conserva en disco
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._spool(leftovers)
+
+
+_writer: Optional[AlarmWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_alarm_writer() -> AlarmWriter:
+    """Writer global del proceso (se crea al primer uso)."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AlarmWriter()
+                atexit.register(_writer.close)
+                QUEUE_DEPTH.set_function(_writer.depth, queue="alarms")
+                QUEUE_DEPTH.set_function(_writer.spool_size, queue="alarms_spool")
+    return _writer
+
+
+__all__ = ["AlarmWriter", "get_alarm_writer"]
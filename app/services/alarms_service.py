@@ -1,34 +1,161 @@
+import base64
+import json
 import logging
-from datetime import datetime, timezone
-from typing import Optional
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Sequence, Tuple
 
-from app.supabase_client import supabase
+from app.services.alarm_correlator import EMIT, FOLD, get_alarm_correlator
+from app.services.alarm_writer import get_alarm_writer
+from app.services.event_bus import EVENT_ALARM, EVENT_ALARM_RESOLVED, get_event_bus
+from app.services.storage import get_storage
 
 logger = logging.getLogger(__name__)
 
+SEVERITIES = ("critical", "warning", "info")
+ALARM_FIELDS = ("id", "client_id", "severity", "message", "timestamp")
+# Tamaño máximo de página en las consultas paginadas
+ALARMS_MAX_PAGE = int(os.getenv("ALARMS_MAX_PAGE", "1000"))
 
-def raise_alarm(severity: str, message: str, client_id: Optional[int] = None):
+
+def raise_alarm(
+    severity: str,
+    message: str,
+    client_id: Optional[int] = None,
+    *,
+    source: Optional[str] = None,
+    metric: Optional[str] = None,
+    target: Optional[str] = None,
+):
     """
-    Registra una alarma en la tabla 'alarmas' de Supabase y escribe en los logs.
+    Registra una alarma en la tabla 'alarmas' y escribe en los logs.
+
+    No bloquea: la alarma se encola y `AlarmWriter` la inserta en lote en
+    segundo plano (con spool en disco si el almacenamiento no responde).
+
+    Antes pasa por `AlarmCorrelator`: las repeticiones de la misma
+    (source, metric, target) dentro de la ventana de supresión y las
+    alarmas de equipos detrás de una causa raíz activa no se escriben.
     """
     try:
         severity = severity.lower()
-        if severity not in ("critical", "warning", "info"):
+        if severity not in SEVERITIES:
             raise ValueError(f"Severidad inválida: {severity}")
 
+        decision = get_alarm_correlator().process(
+            severity, message, source=source, metric=metric, target=target
+        )
+        if decision.action != EMIT:
+            if decision.action == FOLD:
+                logger.info(f"Alarma agrupada bajo {decision.root}: {message}")
+            else:
+                logger.debug(f"Alarma repetida suprimida: {message}")
+            return
+
         data = {
             "client_id": client_id if client_id is not None else None,
             "severity": severity,
-            "message": message,
+            "message": decision.message,
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
 
-        response = supabase.table("alarmas").insert(data).execute()
-
-        if response.get("status_code") not in [200, 201]:
-            logger.warning(f"No se pudo guardar alarma en Supabase: {response}")
-        else:
-            logger.warning(f"🚨 [{severity.upper()}] {message}")
+        get_alarm_writer().submit(data)
+        get_event_bus().publish(
+            EVENT_ALARM, {**data, "source": source, "metric": metric, "target": target}
+        )
+        logger.warning(f"🚨 [{severity.upper()}] {decision.message}")
 
     except Exception as e:
-        logger.error(f"Error al guardar alarma en Supabase: {e}")
+        logger.error(f"Error al registrar alarma: {e}")
+
+
+def resolve_alarm(source: str, metric: str, target: str):
+    """Da por resuelta una alarma (deja de agrupar a sus descendientes)."""
+    if get_alarm_correlator().clear(source, metric, target):
+        get_event_bus().publish(
+            EVENT_ALARM_RESOLVED, {"source": source, "metric": metric, "target": target}
+        )
+
+
+# ──────────────────────────────────────────────
+# Consultas (paginación keyset sobre timestamp,id)
+# ──────────────────────────────────────────────
+
+
+def encode_cursor(timestamp: str, alarm_id: int) -> str:
+    """(timestamp, id) de la última fila → cursor opaco para la página siguiente."""
+    raw = json.dumps([timestamp, alarm_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, alarm_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(timestamp), int(alarm_id)
+    except Exception:
+        raise ValueError("Cursor inválido") from None
+
+
+def query_alarms(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    severity: Optional[Sequence[str]] = None,
+    client_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict:
+    """
+    Página de alarmas ordenada por (timestamp, id) descendente.
+
+    Devuelve {"items": [...], "next_cursor": str | None}. `fields` limita
+    las columnas devueltas (id y timestamp se piden siempre para el cursor).
+    """
+    limit = max(1, min(limit, ALARMS_MAX_PAGE))
+    wanted = list(fields or ALARM_FIELDS)
+    columns = list(dict.fromkeys(wanted + ["id", "timestamp"]))
+
+    rows = get_storage().query_alarms(
+        columns,
+        limit + 1,
+        before=decode_cursor(cursor) if cursor else None,
+        severity=severity,
+        client_id=client_id,
+        since=since,
+        until=until,
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    items = [{k: row.get(k) for k in wanted} for row in rows]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def get_alarm(alarm_id: int) -> Optional[Dict]:
+    return get_storage().get_alarm(alarm_id, ALARM_FIELDS)
+
+
+def count_alarms(
+    severity: Optional[Sequence[str]] = None,
+    client_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> int:
+    """Cantidad de alarmas que cumplen los filtros (sin traer filas)."""
+    return get_storage().count_alarms(severity, client_id, since, until)
+
+
+def summarize_alarms(now: Optional[datetime] = None) -> Dict:
+    """Alarmas por severidad en la última hora y el último día."""
+    now = now or datetime.now(timezone.utc)
+    windows = {"last_hour": timedelta(hours=1), "last_day": timedelta(days=1)}
+    return {
+        "generated_at": now.isoformat(),
+        **{
+            name: {sev: count_alarms([sev], since=now - delta) for sev in SEVERITIES}
+            for name, delta in windows.items()
+        },
+    }
@@ -4,14 +4,15 @@ from typing import Dict, List
 
 import pandas as pd
 
+from app.services.association_engine import TIER_IP, associate_frame, build_device_frame
+from app.utils.clientes_loader import client_csv_loader
+
 
 def load_clients_csv(file_path: str = "Lista de Usuarios.csv") -> pd.DataFrame:
     """
     Carga y normaliza el CSV exportado desde MikroWisp.
     """
-    df = pd.read_csv(file_path)
-    df.columns = df.columns.str.lower().str.strip()  # Normaliza nombres de columnas
-    return df
+    return client_csv_loader.load(file_path)
 
 
 def associate_clients_to_devices(
@@ -22,40 +23,35 @@ def associate_clients_to_devices(
     Primero intenta por IP exacta (ip_address), luego por coincidencia de nombre.
     Retorna una lista de asociaciones con datos útiles.
     """
-    asociaciones = []
-
-    # Preprocesar dispositivos UISP: mapa de ipAddress a device
-    ip_map = {dev.get("ipAddress"): dev for dev in uisp_devices if dev.get("ipAddress")}
-
-    for _, row in client_df.iterrows():
-        client_ip = str(row.get("ip", "") or "").strip()
-        client_name = str(row.get("nombre", "") or "").strip()
-        matched = None
-
-        # 1. Intentar asociación por IP exacta
-        if client_ip and client_ip in ip_map:
-            matched = ip_map[client_ip]
-        else:
-            # 2. Intentar asociación por nombre substring
-            for device in uisp_devices:
-                identification = device.get("identification") or {}
-                dev_name = str(identification.get("name") or "").strip()
-                if client_name and client_name.lower() in dev_name.lower():
-                    matched = device
-                    break
-
-        if matched:
-            identification = matched.get("identification") or {}
-            asociaciones.append(
-                {
-                    "cliente_id": row.get("cliente_id"),
-                    "nombre": client_name,
-                    "plan": row.get("plan", ""),
-                    "ip": client_ip,
-                    "dispositivo_id": identification.get("id", ""),
-                    "mac": identification.get("mac", ""),
-                    "hostname": identification.get("hostname", ""),
-                }
-            )
+    devices = build_device_frame(uisp_devices)
+
+    # 1. Asociación por IP exacta (join vectorizado)
+    frame = associate_frame(
+        client_df, uisp_devices, tiers=(TIER_IP,), device_frame=devices
+    )
+
+    # 2. Residuo: nombre del cliente contenido en el nombre del dispositivo
+    dev_names = [str(n or "").strip().lower() for n in devices["uisp_name"]]
+    pending = ~frame["matched"] & (frame["cliente_nombre"] != "")
+    for row, name in frame.loc[pending, "cliente_nombre"].items():
+        needle = name.lower()
+        pos = next((i for i, dev in enumerate(dev_names) if needle in dev), None)
+        if pos is not None:
+            frame.at[row, "uisp_pos"] = pos
+            frame.at[row, "matched"] = True
 
+    asociaciones = []
+    for row in frame[frame["matched"]].itertuples(index=False):
+        identification = uisp_devices[row.uisp_pos].get("identification") or {}
+        asociaciones.append(
+            {
+                "cliente_id": row.cliente_id,
+                "nombre": row.cliente_nombre,
+                "plan": row.plan,
+                "ip": row.ip,
+                "dispositivo_id": identification.get("id", ""),
+                "mac": identification.get("mac", ""),
+                "hostname": identification.get("hostname", ""),
+            }
+        )
     return asociaciones
@@ -0,0 +1,306 @@
+# File: app/services/association_cache.py
+"""
+Asociación incremental cliente ↔ dispositivo UISP.
+
+Persiste el resultado de la última asociación junto con huellas (hash de
+contenido) por fila de cliente y por dispositivo. En la siguiente corrida
+solo se vuelven a asociar los clientes que:
+
+- son nuevos o cambiaron su fila en el CSV;
+- estaban asociados a un dispositivo que cambió o desapareció;
+- no tenían match exacto (sin match, subred o fuzzy) y el inventario UISP
+  cambió, o el dispositivo nuevo/cambiado comparte su IP, MAC o nombre.
+
+El resto se reutiliza tal cual. `get_association_table()` devuelve la tabla
+vigente desde memoria (o desde disco tras un reinicio) sin recalcular nada.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from app.services.association_engine import (
+    CLIENT_COLUMNS,
+    DEVICE_COLUMNS,
+    RESULT_COLUMNS,
+    TIER_IP,
+    TIER_MAC,
+    TIER_NAME,
+    associate_frame,
+    build_device_frame,
+    normalize_client_frame,
+)
+from app.services.metrics import CACHE_REQUESTS
+from app.services.subnet_index import SUBNET_PREFIX
+from app.services.timing import span
+
+logger = logging.getLogger(__name__)
+
+ASSOCIATION_CACHE_PATH = os.getenv("ASSOCIATION_CACHE_PATH", "association_cache.json")
+CACHE_VERSION = 1
+
+# Métodos cuyo resultado no depende del resto del inventario
+EXACT_METHODS = {TIER_IP, TIER_MAC, TIER_NAME}
+# Columnas persistidas por cliente (uisp_pos se recalcula en cada corrida)
+STORED_COLUMNS = [c for c in RESULT_COLUMNS if c != "uisp_pos"]
+
+
+def _fingerprints(frame: pd.DataFrame) -> List[str]:
+    """Hash de contenido por fila (estable entre procesos)."""
+    if frame.empty:
+        return []
+    hashed = pd.util.hash_pandas_object(frame.astype(str), index=False)
+    return [f"{h:016x}" for h in hashed]
+
+
+def _client_keys(clients: pd.DataFrame) -> List[str]:
+    """Clave estable por cliente: su Id de MikroWisp (o la fila si no tiene)."""
+    keys, seen = [], {}
+    for row, cid in zip(clients.index, clients["cliente_id"]):
+        base = f"id:{cid}" if cid else f"row:{row}"
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        keys.append(base if n == 0 else f"{base}#{n}")
+    return keys
+
+
+def _device_keys(devices: pd.DataFrame) -> List[str]:
+    return [
+        f"dev:{dev_id}" if dev_id is not None else f"pos:{pos}"
+        for pos, dev_id in zip(devices.index, devices["dispositivo_id"])
+    ]
+
+
+def _native(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+class AssociationCache:
+    """Resultado de asociación persistido en JSON con huellas por fila."""
+
+    def __init__(self, path: str = ASSOCIATION_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._params: Optional[Dict] = None
+        self._devices: Dict[str, str] = {}
+        self._clients: Dict[str, Dict] = {}
+        self._order: List[str] = []
+        self.updated_at: Optional[str] = None
+        self.last_run: Dict = {}
+
+    # ── Persistencia ─────────────────────────────────────────────
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"No se pudo leer cache de asociaciones {self.path}: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        self._params = data.get("params")
+        self._devices = data.get("devices", {})
+        self._clients = {c["key"]: c for c in data.get("clients", [])}
+        self._order = [c["key"] for c in data.get("clients", [])]
+        self.updated_at = data.get("updated_at")
+
+    def _save(self):
+        payload = {
+            "version": CACHE_VERSION,
+            "updated_at": self.updated_at,
+            "params": self._params,
+            "devices": self._devices,
+            "clients": [self._clients[k] for k in self._order],
+        }
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar cache de asociaciones: {e}")
+
+    # ── Asociación incremental ───────────────────────────────────
+    def associate(
+        self,
+        client_df: pd.DataFrame,
+        devices: Sequence,
+        fuzzy_threshold: float = 0.8,
+        subnet_prefix: int = SUBNET_PREFIX,
+    ) -> pd.DataFrame:
+        """Igual que `associate_frame`, reutilizando lo que no cambió."""
+        with self._lock:
+            self._load()
+            return self._associate(client_df, devices, fuzzy_threshold, subnet_prefix)
+
+    def _associate(self, client_df, devices, fuzzy_threshold, subnet_prefix):
+        t0 = time.perf_counter()
+        # Claves y asignaciones por posición: un índice repetido (CSVs unidos
+        # con pd.concat) no debe mezclar filas; el resultado lleva el original
+        original_index = client_df.index
+        client_df = client_df.reset_index(drop=True)
+        clients = normalize_client_frame(client_df)
+        keys = _client_keys(clients)
+        client_fps = _fingerprints(clients[CLIENT_COLUMNS])
+
+        dev = build_device_frame(devices)
+        dev_keys = _device_keys(dev)
+        dev_fps = dict(zip(dev_keys, _fingerprints(dev[DEVICE_COLUMNS])))
+        pos_of = {k: i for i, k in enumerate(dev_keys)}
+
+        params = {"fuzzy_threshold": fuzzy_threshold, "subnet_prefix": subnet_prefix}
+        full = params != self._params or not self._clients
+        changed = {k for k, fp in dev_fps.items() if self._devices.get(k) != fp}
+        removed = set(self._devices) - set(dev_fps)
+        inventory_changed = bool(changed or removed)
+
+        hot = dev[[k in changed for k in dev_keys]]
+        hot_ip = set(hot["ip_key"]) - {""}
+        hot_mac = set(hot["mac_key"]) - {""}
+        hot_name = {n.lower() for n in hot["name_key"] if n}
+
+        dirty: List[bool] = []
+        for key, fp, ip, mac, name in zip(
+            keys,
+            client_fps,
+            clients["ip"],
+            clients["cliente_mac"],
+            clients["cliente_nombre"],
+        ):
+            cached = None if full else self._clients.get(key)
+            if cached is None or cached["fp"] != fp:
+                dirty.append(True)
+                continue
+            device = cached["device"]
+            if device is not None and (device in changed or device in removed):
+                dirty.append(True)
+                continue
+            dirty.append(
+                inventory_changed
+                and (
+                    cached["row"]["método"] not in EXACT_METHODS
+                    or ip in hot_ip
+                    or mac in hot_mac
+                    or name.lower() in hot_name
+                )
+            )
+
+        dirty_mask = pd.Series(dirty, index=client_df.index, dtype=bool)
+        fresh = associate_frame(
+            client_df.loc[dirty_mask],
+            devices,
+            fuzzy_threshold=fuzzy_threshold,
+            subnet_prefix=subnet_prefix,
+            device_frame=dev,
+        )
+
+        reused_idx = client_df.index[~dirty_mask]
+        reused_keys = [k for k, d in zip(keys, dirty) if not d]
+        reused = pd.DataFrame(
+            [self._clients[k]["row"] for k in reused_keys],
+            index=reused_idx,
+            columns=STORED_COLUMNS,
+            dtype=object,
+        )
+        reused["uisp_pos"] = [
+            pos_of.get(self._clients[k]["device"], -1) for k in reused_keys
+        ]
+        frame = pd.concat([fresh.astype(object), reused]).reindex(client_df.index)
+        frame["matched"] = frame["matched"].astype(bool)
+        frame["similarity"] = pd.to_numeric(frame["similarity"])
+        frame["uisp_pos"] = frame["uisp_pos"].astype(int)
+
+        # Actualizar estado persistido
+        new_clients: Dict[str, Dict] = {}
+        for key, fp, is_dirty, pos, row in zip(
+            keys,
+            client_fps,
+            dirty,
+            frame["uisp_pos"],
+            frame[STORED_COLUMNS].itertuples(index=False, name=None),
+        ):
+            if not is_dirty:
+                new_clients[key] = self._clients[key]
+                continue
+            new_clients[key] = {
+                "key": key,
+                "fp": fp,
+                "device": dev_keys[pos] if pos >= 0 else None,
+                "row": {c: _native(v) for c, v in zip(STORED_COLUMNS, row)},
+            }
+        self._clients = new_clients
+        self._order = keys
+        self._devices = dev_fps
+        self._params = params
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+        self._save()
+
+        elapsed = time.perf_counter() - t0
+        self.last_run = {
+            "clients": len(keys),
+            "reassociated": int(dirty_mask.sum()),
+            "reused": len(reused_keys),
+            "full": full,
+            "seconds": round(elapsed, 4),
+        }
+        CACHE_REQUESTS.inc(len(reused_keys), cache="association_rows", result="hit")
+        CACHE_REQUESTS.inc(
+            int(dirty_mask.sum()), cache="association_rows", result="miss"
+        )
+        logger.info(
+            "Asociación incremental: %(reassociated)d re-asociados, "
+            "%(reused)d reutilizados en %(seconds).3fs" % self.last_run
+        )
+        frame = frame[RESULT_COLUMNS]
+        frame.index = original_index
+        return frame
+
+    # ── Lectura instantánea ──────────────────────────────────────
+    def table(self) -> Dict:
+        """Tabla de asociaciones vigente (sin recalcular)."""
+        with self._lock:
+            self._load()
+            rows = [self._clients[k]["row"] for k in self._order]
+            return {
+                "updated_at": self.updated_at,
+                "total": len(rows),
+                "matched": sum(1 for r in rows if r.get("matched")),
+                "last_run": self.last_run,
+                "associations": rows,
+            }
+
+
+_cache = AssociationCache()
+
+
+def associate_incremental(
+    client_df: pd.DataFrame,
+    devices: Sequence,
+    fuzzy_threshold: float = 0.8,
+    subnet_prefix: int = SUBNET_PREFIX,
+) -> pd.DataFrame:
+    """Asociación usando el cache global del proceso."""
+    with span("associate_clients_to_devices"):
+        return _cache.associate(client_df, devices, fuzzy_threshold, subnet_prefix)
+
+
+def get_association_table() -> Dict:
+    """Última tabla de asociaciones calculada (memoria o disco)."""
+    return _cache.table()
+
+
+__all__ = ["AssociationCache", "associate_incremental", "get_association_table"]
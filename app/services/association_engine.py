@@ -0,0 +1,243 @@
+# File: app/services/association_engine.py
+"""
+Motor columnar de asociación cliente ↔ dispositivo UISP.
+
+- Construye un DataFrame de dispositivos una sola vez.
+- Normaliza IP/MAC/nombre de clientes de forma vectorizada.
+- Resuelve los niveles exactos (IP, MAC, nombre) con joins contra índices
+  de dispositivos y solo recorre fila a fila el residuo (subred y fuzzy).
+
+El resultado es un DataFrame (una fila por cliente) que consumen
+`client_service`, `topology_enricher` y `verify_uisp_data`.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.services.name_matcher import NameMatcher
+from app.services.subnet_index import SUBNET_PREFIX, SubnetIndex
+
+# Niveles de asociación en orden de prioridad
+TIER_IP = "ip_exact"
+TIER_MAC = "mac_exact"
+TIER_NAME = "name_exact"
+TIER_SUBNET = "subnet"
+TIER_FUZZY = "name_fuzzy"
+DEFAULT_TIERS = (TIER_IP, TIER_MAC, TIER_NAME, TIER_SUBNET, TIER_FUZZY)
+
+CLIENT_COLUMNS = ["cliente_id", "cliente_nombre", "plan", "ip", "cliente_mac"]
+DEVICE_COLUMNS = ["dispositivo_id", "hostname", "uisp_ip", "uisp_mac", "uisp_name"]
+RESULT_COLUMNS = (
+    CLIENT_COLUMNS + ["matched", "método", "similarity"] + DEVICE_COLUMNS + ["uisp_pos"]
+)
+
+
+def build_device_frame(devices: Sequence) -> pd.DataFrame:
+    """
+    Una fila por dispositivo (índice = posición en `devices`).
+
+    Columnas de salida (`DEVICE_COLUMNS`) más las claves normalizadas de
+    búsqueda `ip_key`, `mac_key` y `name_key`.
+    """
+    cols: Dict[str, List] = {c: [] for c in DEVICE_COLUMNS}
+    for dev in devices:
+        ident = dev.get("identification") or {}
+        cols["dispositivo_id"].append(ident.get("id"))
+        cols["hostname"].append(ident.get("hostname"))
+        cols["uisp_ip"].append(dev.get("ipAddress"))
+        cols["uisp_mac"].append(dev.get("mac") or ident.get("mac"))
+        cols["uisp_name"].append(ident.get("name"))
+    # dtype=object: los valores salen tal cual (int/str/None) en los registros
+    frame = pd.DataFrame(cols, dtype=object)
+    frame["ip_key"] = _text(frame["uisp_ip"])
+    frame["mac_key"] = _text(frame["uisp_mac"]).str.lower()
+    frame["name_key"] = frame["uisp_name"].where(
+        frame["uisp_name"].map(lambda v: isinstance(v, str)), ""
+    )
+    return frame
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Columna como texto limpio: NaN/None → '' y sin espacios laterales."""
+    text = series.astype(object).where(series.notna(), "").astype(str).str.strip()
+    return text.astype(object)
+
+
+def _first_column(df: pd.DataFrame, *names: str) -> pd.Series:
+    """Primera columna no vacía entre `names` (equivale a `a or b` por fila)."""
+    out = pd.Series("", index=df.index, dtype=object)
+    for name in reversed(names):
+        if name in df.columns:
+            values = _text(df[name])
+            out = values.where(values != "", out)
+    return out
+
+
+def normalize_client_frame(client_df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de cliente (`CLIENT_COLUMNS`) normalizadas de forma vectorizada."""
+    if "id" in client_df.columns or "cliente_id" in client_df.columns:
+        ids = _first_column(client_df, "cliente_id", "id")
+        ids = ids.where(ids != "", None)
+    else:
+        ids = pd.Series(None, index=client_df.index, dtype=object)
+    return pd.DataFrame(
+        {
+            "cliente_id": ids,
+            "cliente_nombre": _first_column(client_df, "nombre", "name"),
+            "plan": _first_column(client_df, "plan"),
+            "ip": _first_column(client_df, "ip", "ip_address"),
+            "cliente_mac": _first_column(client_df, "mac").str.lower(),
+        },
+        index=client_df.index,
+    )
+
+
+def _lookup(keys: pd.Series, keep: str) -> pd.Series:
+    """Índice clave → posición de dispositivo (sin claves vacías ni repetidas)."""
+    keys = keys[keys != ""]
+    keys = keys[~keys.duplicated(keep=keep)]
+    return pd.Series(keys.index, index=keys.values)
+
+
+def _join_tier(
+    keys: pd.Series, lookup: pd.Series, pos: pd.Series, method: pd.Series, name: str
+):
+    """Asigna `name` a las filas aún sin match cuya clave existe en `lookup`."""
+    pending = pos.isna() & (keys != "")
+    if not pending.any() or lookup.empty:
+        return
+    found = keys[pending].map(lookup).dropna()
+    pos.loc[found.index] = found.astype(int)
+    method.loc[found.index] = name
+
+
+def associate_frame(
+    client_df: pd.DataFrame,
+    devices: Sequence,
+    fuzzy_threshold: float = 0.8,
+    subnet_prefix: int = SUBNET_PREFIX,
+    tiers: Iterable[str] = DEFAULT_TIERS,
+    name_case_sensitive: bool = True,
+    device_frame: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Asocia cada fila de `client_df` con un dispositivo de `devices`.
+
+    Devuelve un DataFrame con `RESULT_COLUMNS` y el mismo índice que
+    `client_df`. `método` vale None y `matched` False para los clientes sin
+    asociación; `similarity` solo tiene valor para `name_fuzzy`; `uisp_pos`
+    es la posición del dispositivo en `devices` (-1 sin asociación).
+    """
+    tiers = tuple(tiers)
+    # Se trabaja por posición: con un índice repetido (p. ej. CSVs unidos
+    # con pd.concat) asignar por etiqueta escribiría en varias filas
+    original_index = client_df.index
+    clients = normalize_client_frame(client_df.reset_index(drop=True))
+    dev = device_frame if device_frame is not None else build_device_frame(devices)
+
+    pos = pd.Series(np.nan, index=clients.index, dtype=float)
+    method = pd.Series(None, index=clients.index, dtype=object)
+    similarity = pd.Series(np.nan, index=clients.index, dtype=float)
+
+    # Niveles exactos: joins contra índices de dispositivos.
+    # IP/MAC: gana el último dispositivo repetido; nombre: el primero.
+    if TIER_IP in tiers:
+        _join_tier(clients["ip"], _lookup(dev["ip_key"], "last"), pos, method, TIER_IP)
+    if TIER_MAC in tiers:
+        _join_tier(
+            clients["cliente_mac"],
+            _lookup(dev["mac_key"], "last"),
+            pos,
+            method,
+            TIER_MAC,
+        )
+    if TIER_NAME in tiers:
+        names, dev_names = clients["cliente_nombre"], dev["name_key"]
+        if not name_case_sensitive:
+            names, dev_names = names.str.lower(), dev_names.str.lower()
+        _join_tier(names, _lookup(dev_names, "first"), pos, method, TIER_NAME)
+
+    # Residuo fila a fila: subred y nombre fuzzy
+    if TIER_SUBNET in tiers:
+        pending = pos.isna() & (clients["ip"] != "")
+        if pending.any():
+            index = SubnetIndex(devices, prefix=subnet_prefix)
+            pos_of = {id(d): i for i, d in enumerate(devices)}
+            label = f"subnet_{subnet_prefix}"
+            for row, ip in clients.loc[pending, "ip"].items():
+                hit = index.closest(ip)
+                if hit is not None:
+                    pos.at[row] = pos_of[id(hit)]
+                    method.at[row] = label
+    if TIER_FUZZY in tiers:
+        pending = pos.isna() & (clients["cliente_nombre"] != "")
+        if pending.any():
+            matcher = NameMatcher(list(dev["uisp_name"]))
+            for row, name in clients.loc[pending, "cliente_nombre"].items():
+                hit = matcher.best_match(name, fuzzy_threshold)
+                if hit is not None:
+                    pos.at[row] = hit[0]
+                    method.at[row] = TIER_FUZZY
+                    similarity.at[row] = round(hit[1], 2)
+
+    result = clients
+    result["matched"] = pos.notna()
+    result["método"] = method
+    result["similarity"] = similarity
+    result["uisp_pos"] = pos.fillna(-1).astype(int)
+    matched_dev = dev[DEVICE_COLUMNS].reindex(result["uisp_pos"].values)
+    matched_dev.index = clients.index
+    result = pd.concat([result, matched_dev], axis=1)[RESULT_COLUMNS]
+    result.index = original_index
+    return result
+
+
+def _native(value):
+    """NaN/NA de pandas → None; el resto se devuelve tal cual."""
+    if value is None or (not isinstance(value, (str, dict, list)) and pd.isna(value)):
+        return None
+    return value
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict]:
+    """
+    Convierte el resultado de `associate_frame` a la lista de dicts histórica
+    de `associate_clients_to_devices` (sin `similarity` ni campos UISP cuando
+    no aplican).
+    """
+    records: List[Dict] = []
+    for row in frame.itertuples(index=False):
+        entry: Dict = {
+            "cliente_nombre": row.cliente_nombre,
+            "plan": row.plan,
+            "ip": row.ip,
+            "cliente_mac": row.cliente_mac,
+            "matched": bool(row.matched),
+            "método": _native(getattr(row, "método")),
+        }
+        if not pd.isna(row.similarity):
+            entry["similarity"] = float(row.similarity)
+        if row.matched:
+            entry.update(
+                {
+                    "dispositivo_id": _native(row.dispositivo_id),
+                    "hostname": _native(row.hostname),
+                    "uisp_ip": _native(row.uisp_ip),
+                    "uisp_mac": _native(row.uisp_mac),
+                    "uisp_name": _native(row.uisp_name),
+                }
+            )
+        records.append(entry)
+    return records
+
+
+__all__ = [
+    "DEFAULT_TIERS",
+    "RESULT_COLUMNS",
+    "associate_frame",
+    "build_device_frame",
+    "frame_to_records",
+    "normalize_client_frame",
+]
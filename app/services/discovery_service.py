@@ -1,16 +1,26 @@
 # File: app/services/discovery_service.py
 
+import contextvars
 import logging
+import time
 from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List, Set
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
-from app.services.alarms_service import raise_alarm
+from app.services.alarm_correlator import get_alarm_correlator
+from app.services.alarms_service import raise_alarm, resolve_alarm
+from app.services.jobs import check_cancelled, report_progress
+from app.services.logging_setup import get_logger
+from app.services.metrics import RUN_SECONDS
 from app.services.mikrotik_service import connect_mikrotik_with_learning
-from app.services.uisp_service import get_uisp_devices
-from app.supabase_client import supabase
+from app.services.storage import get_storage
+from app.services.timing import record
+from app.services.tracing import Span, child_span, current_span, start_span, use_span
+from app.services.uisp_service import get_uisp_device_records
 
 logger = logging.getLogger(__name__)
+log = get_logger(__name__)
 
 # Tipos de nodos en el grafo
 NODE_ROUTER = "router"
@@ -22,6 +32,12 @@ NODE_SWITCH = "switch"
 DEGRADED_SPEEDS = {"10Mbps", "10M"}  # ampliar si es necesario
 
 
+def _upsert_topologia(rows: List[Dict]):
+    """Un lote por etapa (router, clientes, APs) en vez de un upsert por nodo."""
+    if rows:
+        get_storage().upsert_topology(rows)
+
+
 def _interface_details(api) -> List[Dict]:
     """Lista de interfaces Ethernet con info de link-speed y degradación."""
     details = []
@@ -83,146 +99,302 @@ def _discover_switch_neighbors(api) -> List[Dict]:
     return neighbors
 
 
-def discover_topology(seed_router_ips: List[str]) -> Dict:
-    """Construye el grafo partiendo de routers semilla e inserta nodos en Supabase."""
-    nodes: List[Dict] = []
+# Descarga de UISP en paralelo al recorrido de routers
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+
+def prefetch_uisp_devices() -> Future:
+    """Inicia la descarga de dispositivos UISP en segundo plano."""
+    # Copia el contexto para que los tiempos queden en el request actual
+    return _prefetch_pool.submit(
+        contextvars.copy_context().run, get_uisp_device_records
+    )
+
+
+def _run_in(span: Span, fn, *args):
+    """Ejecuta `fn` con `span` como actual, registrando excepciones en él."""
+    with use_span(span):
+        try:
+            return fn(*args)
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+
+
+def iter_topology(
+    seed_router_ips: List[str],
+    uisp_future: Optional[Future] = None,
+    parent_span: Optional[Span] = None,
+) -> Iterator[Tuple[str, Dict]]:
+    """
+    Recorre la red desde los routers semilla y va entregando
+    ("node", nodo) / ("edge", arista) a medida que procesa cada router.
+
+    La descarga de UISP corre en paralelo (`uisp_future`) y solo se espera
+    al llegar a los primeros clientes, así los routers y enlaces troncales
+    salen de inmediato. Guarda los nodos en el almacenamiento (un lote por
+    router, por sus clientes y por las relaciones AP-cliente).
+
+    Cada corrida es una traza `discovery.run` (hija de `parent_span` si se
+    indica) con un span `discovery.router` por router visitado.
+    """
+    t0 = time.perf_counter()
+    run = Span.start(
+        "discovery.run", {"routers.seed": len(seed_router_ips)}, parent_span
+    )
+    if uisp_future is None:
+        with use_span(run):
+            uisp_future = prefetch_uisp_devices()
+    uisp_devices = None
+    ip_to_uisp: Dict[str, Dict] = {}
+
+    node_ids: Set[str] = set()
     edges: List[Dict] = []
 
-    visited: Set[str] = set()
-    queue = deque(seed_router_ips)
+    def node(item: Dict) -> Tuple[str, Dict]:
+        node_ids.add(item["id"])
+        return "node", item
 
-    # Obtener dispositivos UISP para correlación
-    uisp_devices = get_uisp_devices()
-    ip_to_uisp = {d.get("ipAddress"): d for d in uisp_devices if d.get("ipAddress")}
+    def edge(item: Dict) -> Tuple[str, Dict]:
+        edges.append(item)
+        return "edge", item
 
-    while queue:
-        ip = queue.popleft()
-        if ip in visited:
-            continue
-        visited.add(ip)
+    visited: Set[str] = set()
+    unreachable: Set[str] = set()
+    queue = deque(seed_router_ips)
 
+    def visit(ip: str) -> Tuple[List[Tuple[str, Dict]], Any]:
+        """Router, puertos degradados y vecinos (no necesita UISP)."""
+        out: List[Tuple[str, Dict]] = []
         api = connect_mikrotik_with_learning(ip)
         router_status = api is not None
-        nodes.append(
-            {"id": ip, "label": ip, "type": NODE_ROUTER, "status": router_status}
+        current_span().set_attribute("router.reachable", router_status)
+        out.append(
+            node({"id": ip, "label": ip, "type": NODE_ROUTER, "status": router_status})
         )
-        supabase.table("topologia").upsert(
-            {
-                "ip": ip,
-                "tipo": NODE_ROUTER,
-                "nombre": ip,
-                "last_seen": datetime.now(timezone.utc).isoformat(),
-            }
-        ).execute()
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{"ip": ip, "tipo": NODE_ROUTER, "nombre": ip, "last_seen": now}]
 
         if not router_status:
-            continue
+            _upsert_topologia(rows)
+            unreachable.add(ip)
+            raise_alarm(
+                "critical",
+                f"Router {ip} inalcanzable",
+                source="discovery",
+                metric="reachability",
+                target=ip,
+            )
+            return out, None
+        resolve_alarm("discovery", "reachability", ip)
 
         # Interfaces Ethernet y degradación
         for inf in _interface_details(api):
             if inf["running"] and inf["degraded"]:
                 port_id = f"{ip}:{inf['name']}"
-                nodes.append(
-                    {
-                        "id": port_id,
-                        "label": f"{inf['name']} ({inf['link_speed']})",
-                        "type": NODE_SWITCH,
-                        "degraded": True,
-                        "link_speed": inf["link_speed"],
-                    }
+                out.append(
+                    node(
+                        {
+                            "id": port_id,
+                            "label": f"{inf['name']} ({inf['link_speed']})",
+                            "type": NODE_SWITCH,
+                            "degraded": True,
+                            "link_speed": inf["link_speed"],
+                        }
+                    )
                 )
-                edges.append(
-                    {
-                        "source": ip,
-                        "target": port_id,
-                        "degraded": True,
-                        "link_speed": inf["link_speed"],
-                    }
+                out.append(
+                    edge(
+                        {
+                            "source": ip,
+                            "target": port_id,
+                            "degraded": True,
+                            "link_speed": inf["link_speed"],
+                        }
+                    )
                 )
                 raise_alarm(
                     "warning",
                     f"Enlace degradado a {inf['link_speed']} en {ip} interfaz {inf['name']}",
+                    source="discovery",
+                    metric="link_speed",
+                    target=port_id,
                 )
-                supabase.table("topologia").upsert(
+                rows.append(
                     {
                         "ip": ip,
                         "tipo": NODE_SWITCH,
                         "nombre": inf["name"],
                         "puerto": inf["name"],
                         "velocidad_link": inf["link_speed"],
-                        "last_seen": datetime.now(timezone.utc).isoformat(),
+                        "last_seen": now,
                     }
-                ).execute()
+                )
 
         # Vecinos LLDP/CDP
         for neigh in _discover_switch_neighbors(api):
             neighbor_ip = neigh["address"]
-            if neighbor_ip not in [n["id"] for n in nodes]:
-                nodes.append(
-                    {
-                        "id": neighbor_ip,
-                        "label": neigh["identity"] or neighbor_ip,
-                        "type": NODE_SWITCH,
-                    }
+            if neighbor_ip not in node_ids:
+                out.append(
+                    node(
+                        {
+                            "id": neighbor_ip,
+                            "label": neigh["identity"] or neighbor_ip,
+                            "type": NODE_SWITCH,
+                        }
+                    )
                 )
-                supabase.table("topologia").upsert(
+                rows.append(
                     {
                         "ip": neighbor_ip,
                         "tipo": NODE_SWITCH,
                         "nombre": neigh.get("identity") or neighbor_ip,
-                        "last_seen": datetime.now(timezone.utc).isoformat(),
+                        "last_seen": now,
                     }
-                ).execute()
-            edges.append(
-                {"source": ip, "target": neighbor_ip, "puerto": neigh["interface"]}
+                )
+            out.append(
+                edge(
+                    {"source": ip, "target": neighbor_ip, "puerto": neigh["interface"]}
+                )
             )
 
-        # Clientes desde MikroTik + UISP
+        _upsert_topologia(rows)
+        return out, api
+
+    def visit_clients(ip: str, api) -> List[Tuple[str, Dict]]:
+        """Clientes desde MikroTik + UISP (espera la descarga de UISP)."""
+        nonlocal uisp_devices, ip_to_uisp
+        out: List[Tuple[str, Dict]] = []
+        rows: List[Dict] = []
+        now = datetime.now(timezone.utc).isoformat()
         for c_ip in _discover_clients_from_router(api):
-            if c_ip not in [n["id"] for n in nodes]:
-                dev = ip_to_uisp.get(c_ip)
-                nodes.append(
-                    {
-                        "id": c_ip,
-                        "label": dev["identification"]["name"] if dev else c_ip,
-                        "type": NODE_CLIENT,
-                        "signal": dev.get("rssi") if dev else None,
+            if c_ip not in node_ids:
+                if uisp_devices is None:
+                    with child_span("uisp.wait"):
+                        uisp_devices = uisp_future.result()
+                    ip_to_uisp = {
+                        d.get("ipAddress"): d
+                        for d in uisp_devices
+                        if d.get("ipAddress")
                     }
+                dev = ip_to_uisp.get(c_ip)
+                out.append(
+                    node(
+                        {
+                            "id": c_ip,
+                            "label": dev["identification"].get("name") if dev else c_ip,
+                            "type": NODE_CLIENT,
+                            "signal": dev.get("rssi") if dev else None,
+                        }
+                    )
                 )
-                supabase.table("topologia").upsert(
+                rows.append(
                     {
                         "ip": c_ip,
                         "tipo": NODE_CLIENT,
-                        "nombre": dev["identification"]["name"] if dev else c_ip,
+                        "nombre": dev["identification"].get("name") if dev else c_ip,
                         "signal": dev.get("rssi") if dev else None,
-                        "last_seen": datetime.now(timezone.utc).isoformat(),
+                        "last_seen": now,
                     }
-                ).execute()
-            edges.append({"source": ip, "target": c_ip})
-
-    # Relaciones AP-cliente desde UISP
-    for dev in uisp_devices:
-        if dev.get("parentId"):
-            parent = next((d for d in uisp_devices if d["id"] == dev["parentId"]), None)
-            if parent:
-                child_ip = dev.get("ipAddress")
-                parent_ip = parent.get("ipAddress")
-                if child_ip and parent_ip:
-                    edges.append({"source": parent_ip, "target": child_ip})
-                    nodes.append(
-                        {
-                            "id": parent_ip,
-                            "label": parent["identification"]["name"],
-                            "type": NODE_AP,
-                        }
-                    )
-                    supabase.table("topologia").upsert(
-                        {
-                            "ip": parent_ip,
-                            "tipo": NODE_AP,
-                            "nombre": parent["identification"]["name"],
-                            "last_seen": datetime.now(timezone.utc).isoformat(),
-                        }
-                    ).execute()
+                )
+            out.append(edge({"source": ip, "target": c_ip}))
+        _upsert_topologia(rows)
+        return out
+
+    def ap_relations() -> List[Tuple[str, Dict]]:
+        """Relaciones AP-cliente desde UISP."""
+        nonlocal uisp_devices
+        out: List[Tuple[str, Dict]] = []
+        rows: List[Dict] = []
+        now = datetime.now(timezone.utc).isoformat()
+        if uisp_devices is None:
+            uisp_devices = uisp_future.result()
+        by_id: Dict[str, Dict] = {}
+        for dev in uisp_devices:
+            by_id.setdefault(dev["id"], dev)
+        for dev in uisp_devices:
+            if dev.get("parentId"):
+                parent = by_id.get(dev["parentId"])
+                if parent:
+                    child_ip = dev.get("ipAddress")
+                    parent_ip = parent.get("ipAddress")
+                    if child_ip and parent_ip:
+                        out.append(edge({"source": parent_ip, "target": child_ip}))
+                        out.append(
+                            node(
+                                {
+                                    "id": parent_ip,
+                                    "label": parent["identification"].get("name"),
+                                    "type": NODE_AP,
+                                }
+                            )
+                        )
+                        rows.append(
+                            {
+                                "ip": parent_ip,
+                                "tipo": NODE_AP,
+                                "nombre": parent["identification"].get("name"),
+                                "last_seen": now,
+                            }
+                        )
+        # Un AP aparece una vez por cliente: el lote se deduplica por nodo
+        _upsert_topologia(rows)
+        return out
+
+    # Los spans se activan solo mientras se trabaja: el generador puede
+    # reanudarse en otro hilo/contexto entre un `yield` y el siguiente.
+    try:
+        while queue:
+            ip = queue.popleft()
+            if ip in visited:
+                continue
+            visited.add(ip)
+            check_cancelled()
+            report_progress(
+                len(visited) / (len(visited) + len(queue) + 1), f"Descubriendo {ip}"
+            )
+            router_span = Span.start("discovery.router", {"router.ip": ip}, run)
+            try:
+                records, api = _run_in(router_span, visit, ip)
+                yield from records
+                if api is not None:
+                    yield from _run_in(router_span, visit_clients, ip, api)
+            finally:
+                router_span.end()
+                log.info(
+                    "discovery.router",
+                    router_ip=ip,
+                    run_id=run.trace_id,
+                    duration_ms=round(router_span.duration_ms, 1),
+                )
+
+        with use_span(run), start_span("discovery.ap_relations"):
+            records = ap_relations()
+        yield from records
+
+        # Topología para agrupar alarmas por causa raíz (router → AP → cliente)
+        get_alarm_correlator().set_topology(
+            ((e["source"], e["target"]) for e in edges), keep_parents=unreachable
+        )
+    except BaseException as exc:
+        run.record_exception(exc)
+        raise
+    finally:
+        run.set_attribute("routers.visited", len(visited))
+        run.set_attribute("routers.unreachable", len(unreachable))
+        run.end()
+    elapsed = time.perf_counter() - t0
+    RUN_SECONDS.observe(elapsed, kind="discovery")
+    record("discover_topology", elapsed)
+
 
-    return {"nodes": nodes, "edges": edges}
+def discover_topology(
+    seed_router_ips: List[str],
+    uisp_future: Optional[Future] = None,
+    parent_span: Optional[Span] = None,
+) -> Dict:
+    """Construye el grafo partiendo de routers semilla y guarda los nodos."""
+    topology: Dict[str, List[Dict]] = {"nodes": [], "edges": []}
+    for kind, item in iter_topology(seed_router_ips, uisp_future, parent_span):
+        topology["nodes" if kind == "node" else "edges"].append(item)
+    return topology
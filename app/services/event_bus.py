@@ -0,0 +1,204 @@
+# File: app/services/event_bus.py
+"""
+Bus de eventos en memoria para empujar novedades a los dashboards (SSE).
+
+- Un único publicador: `publish()` numera el evento, lo serializa una sola
+  vez y lo reparte a todas las conexiones, así 50 dashboards abiertos
+  cuestan lo mismo en el backend que uno.
+- Historial acotado (`EVENT_HISTORY` eventos) para reanudar desde
+  `Last-Event-ID` tras una reconexión.
+- Cada conexión tiene un buffer acotado (`EVENT_CLIENT_BUFFER`); si el
+  cliente no consume a tiempo se descartan sus eventos más viejos y se le
+  envía un evento `resync` para que vuelva a pedir el estado completo.
+- `publish()` es seguro desde hilos (discovery/monitoring corren en el
+  threadpool de FastAPI); la espera del lado SSE es asyncio.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.services.metrics import QUEUE_DEPTH
+
+EVENT_HISTORY = int(os.getenv("EVENT_HISTORY", "1000"))
+EVENT_CLIENT_BUFFER = int(os.getenv("EVENT_CLIENT_BUFFER", "256"))
+
+EVENT_ALARM = "alarm"
+EVENT_ALARM_RESOLVED = "alarm_resolved"
+EVENT_TOPOLOGY = "topology"
+EVENT_RESYNC = "resync"
+
+
+def format_sse(event_id: Optional[int], event: str, data: Any) -> str:
+    """Trama SSE (`id:`/`event:`/`data:`) lista para escribir en la respuesta."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """Buffer acotado de una conexión; se despierta desde cualquier hilo."""
+
+    def __init__(self, maxlen: int, loop: Optional[asyncio.AbstractEventLoop]):
+        self._frames: deque = deque()
+        self._maxlen = maxlen
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._ready = asyncio.Event() if loop is not None else None
+        self.dropped = 0
+
+    def push(self, frame: str):
+        with self._lock:
+            if len(self._frames) >= self._maxlen:
+                self._frames.popleft()
+                self.dropped += 1
+            self._frames.append(frame)
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:  # loop cerrado: la conexión ya terminó
+                pass
+
+    def drain(self) -> List[str]:
+        """Tramas pendientes; antepone un `resync` si hubo descartes."""
+        with self._lock:
+            frames = list(self._frames)
+            self._frames.clear()
+            dropped, self.dropped = self.dropped, 0
+            if self._ready is not None:
+                self._ready.clear()
+        if dropped:
+            frames.insert(0, format_sse(None, EVENT_RESYNC, {"dropped": dropped}))
+        return frames
+
+    async def wait(self, timeout: float) -> List[str]:
+        """Espera hasta `timeout` s por tramas nuevas (lista vacía si no hubo)."""
+        frames = self.drain()
+        if frames or self._ready is None:
+            return frames
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.drain()
+
+
+class EventBus:
+    """Publicador único con historial y fan-out a suscripciones acotadas."""
+
+    def __init__(
+        self, history: int = EVENT_HISTORY, client_buffer: int = EVENT_CLIENT_BUFFER
+    ):
+        self.client_buffer = client_buffer
+        self._history: deque = deque(maxlen=history)
+        self._subs: List[Subscription] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+
+    @property
+    def last_id(self) -> int:
+        with self._lock:
+            return self._history[-1][0] if self._history else 0
+
+    def publish(self, event: str, data: Any) -> int:
+        """Publica un evento a todas las conexiones y devuelve su id."""
+        with self._lock:
+            event_id = next(self._ids)
+            frame = format_sse(event_id, event, data)
+            self._history.append((event_id, frame))
+            subs = list(self._subs)
+            self.published += 1
+        for sub in subs:
+            sub.push(frame)
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Nueva suscripción. Con `last_event_id` se reenvían los eventos
+        posteriores que sigan en el historial; si ese id ya salió del
+        historial, o es de otra ejecución del proceso (mayor que el último
+        id o con historial vacío), se envía primero un `resync`.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        sub = Subscription(self.client_buffer, loop)
+        with self._lock:
+            if last_event_id is not None:
+                if (
+                    not self._history
+                    or last_event_id > self._history[-1][0]
+                    or last_event_id < self._history[0][0] - 1
+                ):
+                    sub.push(format_sse(None, EVENT_RESYNC, {"dropped": None}))
+                    # Tras el resync van todos los eventos que sigan en memoria
+                    last_event_id = min(last_event_id, 0)
+                for event_id, frame in self._history:
+                    if event_id > last_event_id:
+                        sub.push(frame)
+            self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subs),
+                "published": self.published,
+                "history": len(self._history),
+            }
+
+
+def topology_diff(previous: Optional[Dict], current: Dict) -> Dict[str, List]:
+    """
+    Diferencias entre dos topologías {"nodes": [...], "edges": [...]}:
+    nodos agregados/eliminados/modificados (por `id`) y aristas
+    agregadas/eliminadas (por (source, target)).
+    """
+    prev_nodes = {n.get("id"): n for n in (previous or {}).get("nodes", [])}
+    cur_nodes = {n.get("id"): n for n in current.get("nodes", [])}
+
+    def edge_key(e):
+        return (e.get("source"), e.get("target"))
+
+    prev_edges = {edge_key(e): e for e in (previous or {}).get("edges", [])}
+    cur_edges = {edge_key(e): e for e in current.get("edges", [])}
+    return {
+        "nodes_added": [n for k, n in cur_nodes.items() if k not in prev_nodes],
+        "nodes_removed": [k for k in prev_nodes if k not in cur_nodes],
+        "nodes_changed": [
+            n for k, n in cur_nodes.items() if k in prev_nodes and prev_nodes[k] != n
+        ],
+        "edges_added": [e for k, e in cur_edges.items() if k not in prev_edges],
+        "edges_removed": [list(k) for k in prev_edges if k not in cur_edges],
+    }
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Bus global del proceso (se crea al primer uso)."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus()
+                QUEUE_DEPTH.set_function(
+                    lambda: _bus.stats()["subscribers"], queue="event_subscribers"
+                )
+    return _bus
+
+
+__all__ = ["EventBus", "format_sse", "get_event_bus", "topology_diff"]
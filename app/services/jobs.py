@@ -0,0 +1,277 @@
+# File: app/services/jobs.py
+"""
+Trabajos en segundo plano para monitoreo y descubrimiento.
+
+- `submit()` devuelve un `Job` al instante; la función corre en un pool
+  acotado (`JOB_WORKERS` hilos) con límite de concurrencia por tipo
+  (`JOB_LIMITS`, p. ej. "run=1,topology=2,trunk=2"). Lo que excede el
+  límite espera en cola sin ocupar un hilo.
+- Dentro de la función, `report_progress()` publica avance y resultados
+  parciales y `check_cancelled()` corta el trabajo si se pidió cancelarlo.
+  Fuera de un trabajo ambas son no-ops, así el código de servicio sirve
+  igual desde un endpoint síncrono.
+- Los trabajos terminados se conservan `JOB_RETENTION_SECONDS` segundos.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_LIMITS = os.getenv("JOB_LIMITS", "run=1,topology=2,trunk=2")
+JOB_DEFAULT_LIMIT = int(os.getenv("JOB_DEFAULT_LIMIT", "1"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+# Trabajos en cola (no iniciados) admitidos antes de rechazar nuevos
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Se pidió cancelar el trabajo en curso."""
+
+
+class JobQueueFull(RuntimeError):
+    """Demasiados trabajos en cola."""
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Convierte "run=1,topology=2" en {"run": 1, "topology": 2}."""
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            limits[name.strip()] = max(1, int(value))
+    return limits
+
+
+class Job:
+    """Estado de un trabajo (lo que se expone por la API)."""
+
+    def __init__(self, job_type: str, fn: Callable, args: tuple, kwargs: dict):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.partial: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = threading.Event()
+        self._call = (fn, args, kwargs)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            data["partial"] = list(self.partial)
+            data["result"] = self.result
+        return data
+
+
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+def report_progress(
+    fraction: Optional[float] = None,
+    message: Optional[str] = None,
+    partial: Any = None,
+):
+    """Avance del trabajo actual (0..1), mensaje y/o un resultado parcial."""
+    job = _current_job.get()
+    if job is None:
+        return
+    if fraction is not None:
+        job.progress = min(max(fraction, 0.0), 1.0)
+    if message is not None:
+        job.message = message
+    if partial is not None:
+        job.partial.append(partial)
+
+
+def check_cancelled():
+    """Lanza `JobCancelled` si se pidió cancelar el trabajo actual."""
+    job = _current_job.get()
+    if job is not None and job.cancel_requested.is_set():
+        raise JobCancelled(job.id)
+
+
+class JobManager:
+    """Pool acotado con cola y límite de concurrencia por tipo de trabajo."""
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = JOB_DEFAULT_LIMIT,
+        retention: float = JOB_RETENTION_SECONDS,
+        max_queued: int = JOB_MAX_QUEUED,
+    ):
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="job")
+        self.limits = parse_limits(JOB_LIMITS) if limits is None else limits
+        self.default_limit = default_limit
+        self.retention = retention
+        self.max_queued = max_queued
+        self._jobs: Dict[str, Job] = {}
+        self._pending: Dict[str, deque] = {}
+        self._running: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_type: str, fn: Callable, *args, **kwargs) -> Job:
+        job = Job(job_type, fn, args, kwargs)
+        with self._lock:
+            self._prune(time.time())
+            queued = sum(len(q) for q in self._pending.values())
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} trabajos en cola")
+            self._jobs[job.id] = job
+            self._pending.setdefault(job_type, deque()).append(job)
+            self._dispatch()
+        return job
+
+    def _dispatch(self):
+        """Inicia los trabajos en cola que entren en el límite de su tipo."""
+        for job_type, pending in self._pending.items():
+            limit = self.limits.get(job_type, self.default_limit)
+            while pending and self._running.get(job_type, 0) < limit:
+                job = pending.popleft()
+                self._running[job_type] = self._running.get(job_type, 0) + 1
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._executor.submit(self._run, job)
+
+    def _run(self, job: Job):
+        fn, args, kwargs = job._call
+        token = _current_job.set(job)
+        try:
+            check_cancelled()
+            job.result = fn(*args, **kwargs)
+            job.status = SUCCEEDED
+            job.progress = 1.0
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            logger.error(f"Trabajo {job.type} {job.id} falló", exc_info=e)
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            _current_job.reset(token)
+            job.finished_at = time.time()
+            job._call = None
+            with self._lock:
+                self._running[job.type] -= 1
+                self._dispatch()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune(time.time())
+            return self._jobs.get(job_id)
+
+    def list(self, job_type: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            self._prune(time.time())
+            jobs = list(self._jobs.values())
+        return [j for j in jobs if job_type is None or j.type == job_type]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancela un trabajo: si está en cola no llega a correr; si está
+        corriendo se corta en el próximo `check_cancelled()`.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested.set()
+            pending = self._pending.get(job.type)
+            if job.status == QUEUED and pending is not None and job in pending:
+                pending.remove(job)
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                job._call = None
+        return job
+
+    def _prune(self, now: float):
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.retention
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": {t: n for t, n in self._running.items() if n},
+                "queued": {t: len(q) for t, q in self._pending.items() if q},
+                "retained": len(self._jobs),
+            }
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            for job_type in list(self._pending):
+                while self._pending[job_type]:
+                    job = self._pending[job_type].popleft()
+                    job.status = CANCELLED
+                    job.finished_at = time.time()
+            for job in self._jobs.values():
+                job.cancel_requested.set()
+        self._executor.shutdown(wait=wait)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Gestor global del proceso (se crea al primer uso)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+                QUEUE_DEPTH.set_function(
+                    lambda: sum(_manager.stats()["queued"].values()), queue="jobs"
+                )
+    return _manager
+
+
+__all__ = [
+    "Job",
+    "JobCancelled",
+    "JobManager",
+    "JobQueueFull",
+    "check_cancelled",
+    "get_job_manager",
+    "report_progress",
+]
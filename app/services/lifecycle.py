@@ -0,0 +1,112 @@
+# File: app/services/lifecycle.py
+"""
+Arranque y apagado del proceso de la API (hook `lifespan` de FastAPI).
+
+- `start()`: configura el logging y lanza el precalentamiento en un hilo
+  de fondo, así el servidor acepta requests de inmediato (y `--reload`
+  no espera a pandas ni a Supabase).
+- `warm_up()`: importa pandas, carga el CSV de clientes (y arranca el
+  watcher que lo recarga), la tabla de asociaciones cacheada, abre el
+  almacenamiento (cliente de Supabase o base SQLite) y crea los writers.
+  Cada paso es independiente: un fallo se loguea y no impide los demás.
+- `stop()`: detiene trabajos, vacía el writer de alarmas (lo pendiente
+  queda en el spool), cierra el almacenamiento, exporta los spans y
+  cierra el logging.
+
+`WARMUP=0` desactiva el precalentamiento (tests, scripts).
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.logging_setup import configure_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+
+def _warm_storage():
+    from app.services.storage import get_storage
+
+    get_storage().connect()
+
+
+def _warm_clients():
+    from app.services.client_service import CLIENT_CSV_PATH, load_clients_csv
+    from app.utils.clientes_loader import client_csv_loader
+
+    if os.path.exists(CLIENT_CSV_PATH):
+        load_clients_csv(CLIENT_CSV_PATH)
+    client_csv_loader.start_watching()
+
+
+def _warm_associations():
+    from app.services.association_cache import get_association_table
+
+    get_association_table()
+
+
+def _warm_writers():
+    from app.services.alarm_writer import get_alarm_writer
+    from app.services.jobs import get_job_manager
+
+    get_alarm_writer()
+    get_job_manager()
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("writers", _warm_writers),
+    ("storage", _warm_storage),
+    ("clients_csv", _warm_clients),
+    ("associations", _warm_associations),
+]
+
+
+def warm_up() -> Dict[str, float]:
+    """Ejecuta los pasos de precalentamiento; devuelve ms por paso exitoso."""
+    timings = {}
+    for name, step in WARMUP_STEPS:
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Precalentamiento '{name}' falló: {e}")
+            continue
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+    logger.info(f"Precalentamiento completo: {timings}")
+    return timings
+
+
+_warmup_thread: Optional[threading.Thread] = None
+
+
+def start(warmup: bool = WARMUP):
+    global _warmup_thread
+    configure_logging()
+    if warmup:
+        _warmup_thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def stop(timeout: float = 10.0):
+    from app.services.alarm_writer import get_alarm_writer
+    from app.services.jobs import get_job_manager
+    from app.services.storage import close_storage
+    from app.services.tracing import get_exporter
+    from app.utils.clientes_loader import client_csv_loader
+
+    try:
+        client_csv_loader.stop_watching()
+        get_job_manager().shutdown(wait=False)
+        get_alarm_writer().close(timeout)
+        close_storage()
+        get_exporter().flush(timeout)
+    finally:
+        shutdown_logging()
+
+
+__all__ = ["WARMUP_STEPS", "start", "stop", "warm_up"]
@@ -0,0 +1,354 @@
+# File: app/services/logging_setup.py
+"""
+Logging estructurado (JSON por línea) sin bloquear a quien loguea.
+
+- `configure_logging()` instala en el logger raíz un `QueueHandler`: el
+  hilo de discovery/request solo encola el registro y un `QueueListener`
+  en segundo plano lo formatea y escribe en `LOG_FILE` (o stderr si está
+  vacío). Se llama una vez al arrancar la app; es idempotente.
+- Tanto `logging.getLogger(...)` como `structlog.get_logger(...)` salen
+  por el mismo pipeline, con `timestamp`, `level`, `logger`, `event` y,
+  si corresponde, `run_id` (trace_id de la corrida en curso), `router_ip`
+  y `duration_ms` como campos de primer nivel (etiquetas para Loki).
+- Eventos ruidosos se limitan por (evento, router_ip) con
+  `LOG_RATE_LIMITS` ("routeros.auth_failed=3/60": 3 por minuto) o se
+  muestrean con `LOG_SAMPLING` ("routeros.command=0.01"). El siguiente
+  evento emitido lleva `suppressed` con la cantidad descartada.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from app.services.tracing import current_span
+
+LOG_FILE = os.getenv("LOG_FILE", "monitor360.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json (para promtail/Loki) o console (legible en desarrollo)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_LIMITS = os.getenv(
+    "LOG_RATE_LIMITS", "routeros.auth_failed=3/60,routeros.connect_failed=1/60"
+)
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+# Atributos de `LogRecord` que se exportan como campos del JSON
+CONTEXT_FIELDS = ("run_id", "router_ip", "duration_ms", "suppressed")
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, float]]:
+    """Convierte "evento=N/segundos,..." en {evento: (N, segundos)}."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        event, _, rate = part.partition("=")
+        count, _, window = rate.partition("/")
+        limits[event.strip()] = (int(count), float(window or 1))
+    return limits
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Convierte "evento=fracción,..." en {evento: fracción}."""
+    ratios = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        event, _, ratio = part.partition("=")
+        ratios[event.strip()] = float(ratio)
+    return ratios
+
+
+class RateLimiter:
+    """
+    Ventana fija por clave: deja pasar `count` eventos cada `window`
+    segundos y cuenta los descartados para informarlos en el siguiente.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[int, float]],
+        sampling: Optional[Dict[str, float]] = None,
+        clock=time.monotonic,
+    ):
+        self.limits = limits
+        self.sampling = sampling or {}
+        self.clock = clock
+        self._windows: Dict[Tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, event: str, key: Any = None) -> Tuple[bool, int]:
+        """(emitir?, descartados desde el último emitido) para `event`/`key`."""
+        ratio = self.sampling.get(event)
+        if ratio is not None and random.random() >= ratio:
+            return False, 0
+        limit = self.limits.get(event)
+        if limit is None:
+            return True, 0
+        count, window = limit
+        now = self.clock()
+        with self._lock:
+            state = self._windows.get((event, key))
+            if state is None or now - state[0] >= window:
+                suppressed = state[2] if state else 0
+                self._windows[(event, key)] = [now, 1, 0]
+                return True, suppressed
+            if state[1] < count:
+                state[1] += 1
+                return True, 0
+            state[2] += 1
+            return False, 0
+
+    def __call__(self, logger, method_name, event_dict):
+        """Procesador de structlog: descarta con `DropEvent`."""
+        allowed, suppressed = self.allow(
+            event_dict.get("event"), event_dict.get("router_ip")
+        )
+        if not allowed:
+            raise structlog.DropEvent
+        if suppressed:
+            event_dict["suppressed"] = suppressed
+        return event_dict
+
+
+def add_trace_context(logger, method_name, event_dict):
+    """Agrega `run_id` y `router_ip` del span actual (si no vienen dados)."""
+    span = current_span()
+    if span is not None:
+        event_dict.setdefault("run_id", span.trace_id)
+        router_ip = span.attributes.get("router.ip")
+        if router_ip is not None:
+            event_dict.setdefault("router_ip", router_ip)
+    return event_dict
+
+
+class _ContextFilter(logging.Filter):
+    """
+    Igual que `add_trace_context` para registros de `logging`: se ejecuta
+    en el hilo que loguea, antes de encolar (el contexto no viaja al
+    hilo del listener).
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "run_id"):
+            span = current_span()
+            if span is not None:
+                record.run_id = span.trace_id
+                router_ip = span.attributes.get("router.ip")
+                if router_ip is not None and not hasattr(record, "router_ip"):
+                    record.router_ip = router_ip
+        return True
+
+
+def _put(log_queue: "queue.Queue", item) -> bool:
+    """Encola sin bloquear; con la cola llena el registro se descarta."""
+    try:
+        log_queue.put_nowait(item)
+        return True
+    except queue.Full:
+        return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    No formatea en el hilo que loguea: solo resuelve el mensaje y la
+    excepción a texto (el traceback no se puede serializar a otro hilo
+    de forma segura) y deja el resto al listener.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record):
+        if not _put(self.queue, record):
+            self.dropped += 1
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exception = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _QueueLogger:
+    """
+    Destino de structlog: encola el `event_dict` ya procesado sin pasar
+    por `logging` (evita crear el `LogRecord` y buscar el frame llamador
+    en el hilo de trabajo; eso lo hace el listener).
+    """
+
+    dropped = 0
+
+    def __init__(self, log_queue: "queue.Queue", name: Optional[str] = None):
+        self._queue = log_queue
+        self.name = name or "root"
+
+    def msg(self, event_dict: Dict[str, Any]):
+        if not _put(self._queue, event_dict):
+            _QueueLogger.dropped += 1
+
+    debug = info = warning = warn = error = critical = exception = fatal = msg
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Convierte los eventos de structlog en `LogRecord` antes de escribir."""
+
+    def prepare(self, record):
+        if isinstance(record, dict):
+            level = record.get("level", "info")
+            return logging.makeLogRecord(
+                {
+                    "msg": record,
+                    "name": record.get("logger", "root"),
+                    "levelname": level.upper(),
+                    "levelno": logging.getLevelName(level.upper()),
+                    # Marcas que `ProcessorFormatter` usa para reconocerlo
+                    "_logger": None,
+                    "_name": level,
+                }
+            )
+        return record
+
+
+def _stamp(logger, method_name, event_dict):
+    # Solo el float en el hilo que loguea; el listener lo pasa a ISO 8601
+    event_dict["timestamp"] = time.time()
+    return event_dict
+
+
+def _record_time(logger, method_name, event_dict):
+    record = event_dict.get("_record")
+    if record is not None and "timestamp" not in event_dict:
+        event_dict["timestamp"] = record.created
+    return event_dict
+
+
+def _iso_timestamp(logger, method_name, event_dict):
+    ts = event_dict.get("timestamp")
+    if isinstance(ts, float):
+        event_dict["timestamp"] = (
+            datetime.fromtimestamp(ts, timezone.utc)
+            .isoformat(timespec="microseconds")
+            .replace("+00:00", "Z")
+        )
+    return event_dict
+
+
+def _as_args(logger, method_name, event_dict):
+    return (event_dict,), {}
+
+
+def _renderer():
+    if LOG_FORMAT == "console":
+        return structlog.dev.ConsoleRenderer(colors=False)
+    return structlog.processors.JSONRenderer(ensure_ascii=False)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging(
+    log_file: Optional[str] = None,
+    level: Optional[str] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> logging.handlers.QueueListener:
+    """Instala el pipeline en el logger raíz (una sola vez) y lo devuelve."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        log_file = LOG_FILE if log_file is None else log_file
+        level_no = getattr(logging, (level or LOG_LEVEL).upper(), logging.INFO)
+        limiter = rate_limiter or RateLimiter(
+            parse_rate_limits(LOG_RATE_LIMITS), parse_sampling(LOG_SAMPLING)
+        )
+        log_queue: "queue.Queue" = queue.Queue(LOG_QUEUE_SIZE)
+
+        # En el hilo que loguea: solo lo que depende del contexto actual
+        structlog.configure(
+            processors=[
+                structlog.contextvars.merge_contextvars,
+                add_trace_context,
+                limiter,
+                structlog.stdlib.add_logger_name,
+                structlog.processors.add_log_level,
+                _stamp,
+                structlog.processors.format_exc_info,
+                _as_args,
+            ],
+            logger_factory=lambda name=None, *args: _QueueLogger(log_queue, name),
+            wrapper_class=structlog.make_filtering_bound_logger(level_no),
+            cache_logger_on_first_use=False,
+        )
+
+        # En el listener: timestamp ISO y render a JSON
+        formatter = structlog.stdlib.ProcessorFormatter(
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                _iso_timestamp,
+                _renderer(),
+            ],
+            foreign_pre_chain=[
+                structlog.stdlib.add_logger_name,
+                structlog.stdlib.add_log_level,
+                structlog.stdlib.ExtraAdder(CONTEXT_FIELDS + ("exception",)),
+                _record_time,
+            ],
+        )
+        if log_file:
+            target: logging.Handler = logging.FileHandler(log_file, encoding="utf-8")
+        else:
+            target = logging.StreamHandler(sys.stderr)
+        target.setFormatter(formatter)
+
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger()
+        for old in list(root.handlers):
+            root.removeHandler(old)
+        root.addHandler(handler)
+        root.setLevel(level_no)
+
+        _listener = _QueueListener(log_queue, target, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el listener (al cerrar la app)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                if isinstance(handler, _QueueHandler):
+                    root.removeHandler(handler)
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def get_logger(name: Optional[str] = None):
+    """Logger de structlog: `log.info("evento", router_ip=ip, duration_ms=…)`."""
+    return structlog.get_logger(name)
+
+
+__all__ = [
+    "RateLimiter",
+    "configure_logging",
+    "get_logger",
+    "parse_rate_limits",
+    "parse_sampling",
+    "shutdown_logging",
+]
@@ -0,0 +1,424 @@
+# File: app/services/metrics.py
+"""
+Métricas en proceso con exposición en formato de texto de Prometheus.
+
+Contadores, gauges e histogramas con etiquetas, sin dependencias: cada
+observación es un `bisect` sobre buckets fijos y una suma bajo un lock,
+así instrumentar rutas calientes (comandos RouterOS, escrituras) cuesta
+microsegundos. `render()` produce el texto que sirve `GET /metrics`.
+
+Los gauges pueden tener una función (`set_function`) que se evalúa al
+momento del scrape, útil para profundidades de colas.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from app.services.timing import record
+from app.services.tracing import child_span
+
+# Buckets en segundos: de 1 ms a 2 min (conexiones, comandos y corridas)
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiquetas esperadas {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """El valor se obtiene llamando a `fn` en cada scrape."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        fn = self._functions.get(key)
+        return fn() if fn is not None else self._values.get(key, 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+        return [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [conteo por bucket (+Inf al final), suma, total]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observa la duración del bloque (también si lanza excepción)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()
+            )
+        lines = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = f'le="{_fmt(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            lbl = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{lbl} {_fmt(total)}")
+            lines.append(f"{self.name}_count{lbl} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render() -> str:
+    """Todas las métricas en formato de texto de Prometheus (0.0.4)."""
+    return REGISTRY.render()
+
+
+# ──────────────────────────────────────────────
+# Métricas de Monitor360
+# ──────────────────────────────────────────────
+
+ROUTER_CONNECT_SECONDS = histogram(
+    "monitor360_router_connect_seconds",
+    "Latencia de conexión a la API de RouterOS",
+    ["router", "result"],
+)
+ROUTER_CONNECT_FAILURES = counter(
+    "monitor360_router_connect_failures_total",
+    "Conexiones a RouterOS fallidas (todas las contraseñas)",
+    ["router"],
+)
+ROUTEROS_COMMAND_SECONDS = histogram(
+    "monitor360_routeros_command_seconds",
+    "Latencia de comandos RouterOS por ruta de recurso",
+    ["path", "command"],
+)
+ROUTEROS_COMMAND_ERRORS = counter(
+    "monitor360_routeros_command_errors_total",
+    "Comandos RouterOS que lanzaron excepción",
+    ["path", "command"],
+)
+UISP_REQUEST_SECONDS = histogram(
+    "monitor360_uisp_request_seconds",
+    "Latencia de requests a la API de UISP",
+    ["endpoint", "result"],
+)
+UISP_RESPONSE_BYTES = counter(
+    "monitor360_uisp_response_bytes_total",
+    "Bytes recibidos de la API de UISP",
+    ["endpoint"],
+)
+STORAGE_WRITE_SECONDS = histogram(
+    "monitor360_storage_write_seconds",
+    "Latencia de escrituras al almacenamiento (Supabase o SQLite)",
+    ["backend", "table", "op", "result"],
+)
+STORAGE_WRITE_ROWS = counter(
+    "monitor360_storage_write_rows_total",
+    "Filas escritas en el almacenamiento (Supabase o SQLite)",
+    ["backend", "table", "op"],
+)
+RUN_SECONDS = histogram(
+    "monitor360_run_seconds",
+    "Duración de corridas de descubrimiento y monitoreo",
+    ["kind"],
+)
+QUEUE_DEPTH = gauge(
+    "monitor360_queue_depth",
+    "Elementos pendientes por cola",
+    ["queue"],
+)
+SPOOL_BYTES = gauge(
+    "monitor360_spool_bytes",
+    "Bytes del spool de escrituras pendientes de enviar",
+    ["spool"],
+)
+SPOOL_LAG_SECONDS = gauge(
+    "monitor360_spool_lag_seconds",
+    "Antigüedad de la escritura más vieja sin enviar",
+    ["spool"],
+)
+SPOOL_RECORDS = counter(
+    "monitor360_spool_records_total",
+    "Registros del spool por resultado "
+    "(appended, shipped, corrupt, dead_letter, rejected)",
+    ["spool", "result"],
+)
+SPOOL_SHIP_FAILURES = counter(
+    "monitor360_spool_ship_failures_total",
+    "Envíos de lotes del spool que fallaron (se reintentan)",
+    ["spool"],
+)
+CACHE_REQUESTS = counter(
+    "monitor360_cache_requests_total",
+    "Consultas a caches por resultado (hit/miss)",
+    ["cache", "result"],
+)
+
+
+@contextmanager
+def observe_write(
+    table: str, op: str, rows: int = 1, backend: str = "supabase"
+) -> Iterator[None]:
+    """Mide una escritura al almacenamiento (latencia, resultado y filas)."""
+    t0 = time.perf_counter()
+    result = "error"
+    try:
+        with child_span(
+            f"db.{op}", {"db.system": backend, "db.table": table, "db.rows": rows}
+        ):
+            yield
+        result = "ok"
+        STORAGE_WRITE_ROWS.inc(rows, backend=backend, table=table, op=op)
+    finally:
+        elapsed = time.perf_counter() - t0
+        STORAGE_WRITE_SECONDS.observe(
+            elapsed, backend=backend, table=table, op=op, result=result
+        )
+        record(f"{backend}_{op}", elapsed)
+
+
+class _InstrumentedResource:
+    """Recurso RouterOS que mide cada comando (`get`, `add`, `call`, ...)."""
+
+    _COMMANDS = ("get", "add", "set", "remove", "call")
+
+    def __init__(self, resource, path: str):
+        self._resource = resource
+        self._path = path
+
+    def __getattr__(self, name):
+        attr = getattr(self._resource, name)
+        if name not in self._COMMANDS or not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                with child_span(
+                    "routeros.command",
+                    {"routeros.path": self._path, "routeros.command": name},
+                ):
+                    return attr(*args, **kwargs)
+            except Exception:
+                ROUTEROS_COMMAND_ERRORS.inc(path=self._path, command=name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                ROUTEROS_COMMAND_SECONDS.observe(elapsed, path=self._path, command=name)
+                record("routeros_command", elapsed)
+
+        return timed
+
+
+class InstrumentedApi:
+    """Envuelve la API de RouterOS para medir comandos por ruta de recurso."""
+
+    def __init__(self, api):
+        self._api = api
+
+    def get_resource(self, path: str, *args, **kwargs):
+        return _InstrumentedResource(
+            self._api.get_resource(path, *args, **kwargs), path
+        )
+
+    def get_binary_resource(self, path: str, *args, **kwargs):
+        return _InstrumentedResource(
+            self._api.get_binary_resource(path, *args, **kwargs), path
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._api, name)
+
+
+__all__ = [
+    "CACHE_REQUESTS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "InstrumentedApi",
+    "QUEUE_DEPTH",
+    "ROUTER_CONNECT_FAILURES",
+    "ROUTER_CONNECT_SECONDS",
+    "ROUTEROS_COMMAND_ERRORS",
+    "ROUTEROS_COMMAND_SECONDS",
+    "RUN_SECONDS",
+    "SPOOL_BYTES",
+    "SPOOL_LAG_SECONDS",
+    "SPOOL_RECORDS",
+    "SPOOL_SHIP_FAILURES",
+    "STORAGE_WRITE_ROWS",
+    "STORAGE_WRITE_SECONDS",
+    "UISP_REQUEST_SECONDS",
+    "UISP_RESPONSE_BYTES",
+    "observe_write",
+    "render",
+]
@@ -1,9 +1,21 @@
 import json
 import logging
 import os
+import socket
+import time
 
 from dotenv import load_dotenv
 from routeros_api import RouterOsApiPool
+from routeros_api.exceptions import RouterOsApiFatalCommunicationError
+
+from app.services.logging_setup import get_logger
+from app.services.metrics import (
+    ROUTER_CONNECT_FAILURES,
+    ROUTER_CONNECT_SECONDS,
+    InstrumentedApi,
+)
+from app.services.timing import record
+from app.services.tracing import child_span
 
 # Cargar variables de entorno
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", ".env")
@@ -16,17 +28,10 @@ TIMEOUT = int(os.getenv("MIKROTIK_TIMEOUT", 5))
 CREDENTIALS_FILE = os.path.join(
     os.path.dirname(__file__), "..", "mikrotik_credentials.json"
 )
-LOG_FILE = os.getenv("LOG_FILE", "monitor360.log")
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-
-# Configurar logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    filemode="a",
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
+
+# El pipeline de logging lo configura la app (`configure_logging`)
 logger = logging.getLogger(__name__)
+log = get_logger(__name__)
 
 
 def load_known_credentials() -> dict:
@@ -61,7 +66,17 @@ def connect_mikrotik_with_learning(ip: str) -> RouterOsApiPool | None:
 
     :param ip: Dirección IP del router MikroTik.
     :return: Instancia de API de RouterOS si la conexión es exitosa, None en caso de fallo.
+             Los comandos de la API devuelta se miden por ruta de recurso.
     """
+    with child_span("routeros.connect", {"router.ip": ip}) as s:
+        api = _connect(ip, s)
+        if s is not None:
+            s.set_attribute("router.connected", api is not None)
+        return api
+
+
+def _connect(ip: str, span) -> RouterOsApiPool | None:
+    t0 = time.perf_counter()
     known = load_known_credentials()
     passwords_to_try = []
 
@@ -75,7 +90,8 @@ def connect_mikrotik_with_learning(ip: str) -> RouterOsApiPool | None:
             passwords_to_try.append(pwd)
 
     # Intentar conectarse con cada contraseña
-    for password in passwords_to_try:
+    for attempt, password in enumerate(passwords_to_try, 1):
+        api_pool = None
         try:
             api_pool = RouterOsApiPool(
                 host=ip,
@@ -83,24 +99,77 @@ def connect_mikrotik_with_learning(ip: str) -> RouterOsApiPool | None:
                 password=password,
                 port=PORT,
                 plaintext_login=True,
-                timeout=TIMEOUT,
             )
+            # RouterOsApiPool no recibe timeout en el constructor
+            api_pool.set_timeout(TIMEOUT)
             api = api_pool.get_api()
-            logger.info(f"Conexión exitosa a {ip} con contraseña '{password}'")
+            _disable_nagle(api_pool)
 
             # Guardar la contraseña exitosa
             known[ip] = password
             save_known_credentials(known)
 
-            return api
+            elapsed = time.perf_counter() - t0
+            log.info(
+                "routeros.connected",
+                router_ip=ip,
+                attempt=attempt,
+                duration_ms=round(elapsed * 1000, 1),
+            )
+            ROUTER_CONNECT_SECONDS.observe(elapsed, router=ip, result="ok")
+            record("router_connect", elapsed)
+            return InstrumentedApi(api)
         except Exception as e:
-            logger.warning(f"Fallo conexión a {ip} con '{password}': {e}")
+            # Nunca se loguea la contraseña, solo el número de intento
+            error = _error_message(e)
+            log.warning(
+                "routeros.auth_failed", router_ip=ip, attempt=attempt, error=error
+            )
+            if span is not None:
+                span.add_event("auth_failed", error=error)
+            # Un login rechazado deja el socket abierto
+            if api_pool is not None:
+                api_pool.disconnect()
 
     # Si ninguna contraseña funcionó
-    logger.error(f"No se pudo conectar a {ip} con ninguna contraseña conocida.")
+    elapsed = time.perf_counter() - t0
+    log.error(
+        "routeros.connect_failed",
+        router_ip=ip,
+        attempts=len(passwords_to_try),
+        duration_ms=round(elapsed * 1000, 1),
+    )
+    ROUTER_CONNECT_SECONDS.observe(elapsed, router=ip, result="error")
+    record("router_connect", elapsed)
+    ROUTER_CONNECT_FAILURES.inc(router=ip)
     return None
 
 
+def _disable_nagle(api_pool) -> None:
+    """
+    `routeros_api` manda cada palabra con un `send` aparte: con Nagle, la
+    segunda palabra espera el ACK retardado (~40 ms) de la primera en
+    cada comando.
+    """
+    sock = getattr(getattr(api_pool, "socket", None), "socket", None)
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError as e:
+        logger.debug(f"No se pudo desactivar Nagle: {e}")
+
+
+def _error_message(exc: Exception) -> str:
+    """Mensaje del error sin el comando enviado (el de login lleva la contraseña)."""
+    original = getattr(exc, "original_message", None)
+    if isinstance(original, bytes):
+        return original.decode(errors="replace")
+    if isinstance(exc, RouterOsApiFatalCommunicationError):
+        return "fatal error"
+    return str(exc)
+
+
 def scan_mikrotiks(ip_list: list[str]) -> dict[str, bool]:
     """
     Escanea una lista de IPs de MikroTik e intenta conectarse a cada una.
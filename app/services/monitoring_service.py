@@ -1,12 +1,11 @@
 # File: app/services/monitoring_service.py
-"""Monitorea capacidad/estado de clientes y persiste resultados en Supabase.
+"""Monitorea capacidad/estado de clientes y persiste los resultados.
    ▸ Ejecuta `traffic‑generator` desde MikroTik a cada cliente.
    ▸ Consulta señal desde UISP (si existe).
    ▸ Guarda/actualiza registro de cliente en tabla `topologia`.
-   ▸ Genera alarma en Supabase vía `raise_alarm` cuando se superan umbrales.
+   ▸ Genera alarma vía `raise_alarm` cuando se superan umbrales.
 """
 
-import logging
 import os
 import time
 from datetime import datetime, timezone
@@ -14,10 +13,15 @@ from typing import Any, Dict, List
 
 from dotenv import load_dotenv
 
+from app.services.alarm_correlator import get_alarm_correlator
 from app.services.alarms_service import raise_alarm
+from app.services.jobs import check_cancelled, report_progress
+from app.services.logging_setup import get_logger
+from app.services.metrics import RUN_SECONDS
 from app.services.mikrotik_service import connect_mikrotik_with_learning
-from app.services.uisp_service import get_uisp_device_stats, get_uisp_devices
-from app.supabase_client import supabase
+from app.services.storage import get_storage
+from app.services.tracing import start_span
+from app.services.uisp_service import get_uisp_device_records, get_uisp_device_stats
 
 # ──────────────────────────────────────────────
 # Configuración y logger
@@ -31,13 +35,8 @@ THRESHOLD_CAPACITY = float(os.getenv("THRESHOLD_CAPACITY_MBPS", "15"))
 TEST_RATE = os.getenv("TEST_RATE", "10M")  # "10M", "50M", etc.
 TEST_DURATION = int(os.getenv("TEST_DURATION", "10"))  # segundos
 
-log_file = os.getenv("LOG_FILE", "monitor360.log")
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
-logger = logging.getLogger(__name__)
+# El pipeline de logging lo configura la app (`configure_logging`)
+log = get_logger(__name__)
 
 
 # ──────────────────────────────────────────────
@@ -45,6 +44,10 @@ logger = logging.getLogger(__name__)
 # ──────────────────────────────────────────────
 
 
+class RouterUnreachable(RuntimeError):
+    """No se pudo conectar al MikroTik de origen de la prueba."""
+
+
 def _parse_rate(rate_str: str) -> float:
     """Convierte '10M' o '25Mbps' → 10.0 / 25.0 (Mbps)."""
     if not rate_str:
@@ -60,7 +63,7 @@ def _run_capacity_test(router_ip: str, client_ip: str) -> Dict[str, Any]:
     """Lanza traffic‑generator UDP desde router → cliente y devuelve pérdida/tx_rate."""
     api = connect_mikrotik_with_learning(router_ip)
     if api is None:
-        raise RuntimeError(f"No se pudo conectar a MikroTik {router_ip}")
+        raise RouterUnreachable(f"No se pudo conectar a MikroTik {router_ip}")
 
     tg = api.get_resource("/tool/traffic-generator")
     test_name = f"tg_{client_ip.replace('.', '_')}"
@@ -80,8 +83,12 @@ def _run_capacity_test(router_ip: str, client_ip: str) -> Dict[str, Any]:
     api.get_binary_resource("/tool/traffic-generator").call(
         "start", {"numbers": test_name}
     )
-    logger.info(
-        f"▶️ [{router_ip}] → {client_ip} | rate={TEST_RATE} dur={TEST_DURATION}s"
+    log.info(
+        "monitoring.capacity_test_started",
+        router_ip=router_ip,
+        client_ip=client_ip,
+        rate=TEST_RATE,
+        duration_s=TEST_DURATION,
     )
 
     time.sleep(TEST_DURATION + 1)
@@ -106,16 +113,41 @@ def monitor_and_store(
     router_ips: List[str], client_ips: List[str]
 ) -> List[Dict[str, Any]]:
     """Ejecuta pruebas a cada <router_ip, client_ip> y guarda en Supabase."""
+    with start_span(
+        "monitoring.run",
+        {"routers": len(router_ips), "clients": len(client_ips)},
+    ):
+        return _monitor_and_store(router_ips, client_ips)
+
+
+def _monitor_and_store(
+    router_ips: List[str], client_ips: List[str]
+) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
 
     # Cache de dispositivos UISP para señales
-    dev_cache = get_uisp_devices()
+    dev_cache = get_uisp_device_records()
     ip_to_uisp = {dev["ipAddress"]: dev for dev in dev_cache if dev.get("ipAddress")}
 
+    # Cada cliente cuelga del router que lo prueba (para agrupar alarmas)
+    get_alarm_correlator().add_edges(
+        (router_ip, client_ip) for router_ip in router_ips for client_ip in client_ips
+    )
+
+    total = len(router_ips) * len(client_ips)
+    done = 0
     for router_ip in router_ips:
         for client_ip in client_ips:
+            check_cancelled()
+            report_progress(done / total if total else 0, f"{router_ip} → {client_ip}")
+            done += 1
             try:
-                cap = _run_capacity_test(router_ip, client_ip)
+                with start_span(
+                    "monitoring.capacity_test",
+                    {"router.ip": router_ip, "client.ip": client_ip},
+                ):
+                    cap = _run_capacity_test(router_ip, client_ip)
 
                 # Datos UISP si existe
                 uisp_stats = {}
@@ -123,29 +155,37 @@ def monitor_and_store(
                     uisp_stats = get_uisp_device_stats(ip_to_uisp[client_ip]["id"])
 
                 # Upsert en tabla topologia
-                supabase.table("topologia").upsert(
-                    {
-                        "ip": client_ip,
-                        "tipo": "measurement",
-                        "nombre": ip_to_uisp.get(client_ip, {})
-                        .get("identification", {})
-                        .get("name", client_ip),
-                        "signal": uisp_stats.get("rssi"),
-                        "velocidad_link": f"{cap['tx_rate']}Mbps",
-                        "last_seen": datetime.now(timezone.utc).isoformat(),
-                    }
-                ).execute()
+                get_storage().upsert_topology(
+                    [
+                        {
+                            "ip": client_ip,
+                            "tipo": "measurement",
+                            "nombre": ip_to_uisp.get(client_ip, {})
+                            .get("identification", {})
+                            .get("name", client_ip),
+                            "signal": uisp_stats.get("rssi"),
+                            "velocidad_link": f"{cap['tx_rate']}Mbps",
+                            "last_seen": datetime.now(timezone.utc).isoformat(),
+                        }
+                    ]
+                )
 
                 # Alarmas
                 if cap["loss"] > THRESHOLD_LOSS:
                     raise_alarm(
                         "critical",
                         f"{client_ip}: pérdida {cap['loss']}% > {THRESHOLD_LOSS}%",
+                        source="monitoring",
+                        metric="loss",
+                        target=client_ip,
                     )
                 if cap["tx_rate"] < THRESHOLD_CAPACITY:
                     raise_alarm(
                         "warning",
                         f"{client_ip}: capacidad {cap['tx_rate']} Mbps < {THRESHOLD_CAPACITY} Mbps",
+                        source="monitoring",
+                        metric="capacity",
+                        target=client_ip,
                     )
                 if (
                     uisp_stats.get("rssi") is not None
@@ -154,18 +194,39 @@ def monitor_and_store(
                     raise_alarm(
                         "warning",
                         f"{client_ip}: señal {uisp_stats['rssi']} dBm < {THRESHOLD_SIGNAL} dBm",
+                        source="monitoring",
+                        metric="signal",
+                        target=client_ip,
                     )
 
-                results.append(
-                    {
-                        "client": client_ip,
-                        "capacity": cap,
-                        "signal": uisp_stats.get("rssi"),
-                    }
+                result = {
+                    "client": client_ip,
+                    "capacity": cap,
+                    "signal": uisp_stats.get("rssi"),
+                }
+                results.append(result)
+                report_progress(partial=result)
+            except RouterUnreachable as exc:
+                raise_alarm(
+                    "critical",
+                    f"Router {router_ip} inalcanzable",
+                    source="discovery",
+                    metric="reachability",
+                    target=router_ip,
+                )
+                log.error(
+                    "monitoring.router_unreachable",
+                    router_ip=router_ip,
+                    client_ip=client_ip,
+                    error=str(exc),
                 )
             except Exception as exc:
-                logger.error(
-                    f"❌ Error monitoreando {client_ip} via {router_ip}: {exc}"
+                log.error(
+                    "monitoring.capacity_test_failed",
+                    router_ip=router_ip,
+                    client_ip=client_ip,
+                    error=str(exc),
                 )
 
+    RUN_SECONDS.observe(time.perf_counter() - t0, kind="monitoring")
     return results
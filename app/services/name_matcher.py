@@ -0,0 +1,124 @@
+# File: app/services/name_matcher.py
+"""
+Matcher difuso de nombres cliente ↔ dispositivo UISP.
+
+- Normaliza nombres (minúsculas, sin acentos, sin sufijos de estado como
+  "ACTIVO" que agrega MikroWisp).
+- Indexa los nombres de dispositivos por trigramas para preseleccionar
+  candidatos y solo calcula `SequenceMatcher.ratio()` sobre los top-k.
+"""
+
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Cantidad de candidatos (por trigramas compartidos) que se puntúan con difflib
+FUZZY_TOP_K = int(os.getenv("FUZZY_TOP_K", "25"))
+
+# Sufijos de estado que MikroWisp agrega al nombre del cliente
+STATUS_SUFFIXES = (
+    "activo",
+    "inactivo",
+    "suspendido",
+    "cortado",
+    "retirado",
+    "moroso",
+    "baja",
+)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_STATUS_TAIL = re.compile(r"(?:\s+(?:%s))+$" % "|".join(STATUS_SUFFIXES))
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """
+    'Cara José Luis  ACTIVO' → 'cara jose luis'.
+
+    Quita acentos, pasa a minúsculas, colapsa separadores y elimina los
+    sufijos de estado al final del nombre.
+    """
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _NON_ALNUM.sub(" ", text).strip()
+    return _STATUS_TAIL.sub("", text)
+
+
+def trigrams(text: str) -> set:
+    """Trigramas con relleno (estilo pg_trgm) para que nombres cortos indexen."""
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class NameMatcher:
+    """
+    Índice invertido trigrama → posiciones de dispositivos.
+
+    `best_match` devuelve el mismo criterio que el barrido completo con
+    difflib: mayor ratio (primer dispositivo en caso de empate) y solo si
+    alcanza el umbral; la diferencia es que solo se puntúan los `top_k`
+    candidatos con más trigramas en común.
+    """
+
+    def __init__(self, names: Sequence[Optional[str]], top_k: int = FUZZY_TOP_K):
+        self.top_k = top_k
+        self.devices: List = []
+        self._names: List[str] = [normalize_name(n) for n in names]
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        for pos, name in enumerate(self._names):
+            if name:
+                for tri in trigrams(name):
+                    self._index[tri].append(pos)
+
+    @classmethod
+    def from_devices(cls, devices: Iterable, top_k: int = FUZZY_TOP_K):
+        devices = list(devices)
+        matcher = cls(
+            [(d.get("identification") or {}).get("name") for d in devices], top_k
+        )
+        matcher.devices = devices
+        return matcher
+
+    def candidates(self, name: str) -> List[int]:
+        """Posiciones con más trigramas compartidos (desempate por posición)."""
+        counts: Dict[int, int] = defaultdict(int)
+        for tri in trigrams(name):
+            for pos in self._index.get(tri, ()):
+                counts[pos] += 1
+        ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [pos for pos, _ in ranked[: self.top_k]]
+
+    def best_match(
+        self, name: Optional[str], threshold: float
+    ) -> Optional[Tuple[int, float]]:
+        """Devuelve (posición, ratio) del mejor candidato ≥ umbral, o None."""
+        query = normalize_name(name)
+        if not query:
+            return None
+        best_pos, best_ratio = None, 0.0
+        sm = SequenceMatcher(None, query, "")
+        for pos in sorted(self.candidates(query)):
+            sm.set_seq2(self._names[pos])
+            # Cotas superiores baratas antes del ratio exacto
+            if sm.real_quick_ratio() <= best_ratio or sm.quick_ratio() <= best_ratio:
+                continue
+            ratio = sm.ratio()
+            if ratio > best_ratio:
+                best_pos, best_ratio = pos, ratio
+        if best_pos is None or best_ratio < threshold:
+            return None
+        return best_pos, best_ratio
+
+    def best_device(self, name: Optional[str], threshold: float):
+        """Igual que `best_match` pero devuelve (dispositivo, ratio)."""
+        hit = self.best_match(name, threshold)
+        if hit is None:
+            return None
+        return self.devices[hit[0]], hit[1]
+
+
+__all__ = ["NameMatcher", "normalize_name", "trigrams"]
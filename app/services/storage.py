@@ -0,0 +1,495 @@
+# File: app/services/storage.py
+"""
+Persistencia de `topologia` y `alarmas` detrás de una interfaz común.
+
+Los servicios no hablan con Supabase directamente: piden `get_storage()`
+y usan `upsert_topology`, `insert_alarms`, `query_alarms`, `get_alarm`
+y `count_alarms`. El backend se elige con `STORAGE_BACKEND`:
+
+- `supabase` (por defecto): tablas remotas vía supabase-py (PostgREST).
+  Con `STORAGE_WRITE_BEHIND=1` (opcional) las escrituras van primero
+  a un spool local por proceso y se envían en segundo plano
+  (`write_spool`); sin slot libre se escribe directo a Supabase.
+- `sqlite`: base embebida en `STORAGE_SQLITE_PATH`, en modo WAL, con
+  escrituras en lote dentro de una sola transacción e índices por
+  ip (clave primaria de `topologia`), timestamp y severidad. Pensado
+  para instalaciones de un solo sitio, sin dependencias de red.
+
+Toda escritura pasa por `observe_write` (métricas y span `db.<op>`),
+con la etiqueta `backend` del almacenamiento usado.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.services.metrics import observe_write
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "monitor360.db")
+# Espera máxima (s) por el lock de escritura de otro proceso
+STORAGE_SQLITE_TIMEOUT = float(os.getenv("STORAGE_SQLITE_TIMEOUT", "5"))
+# Escrituras a Supabase vía spool local + envío en segundo plano
+STORAGE_WRITE_BEHIND = os.getenv("STORAGE_WRITE_BEHIND", "0") == "1"
+# Columna única de `alarmas` para reintentos sin duplicados ("": desactivada).
+# Antes de activarla, en Supabase:
+# `alter table alarmas add column idempotency_key text unique;`
+ALARM_IDEMPOTENCY_COLUMN = os.getenv("ALARM_IDEMPOTENCY_COLUMN", "")
+
+BACKENDS = ("supabase", "sqlite")
+
+ALARM_COLUMNS = ("id", "client_id", "severity", "message", "timestamp")
+TOPOLOGY_COLUMNS = (
+    "ip",
+    "tipo",
+    "puerto",
+    "nombre",
+    "signal",
+    "velocidad_link",
+    "last_seen",
+)
+# Un nodo por (ip, tipo, puerto): router, puerto degradado, cliente, ...
+TOPOLOGY_KEY = ("ip", "tipo", "puerto")
+
+Timestamp = Union[str, datetime]
+
+
+def dedupe_topology(rows: Sequence[Dict]) -> List[Dict]:
+    """Una fila por nodo (la última gana), conservando el orden de llegada."""
+    latest: Dict[Tuple, Dict] = {}
+    for row in rows:
+        key = tuple(row.get(k) or "" for k in TOPOLOGY_KEY)
+        latest.pop(key, None)
+        latest[key] = row
+    return list(latest.values())
+
+
+def _by_columns(rows: Sequence[Dict]) -> Dict[Tuple[str, ...], List[Dict]]:
+    """Agrupa filas por su conjunto de columnas (lotes con claves uniformes)."""
+    groups: Dict[Tuple[str, ...], List[Dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(row)
+    return groups
+
+
+class Storage(ABC):
+    """Interfaz de persistencia. Las implementaciones son thread-safe."""
+
+    name = "base"
+
+    def connect(self):
+        """Abre conexiones/cliente por adelantado (precalentamiento)."""
+
+    @abstractmethod
+    def upsert_topology(self, rows: Sequence[Dict]) -> int:
+        """Inserta o actualiza nodos de `topologia`; devuelve filas escritas."""
+
+    @abstractmethod
+    def insert_alarms(self, rows: Sequence[Dict]) -> int:
+        """Inserta alarmas en un solo lote; devuelve filas escritas."""
+
+    @abstractmethod
+    def query_alarms(
+        self,
+        columns: Sequence[str],
+        limit: int,
+        before: Optional[Tuple[str, int]] = None,
+        severity: Optional[Sequence[str]] = None,
+        client_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """
+        Hasta `limit` alarmas ordenadas por (timestamp, id) descendente,
+        estrictamente anteriores a `before` (keyset) si se indica.
+        """
+
+    @abstractmethod
+    def get_alarm(self, alarm_id: int, columns: Sequence[str]) -> Optional[Dict]:
+        """Alarma por id (solo `columns`) o None si no existe."""
+
+    @abstractmethod
+    def count_alarms(
+        self,
+        severity: Optional[Sequence[str]] = None,
+        client_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> int:
+        """Cantidad de alarmas con los mismos filtros que `query_alarms`."""
+
+    def close(self, timeout: float = 10.0):
+        pass
+
+
+# ──────────────────────────────────────────────
+# Supabase
+# ──────────────────────────────────────────────
+
+
+class SupabaseStorage(Storage):
+    """Tablas de Supabase vía el cliente global (`app.supabase_client`)."""
+
+    name = "supabase"
+
+    @staticmethod
+    def _client():
+        from app.supabase_client import supabase
+
+        return supabase
+
+    def connect(self):
+        self._client()
+
+    def upsert_topology(self, rows):
+        rows = dedupe_topology(rows)
+        # PostgREST exige las mismas claves en todas las filas del lote
+        for group in _by_columns(rows).values():
+            with observe_write("topologia", "upsert", len(group), self.name):
+                self._client().table("topologia").upsert(group).execute()
+        return len(rows)
+
+    def insert_alarms(self, rows):
+        rows = list(rows)
+        if not rows:
+            return 0
+        with observe_write("alarmas", "insert", len(rows), self.name):
+            table = self._client().table("alarmas")
+            if ALARM_IDEMPOTENCY_COLUMN and ALARM_IDEMPOTENCY_COLUMN in rows[0]:
+                # Un reintento de un lote ya insertado no duplica alarmas
+                table.upsert(
+                    rows, on_conflict=ALARM_IDEMPOTENCY_COLUMN, ignore_duplicates=True
+                ).execute()
+            else:
+                table.insert(rows).execute()
+        return len(rows)
+
+    @staticmethod
+    def _filtered(query, severity, client_id, since, until):
+        if severity:
+            query = query.in_("severity", list(severity))
+        if client_id is not None:
+            query = query.eq("client_id", client_id)
+        if since is not None:
+            query = query.gte("timestamp", since.isoformat())
+        if until is not None:
+            query = query.lt("timestamp", until.isoformat())
+        return query
+
+    def query_alarms(
+        self,
+        columns,
+        limit,
+        before=None,
+        severity=None,
+        client_id=None,
+        since=None,
+        until=None,
+    ):
+        query = self._client().table("alarmas").select(",".join(columns))
+        query = self._filtered(query, severity, client_id, since, until)
+        if before is not None:
+            ts, last_id = before
+            query = query.or_(
+                f'timestamp.lt."{ts}",and(timestamp.eq."{ts}",id.lt.{last_id})'
+            )
+        return (
+            query.order("timestamp", desc=True)
+            .order("id", desc=True)
+            .limit(limit)
+            .execute()
+            .data
+        )
+
+    def get_alarm(self, alarm_id, columns):
+        rows = (
+            self._client()
+            .table("alarmas")
+            .select(",".join(columns))
+            .eq("id", alarm_id)
+            .limit(1)
+            .execute()
+            .data
+        )
+        return rows[0] if rows else None
+
+    def count_alarms(self, severity=None, client_id=None, since=None, until=None):
+        # HEAD + count: no viaja ninguna fila
+        query = self._client().table("alarmas").select("id", count="exact", head=True)
+        query = self._filtered(query, severity, client_id, since, until)
+        return query.execute().count or 0
+
+
+# ──────────────────────────────────────────────
+# SQLite embebido
+# ──────────────────────────────────────────────
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alarmas (
+    id INTEGER PRIMARY KEY,
+    client_id INTEGER,
+    severity TEXT NOT NULL,
+    message TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alarmas_timestamp ON alarmas (timestamp, id);
+CREATE INDEX IF NOT EXISTS alarmas_severity ON alarmas (severity, timestamp, id);
+CREATE INDEX IF NOT EXISTS alarmas_client ON alarmas (client_id, timestamp, id);
+
+CREATE TABLE IF NOT EXISTS topologia (
+    ip TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    puerto TEXT NOT NULL DEFAULT '',
+    nombre TEXT,
+    signal REAL,
+    velocidad_link TEXT,
+    last_seen TEXT,
+    PRIMARY KEY (ip, tipo, puerto)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS topologia_last_seen ON topologia (last_seen);
+"""
+
+
+def _utc(value: Timestamp) -> str:
+    """
+    ISO-8601 en UTC con microsegundos: formato fijo para que el orden de
+    texto de SQLite coincida con el cronológico.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+class SqliteStorage(Storage):
+    """
+    Base SQLite local. Una única conexión escribe (serializada con un
+    lock); cada hilo lee con su propia conexión, que en WAL no bloquea
+    ni espera al escritor. `":memory:"` usa una sola conexión para todo.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = STORAGE_SQLITE_PATH):
+        self.path = path
+        self._memory = path == ":memory:"
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        if not self._memory:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._writer = self._connect()
+        with self._lock, self._writer:
+            self._writer.executescript(_SQLITE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, timeout=STORAGE_SQLITE_TIMEOUT, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL no corrompe ante un corte: a lo sumo pierde el
+        # último commit, y evita un fsync por transacción
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Connection]:
+        if self._memory:
+            with self._lock:
+                yield self._writer
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._lock:
+                self._readers.append(conn)
+        yield conn
+
+    def _write(self, sql_rows: Dict[str, List[Tuple]]):
+        """Ejecuta cada sentencia con sus filas en una sola transacción."""
+        with self._lock, self._writer:
+            for sql, params in sql_rows.items():
+                self._writer.executemany(sql, params)
+
+    def upsert_topology(self, rows):
+        rows = dedupe_topology(rows)
+        if not rows:
+            return 0
+        statements: Dict[str, List[Tuple]] = {}
+        for group in _by_columns(rows).values():
+            cols = [c for c in TOPOLOGY_COLUMNS if c in group[0]]
+            if "puerto" not in cols:
+                cols.append("puerto")
+            updates = [c for c in cols if c not in TOPOLOGY_KEY]
+            sql = (
+                f"INSERT INTO topologia ({', '.join(cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))}) "
+                f"ON CONFLICT ({', '.join(TOPOLOGY_KEY)}) DO "
+                + (
+                    "UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates)
+                    if updates
+                    else "NOTHING"
+                )
+            )
+            statements[sql] = [
+                tuple((row.get(c) or "") if c == "puerto" else row.get(c) for c in cols)
+                for row in group
+            ]
+        with observe_write("topologia", "upsert", len(rows), self.name):
+            self._write(statements)
+        return len(rows)
+
+    def insert_alarms(self, rows):
+        rows = list(rows)
+        statements: Dict[str, List[Tuple]] = {}
+        for group in _by_columns(rows).values():
+            cols = [c for c in ALARM_COLUMNS if c in group[0]]
+            sql = (
+                f"INSERT INTO alarmas ({', '.join(cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))})"
+            )
+            statements[sql] = [
+                tuple(_utc(row[c]) if c == "timestamp" else row[c] for c in cols)
+                for row in group
+            ]
+        if statements:
+            with observe_write("alarmas", "insert", len(rows), self.name):
+                self._write(statements)
+        return len(rows)
+
+    @staticmethod
+    def _where(severity, client_id, since, until, before=None) -> Tuple[str, List]:
+        clauses, params = [], []
+        if severity:
+            clauses.append(f"severity IN ({', '.join('?' * len(severity))})")
+            params.extend(severity)
+        if client_id is not None:
+            clauses.append("client_id = ?")
+            params.append(client_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_utc(since))
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(_utc(until))
+        if before is not None:
+            ts, last_id = _utc(before[0]), before[1]
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend((ts, ts, last_id))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @staticmethod
+    def _select(columns: Sequence[str]) -> str:
+        invalid = set(columns) - set(ALARM_COLUMNS)
+        if invalid:
+            raise ValueError(f"Columnas inválidas: {sorted(invalid)}")
+        return ", ".join(columns)
+
+    def query_alarms(
+        self,
+        columns,
+        limit,
+        before=None,
+        severity=None,
+        client_id=None,
+        since=None,
+        until=None,
+    ):
+        where, params = self._where(severity, client_id, since, until, before)
+        sql = (
+            f"SELECT {self._select(columns)} FROM alarmas{where} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?"
+        )
+        with self._reading() as conn:
+            return [dict(r) for r in conn.execute(sql, (*params, limit))]
+
+    def get_alarm(self, alarm_id, columns):
+        sql = f"SELECT {self._select(columns)} FROM alarmas WHERE id = ?"
+        with self._reading() as conn:
+            row = conn.execute(sql, (alarm_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count_alarms(self, severity=None, client_id=None, since=None, until=None):
+        where, params = self._where(severity, client_id, since, until)
+        with self._reading() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM alarmas{where}", params
+            ).fetchone()[0]
+
+    def close(self, timeout: float = 10.0):
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self._writer.close()
+
+
+# ──────────────────────────────────────────────
+# Instancia global
+# ──────────────────────────────────────────────
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == "sqlite":
+        return SqliteStorage()
+    if backend == "supabase":
+        if STORAGE_WRITE_BEHIND:
+            from app.services.write_spool import SpooledStorage, SpoolLocked, WriteSpool
+
+            try:
+                return SpooledStorage(SupabaseStorage(), WriteSpool.for_process())
+            except SpoolLocked as e:
+                logger.warning(f"{e}; escribiendo directo a Supabase")
+        return SupabaseStorage()
+    raise ValueError(f"STORAGE_BACKEND inválido: {backend} (opciones: {BACKENDS})")
+
+
+def get_storage() -> Storage:
+    """Almacenamiento global según `STORAGE_BACKEND` (se crea al primer uso)."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage: Optional[Storage]):
+    """Reemplaza el almacenamiento global (tests, benchmarks o `None`)."""
+    global _storage
+    with _storage_lock:
+        _storage = storage
+
+
+def close_storage():
+    """Cierra el almacenamiento global si llegó a crearse."""
+    global _storage
+    with _storage_lock:
+        storage, _storage = _storage, None
+    if storage is not None:
+        storage.close()
+
+
+__all__ = [
+    "BACKENDS",
+    "SqliteStorage",
+    "Storage",
+    "SupabaseStorage",
+    "close_storage",
+    "create_storage",
+    "dedupe_topology",
+    "get_storage",
+    "set_storage",
+]
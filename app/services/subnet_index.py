@@ -0,0 +1,78 @@
+# File: app/services/subnet_index.py
+"""
+Índice de prefijos para asociar clientes por subred.
+
+Se construye una sola vez: prefijo (entero) → IPs de dispositivos ordenadas
+como enteros. Cada búsqueda es un `bisect` O(log n) y devuelve el dispositivo
+numéricamente más cercano dentro del mismo prefijo (desempate: IP menor).
+"""
+
+import ipaddress
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Longitud de prefijo por defecto para el paso de subred (IPv4 / IPv6)
+SUBNET_PREFIX = int(os.getenv("SUBNET_PREFIX", "24"))
+SUBNET_PREFIX_V6 = int(os.getenv("SUBNET_PREFIX_V6", "64"))
+
+
+def _parse_ip(value) -> Optional[Tuple[int, int]]:
+    """'192.168.1.10' → (4, 3232235786); None si no es una IP válida."""
+    try:
+        addr = ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+    return addr.version, int(addr)
+
+
+class SubnetIndex:
+    """Dispositivos agrupados por prefijo, con IPs ordenadas como enteros."""
+
+    def __init__(
+        self,
+        devices: Iterable,
+        prefix: int = SUBNET_PREFIX,
+        prefix_v6: int = SUBNET_PREFIX_V6,
+    ):
+        if not 0 <= prefix <= 32 or not 0 <= prefix_v6 <= 128:
+            raise ValueError(f"Prefijo inválido: /{prefix} (v4), /{prefix_v6} (v6)")
+        self.prefix = prefix
+        self._shift = {4: 32 - prefix, 6: 128 - prefix_v6}
+
+        # Igual que `ip_map`: ante IPs repetidas gana el último dispositivo
+        by_ip: Dict[Tuple[int, int], object] = {}
+        for dev in devices:
+            parsed = _parse_ip(dev.get("ipAddress")) if dev.get("ipAddress") else None
+            if parsed:
+                by_ip[parsed] = dev
+
+        buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for version, value in by_ip:
+            buckets[(version, value >> self._shift[version])].append(value)
+        self._ips = {key: sorted(values) for key, values in buckets.items()}
+        self._devices = by_ip
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def closest(self, ip: str):
+        """Dispositivo más cercano a `ip` dentro de su prefijo, o None."""
+        parsed = _parse_ip(ip) if ip else None
+        if parsed is None:
+            return None
+        version, value = parsed
+        ips = self._ips.get((version, value >> self._shift[version]))
+        if not ips:
+            return None
+        pos = bisect_left(ips, value)
+        # Candidatos: vecino inferior y superior; en empate gana la IP menor
+        best = None
+        for cand in ips[max(pos - 1, 0) : pos + 1]:
+            if best is None or abs(cand - value) < abs(best - value):
+                best = cand
+        return self._devices[(version, best)]
+
+
+__all__ = ["SubnetIndex", "SUBNET_PREFIX", "SUBNET_PREFIX_V6"]
@@ -0,0 +1,217 @@
+# File: app/services/timing.py
+"""
+Tiempos por request (`Server-Timing`) y perfilado por muestreo opcional.
+
+- `ServerTimingMiddleware` abre un contexto de tiempos por request; los
+  servicios registran etapas con `span("load_clients_csv")` o `record()`.
+  Al responder se agrega la cabecera `Server-Timing` (visible en las
+  DevTools del navegador) y se loguea el desglose.
+- Fuera de un request (scripts, trabajos en segundo plano) `span()` es un
+  no-op de costo despreciable.
+- Perfilado: con `?profile=1` (o `PROFILE_REQUESTS=1` para todos) un hilo
+  muestrea cada `PROFILE_INTERVAL_MS` ms las pilas de los hilos que
+  trabajaron en el request y guarda el resultado en formato "folded"
+  (flamegraph.pl / speedscope). La cabecera `X-Profile` indica la URL.
+"""
+
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Perfiles conservados en memoria (los más viejos se descartan)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+
+class RequestTimings:
+    """Duración acumulada y cantidad de llamadas por etapa de un request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+        self.threads: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header(self) -> str:
+        """Valor de la cabecera `Server-Timing` (ms), con el total al final."""
+        with self._lock:
+            items = list(self.spans.items())
+        parts = [
+            f"{name};dur={total * 1000:.1f}" + (f';desc="x{n}"' if n > 1 else "")
+            for name, (total, n) in items
+        ]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(name: str, seconds: float):
+    """Suma `seconds` a la etapa `name` del request actual (si hay uno)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.record(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Mide el bloque como etapa `name` del request actual."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    timings.threads.add(threading.get_ident())
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(name, time.perf_counter() - t0)
+
+
+# ──────────────────────────────────────────────
+# Perfilado por muestreo
+# ──────────────────────────────────────────────
+
+
+class SamplingProfiler:
+    """Muestrea periódicamente las pilas de un conjunto de hilos."""
+
+    def __init__(self, threads: Set[int], interval_ms: float = PROFILE_INTERVAL_MS):
+        self.threads = threads
+        self.interval = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return self.folded()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)})"
+                    )
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Pilas en formato "folded": `a;b;c <muestras>` por línea."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+
+_profiles: "OrderedDict[str, str]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def store_profile(folded: str) -> str:
+    profile_id = uuid.uuid4().hex[:12]
+    with _profiles_lock:
+        _profiles[profile_id] = folded
+        while len(_profiles) > PROFILE_KEEP:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+def get_profile(profile_id: str) -> Optional[str]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+# ──────────────────────────────────────────────
+# Middleware
+# ──────────────────────────────────────────────
+
+
+def _wants_profile(scope) -> bool:
+    if PROFILE_REQUESTS:
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", ["0"])[-1] in ("1", "true")
+
+
+class ServerTimingMiddleware:
+    """Middleware ASGI: contexto de tiempos, `Server-Timing` y perfilado."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        profiler = None
+        if _wants_profile(scope):
+            timings.threads.add(threading.get_ident())
+            profiler = SamplingProfiler(timings.threads).start()
+
+        async def send_wrapper(message):
+            nonlocal profiler
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                value = timings.header()
+                headers.append((b"server-timing", value.encode("latin-1")))
+                if profiler is not None:
+                    profile_id = store_profile(profiler.stop())
+                    profiler = None
+                    headers.append(
+                        (b"x-profile", f"/api/profiles/{profile_id}".encode())
+                    )
+                message = {**message, "headers": headers}
+                if timings.spans:
+                    logger.info(f"{scope.get('path')} Server-Timing: {value}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+            _current.reset(token)
+
+
+__all__ = [
+    "ServerTimingMiddleware",
+    "get_profile",
+    "record",
+    "span",
+]
@@ -2,49 +2,142 @@
 import json
 import logging
 import os
-from typing import Dict, List, Optional
+import time
+from typing import Dict, Iterator, List, Optional
 
-from app.services.client_service import associate_clients_to_devices, load_clients_csv
-from app.services.discovery_service import discover_topology
-from app.services.uisp_service import get_uisp_devices
+from app.services.discovery_service import iter_topology, prefetch_uisp_devices
+from app.services.event_bus import EVENT_TOPOLOGY, get_event_bus, topology_diff
+from app.services.jobs import check_cancelled, report_progress
+from app.services.metrics import RUN_SECONDS
+from app.services.tracing import Span, start_span, use_span
 
 logger = logging.getLogger(__name__)
 
 
-def get_enriched_topology(
+def iter_enriched_topology(
     seed_router_ips: List[str], clients_csv_path: Optional[str] = None
-) -> Dict:
+) -> Iterator[Dict]:
     """
-    Genera topología enriquecida uniendo:
-    - Descubrimiento de red (routers, switches, clientes).
-    - Asociaciones de clientes desde CSV + UISP.
+    Versión incremental de `get_enriched_topology` para respuestas NDJSON.
 
-    Guarda el JSON enriquecido en 'topology_enriched.json'.
-    """
-    # 1. Descubre la topología pura
-    topology = discover_topology(seed_router_ips)
+    Entrega un registro por línea:
+    - {"kind": "node" | "edge", "data": {...}} a medida que se procesa
+      cada router (los dispositivos UISP se descargan en paralelo);
+    - {"kind": "patch", "id": ip, "data": {...}} con la asociación de
+      cada cliente, una vez terminado el descubrimiento;
+    - {"kind": "done", "nodes": n, "edges": m} al final.
 
-    # 2. Carga clientes y dispositivos UISP
-    client_df = load_clients_csv(clients_csv_path)
-    uisp_devices = get_uisp_devices()
+    La corrida completa es una traza `topology.enrich`.
+    """
+    enrich = Span.start("topology.enrich", {"routers.seed": len(seed_router_ips)})
+    try:
+        # 1. Descubre la topología pura (UISP se descarga en paralelo)
+        with use_span(enrich):
+            uisp_future = prefetch_uisp_devices()
+        topology: Dict[str, List[Dict]] = {"nodes": [], "edges": []}
+        for kind, item in iter_topology(seed_router_ips, uisp_future, enrich):
+            topology["nodes" if kind == "node" else "edges"].append(item)
+            yield {"kind": kind, "data": item}
 
-    # 3. Asocia clientes a dispositivos UISP
-    associations = associate_clients_to_devices(client_df, uisp_devices)
-    assoc_map = {a["ip"]: a for a in associations}
+        # 2. Carga clientes y dispositivos UISP
+        t0 = time.perf_counter()
+        check_cancelled()
+        report_progress(message="Asociando clientes")
+        with use_span(enrich), start_span("topology.associate"):
+            assoc_map = _associate(topology, clients_csv_path, uisp_future)
+    except BaseException as exc:
+        enrich.record_exception(exc)
+        enrich.end()
+        raise
+    enrich.end()
 
     # 4. Enriquecer nodos de tipo 'client'
-    enriched_nodes: List[Dict] = []
     for node in topology.get("nodes", []):
         if node.get("type") == "client":
             assoc = assoc_map.get(node.get("id"))
             if assoc:
                 node.update(assoc)
-        enriched_nodes.append(node)
-    topology["nodes"] = enriched_nodes
+                yield {"kind": "patch", "id": node.get("id"), "data": assoc}
 
     # 5. Guardar JSON enriquecido
     output = os.getenv("ENRICHED_OUTPUT", "topology_enriched.json")
     with open(output, "w") as f:
         json.dump(topology, f, indent=2)
     logger.info(f"Topology enriched saved to {output}")
+
+    RUN_SECONDS.observe(time.perf_counter() - t0, kind="enrichment")
+
+    # 6. Publicar solo los cambios respecto de la topología anterior
+    _publish_topology_diff(topology)
+    yield {
+        "kind": "done",
+        "nodes": len(topology["nodes"]),
+        "edges": len(topology["edges"]),
+    }
+
+
+def _associate(topology: Dict, clients_csv_path: Optional[str], uisp_future) -> Dict:
+    # Diferidos: importan pandas, que no hace falta para arrancar la API
+    from app.services.association_cache import associate_incremental
+    from app.services.association_engine import frame_to_records
+    from app.services.client_service import load_clients_csv
+
+    client_df = load_clients_csv(clients_csv_path)
+    uisp_devices = uisp_future.result()
+
+    # 3. Asocia clientes a dispositivos UISP (incremental: solo se recalculan
+    #    filas/dispositivos que cambiaron). Solo se materializan como dict las
+    #    filas de IPs presentes en la topología; ante IPs repetidas gana la
+    #    última fila del CSV.
+    associations = associate_incremental(client_df, uisp_devices)
+    client_ids = {
+        n.get("id") for n in topology.get("nodes", []) if n.get("type") == "client"
+    }
+    hits = associations[associations["ip"].isin(client_ids)]
+    hits = hits.drop_duplicates("ip", keep="last")
+    return {a["ip"]: a for a in frame_to_records(hits)}
+
+
+def get_enriched_topology(
+    seed_router_ips: List[str], clients_csv_path: Optional[str] = None
+) -> Dict:
+    """
+    Genera topología enriquecida uniendo:
+    - Descubrimiento de red (routers, switches, clientes).
+    - Asociaciones de clientes desde CSV + UISP.
+
+    Guarda el JSON enriquecido en 'topology_enriched.json'.
+    """
+    topology: Dict[str, List[Dict]] = {"nodes": [], "edges": []}
+    for record in iter_enriched_topology(seed_router_ips, clients_csv_path):
+        if record["kind"] in ("node", "edge"):
+            topology[record["kind"] + "s"].append(record["data"])
     return topology
+
+
+_last_topology: Optional[Dict] = None
+
+
+def get_topology_snapshot() -> Optional[Dict]:
+    """
+    Última topología enriquecida: la de esta ejecución del proceso o, tras
+    un reinicio, la guardada en `ENRICHED_OUTPUT`. None si no hay ninguna.
+    """
+    global _last_topology
+    if _last_topology is None:
+        output = os.getenv("ENRICHED_OUTPUT", "topology_enriched.json")
+        try:
+            with open(output) as f:
+                _last_topology = json.load(f)
+        except (OSError, ValueError):
+            return None
+    return _last_topology
+
+
+def _publish_topology_diff(topology: Dict):
+    """Envía a los dashboards conectados el diff contra la última topología."""
+    global _last_topology
+    diff = topology_diff(_last_topology, topology)
+    _last_topology = json.loads(json.dumps(topology))
+    if any(diff.values()):
+        get_event_bus().publish(EVENT_TOPOLOGY, diff)
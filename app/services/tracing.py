@@ -0,0 +1,453 @@
+# File: app/services/tracing.py
+"""
+Trazas livianas para las corridas de descubrimiento y monitoreo.
+
+Modelo de spans compatible con OpenTelemetry (trace_id de 16 bytes,
+span_id de 8, padre, atributos, eventos y estado). Cada corrida es una
+traza con spans hijos por router, comando RouterOS, llamada a UISP y
+escritura a la base.
+
+- `start_span(name, attrs)`: context manager; el span actual se propaga
+  por contextvar (también a hilos si se copia el contexto).
+- En generadores el contexto no sobrevive entre `yield`s (Starlette los
+  itera en hilos distintos): ahí se crea el span con `Span.start()` y se
+  usa `use_span(span)` alrededor de cada tramo de trabajo.
+- Exportación en segundo plano (`TRACE_EXPORTER`): `none` (por defecto),
+  `jsonl` (un span por línea en formato OTLP/JSON en `TRACE_EXPORT_PATH`;
+  el archivo crece sin límite, pensado para diagnósticos puntuales) u
+  `otlp` (POST a `TRACE_OTLP_ENDPOINT`/v1/traces).
+
+Análisis rápido de una corrida:
+    python -m app.services.tracing traces.jsonl [--trace <trace_id>]
+"""
+
+import argparse
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
+# Fracción de corridas (trazas raíz) que se registran
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "monitor360")
+
+STATUS_UNSET = "STATUS_CODE_UNSET"
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+
+
+class Span:
+    """Unidad de trabajo con tiempos en nanosegundos (época Unix)."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "events",
+        "status",
+        "status_message",
+        "start_ns",
+        "end_ns",
+        "sampled",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+        else:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+            self.sampled = random.random() < TRACE_SAMPLE_RATIO
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = 0
+        self.end_ns = 0
+
+    @classmethod
+    def start(
+        cls,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional["Span"] = None,
+    ) -> "Span":
+        """Crea e inicia un span (hijo de `parent` o del span actual)."""
+        span = cls(name, parent or current_span(), attributes)
+        span.start_ns = time.time_ns()
+        return span
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append(
+            {"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes}
+        )
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+        self.add_event(
+            "exception",
+            **{"exception.type": type(exc).__name__, "exception.message": str(exc)},
+        )
+
+    def end(self):
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        if self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+        if self.sampled:
+            get_exporter().export(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span en la forma JSON de OTLP (`resourceSpans[].scopeSpans[].spans[]`)."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {
+                    "name": e["name"],
+                    "timeUnixNano": str(e["timeUnixNano"]),
+                    "attributes": _otlp_attributes(e["attributes"]),
+                }
+                for e in self.events
+            ],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    out = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        out.append({"key": key, "value": typed})
+    return out
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """trace_id de la corrida en curso (para correlacionar logs)."""
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Hace de `span` el span actual dentro del bloque (sin terminarlo)."""
+    token = _current.set(span)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Optional[Span] = None,
+) -> Iterator[Span]:
+    """Span hijo del actual (o raíz); registra excepciones y lo termina al salir."""
+    span = Span.start(name, attributes, parent)
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.record_exception(exc)
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+@contextmanager
+def child_span(
+    name: str, attributes: Optional[Dict[str, Any]] = None
+) -> Iterator[Optional[Span]]:
+    """
+    Como `start_span` pero solo dentro de una traza en curso: fuera de una
+    corrida (p. ej. un GET suelto a UISP) no crea trazas raíz.
+    """
+    if _current.get() is None:
+        yield None
+        return
+    with start_span(name, attributes) as span:
+        yield span
+
+
+# ──────────────────────────────────────────────
+# Exportadores
+# ──────────────────────────────────────────────
+
+
+class SpanExporter:
+    """Exporta spans terminados en lotes desde un hilo de fondo."""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 512):
+        self._queue: "queue.Queue[Span]" = queue.Queue(max_queue)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write([s.to_otlp() for s in batch])
+            except Exception as e:
+                logger.warning(f"No se pudieron exportar {len(batch)} spans: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Espera a que se exporten los spans encolados."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def write(self, spans: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Un span OTLP/JSON por línea (se puede reenviar a un collector)."""
+
+    def __init__(self, path: str = TRACE_EXPORT_PATH, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, spans):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """POST OTLP/HTTP JSON a un collector (`/v1/traces`)."""
+
+    def __init__(self, endpoint: str = TRACE_OTLP_ENDPOINT, **kwargs):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        super().__init__(**kwargs)
+
+    def write(self, spans):
+        import requests
+
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(
+                            {"service.name": TRACE_SERVICE_NAME}
+                        )
+                    },
+                    "scopeSpans": [{"scope": {"name": "monitor360"}, "spans": spans}],
+                }
+            ]
+        }
+        requests.post(self.url, json=body, timeout=5).raise_for_status()
+
+
+class _NullExporter:
+    dropped = 0
+
+    def export(self, span: Span):
+        pass
+
+    def flush(self, timeout: float = 0):
+        pass
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    """Exportador global según `TRACE_EXPORTER` (se crea al primer uso)."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                if TRACE_EXPORTER == "jsonl":
+                    _exporter = JsonlSpanExporter()
+                elif TRACE_EXPORTER == "otlp":
+                    _exporter = OtlpHttpSpanExporter()
+                else:
+                    _exporter = _NullExporter()
+                atexit.register(_exporter.flush)
+    return _exporter
+
+
+def set_exporter(exporter):
+    """Reemplaza el exportador global (tests o configuración explícita)."""
+    global _exporter
+    with _exporter_lock:
+        _exporter = exporter
+
+
+# ──────────────────────────────────────────────
+# Análisis de corridas
+# ──────────────────────────────────────────────
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _dur_ms(span: Dict[str, Any]) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Camino crítico de una traza: desde la raíz, en cada nivel el hijo que
+    termina último (el que retrasa el fin del padre).
+    """
+    children = defaultdict(list)
+    roots = []
+    for s in spans:
+        if s["parentSpanId"]:
+            children[s["parentSpanId"]].append(s)
+        else:
+            roots.append(s)
+    if not roots:
+        return []
+    path = [max(roots, key=_dur_ms)]
+    while children.get(path[-1]["spanId"]):
+        path.append(
+            max(children[path[-1]["spanId"]], key=lambda s: int(s["endTimeUnixNano"]))
+        )
+    return path
+
+
+def _attr(span: Dict[str, Any], key: str) -> Optional[str]:
+    for a in span.get("attributes", []):
+        if a["key"] == key:
+            return next(iter(a["value"].values()))
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen de trazas exportadas")
+    parser.add_argument("path", nargs="?", default=TRACE_EXPORT_PATH)
+    parser.add_argument("--trace", help="trace_id (por defecto, la última corrida)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if not spans:
+        print("Sin spans")
+        return
+    trace_id = (
+        args.trace
+        or max(
+            (s for s in spans if not s["parentSpanId"]),
+            key=lambda s: int(s["startTimeUnixNano"]),
+        )["traceId"]
+    )
+    trace = [s for s in spans if s["traceId"] == trace_id]
+    print(f"Traza {trace_id}: {len(trace)} spans")
+
+    print("\nCamino crítico:")
+    for depth, s in enumerate(critical_path(trace)):
+        print(f"  {'  ' * depth}{s['name']:<32} {_dur_ms(s):9.1f} ms")
+
+    routers = [s for s in trace if _attr(s, "router.ip")]
+    totals = defaultdict(float)
+    for s in routers:
+        if s["name"].endswith(".router"):
+            totals[_attr(s, "router.ip")] += _dur_ms(s)
+    print(f"\nRouters más lentos (top {args.top}):")
+    for ip, ms in sorted(totals.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {ip:<18} {ms:9.1f} ms")
+
+    errors = [s for s in trace if s["status"]["code"] == STATUS_ERROR]
+    if errors:
+        print(f"\nSpans con error: {len(errors)}")
+        for s in errors[: args.top]:
+            print(f"  {s['name']}: {s['status']['message']}")
+
+
+__all__ = [
+    "JsonlSpanExporter",
+    "OtlpHttpSpanExporter",
+    "Span",
+    "child_span",
+    "current_span",
+    "current_trace_id",
+    "get_exporter",
+    "set_exporter",
+    "start_span",
+    "use_span",
+]
+
+
+if __name__ == "__main__":
+    main()
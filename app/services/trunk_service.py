@@ -1,60 +1,84 @@
 # File: app/services/trunk_service.py
 import logging
+import time
 from collections import deque
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+from app.services.jobs import check_cancelled, report_progress
+from app.services.metrics import RUN_SECONDS
 from app.services.mikrotik_service import connect_mikrotik_with_learning
+from app.services.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
 # Define tipo de nodo
 NODE_ROUTER = "router"
 
+_last_trunk: Optional[Dict[str, Any]] = None
+
 
 def get_trunk_topology(seed_router_ips: List[str]) -> Dict[str, Any]:
     """
     Genera un subgrafo centrado en los routers troncal y sus enlaces WAN entre ellos.
     Solo incluye nodos y conexiones directas L2 entre routers de la lista.
     """
+    t0 = time.perf_counter()
     nodes = []
     edges = []
     visited = set()
     queue = deque(seed_router_ips)
 
-    while queue:
-        ip = queue.popleft()
-        if ip in visited:
-            continue
-        visited.add(ip)
-
-        api = connect_mikrotik_with_learning(ip)
-        status = api is not None
-        nodes.append(
-            {
-                "id": ip,
-                "label": ip,
-                "type": NODE_ROUTER,
-                "status": status,
-            }
-        )
-        if not status:
-            continue
-
-        # Vecinos L2 por LLDP/CDP
-        try:
-            neigh = api.get_resource("/ip/neighbor").get()
-            for n in neigh:
-                nbr_ip = n.get("address")
-                if nbr_ip in seed_router_ips:
-                    # Añadir arista solo entre routers semilla
-                    edges.append(
-                        {
-                            "source": ip,
-                            "target": nbr_ip,
-                            "interface": n.get("interface"),
-                        }
-                    )
-        except Exception as e:
-            logger.warning(f"Error al obtener vecinos L2 en {ip}: {e}")
-
-    return {"nodes": nodes, "edges": edges}
+    with start_span("trunk.run", {"routers.seed": len(seed_router_ips)}):
+        while queue:
+            ip = queue.popleft()
+            if ip in visited:
+                continue
+            visited.add(ip)
+            check_cancelled()
+            report_progress(len(visited) / len(seed_router_ips), f"Consultando {ip}")
+            with start_span("trunk.router", {"router.ip": ip}):
+                _visit_router(ip, seed_router_ips, nodes, edges)
+
+    RUN_SECONDS.observe(time.perf_counter() - t0, kind="trunk")
+    global _last_trunk
+    _last_trunk = {"nodes": nodes, "edges": edges}
+    return _last_trunk
+
+
+def get_trunk_snapshot() -> Optional[Dict[str, Any]]:
+    """Último subgrafo troncal generado en este proceso (None si no hay)."""
+    return _last_trunk
+
+
+def _visit_router(
+    ip: str, seed_router_ips: List[str], nodes: List[Dict], edges: List[Dict]
+):
+    api = connect_mikrotik_with_learning(ip)
+    status = api is not None
+    nodes.append(
+        {
+            "id": ip,
+            "label": ip,
+            "type": NODE_ROUTER,
+            "status": status,
+        }
+    )
+    if not status:
+        return
+
+    # Vecinos L2 por LLDP/CDP
+    try:
+        neigh = api.get_resource("/ip/neighbor").get()
+        for n in neigh:
+            nbr_ip = n.get("address")
+            if nbr_ip in seed_router_ips:
+                # Añadir arista solo entre routers semilla
+                edges.append(
+                    {
+                        "source": ip,
+                        "target": nbr_ip,
+                        "interface": n.get("interface"),
+                    }
+                )
+    except Exception as e:
+        logger.warning(f"Error al obtener vecinos L2 en {ip}: {e}")
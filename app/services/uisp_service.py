@@ -1,10 +1,18 @@
 # File: app/services/uisp_service.py
+import codecs
+import json
 import logging
 import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import requests
 import urllib3
 
+from app.services.metrics import UISP_REQUEST_SECONDS, UISP_RESPONSE_BYTES
+from app.services.timing import span
+from app.services.tracing import child_span
+
 # Suprimir warnings de certificados inseguros
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -16,6 +24,285 @@ UISP_LEGACY_TOKEN = os.getenv("UISP_LEGACY_TOKEN")
 
 HEADERS = {"X-Auth-Token": UISP_LEGACY_TOKEN}
 
+# Tamaño de bloque al descargar el listado de dispositivos en streaming
+STREAM_CHUNK_SIZE = int(os.getenv("UISP_STREAM_CHUNK_SIZE", 64 * 1024))
+
+
+class UispDevice:
+    """
+    Registro compacto de un dispositivo UISP.
+
+    Solo conserva los campos que usa Monitor360 (id, ipAddress, mac,
+    identification.{id,name,mac,hostname}, parentId, rssi). Expone `get()` y
+    `[]` con las mismas claves que el dict crudo de UISP, así que puede
+    reemplazarlo en los servicios sin cambios.
+    """
+
+    __slots__ = (
+        "id",
+        "ip_address",
+        "mac",
+        "ident_id",
+        "name",
+        "ident_mac",
+        "hostname",
+        "parent_id",
+        "rssi",
+    )
+
+    def __init__(
+        self,
+        id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        mac: Optional[str] = None,
+        ident_id: Optional[str] = None,
+        name: Optional[str] = None,
+        ident_mac: Optional[str] = None,
+        hostname: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        rssi: Optional[float] = None,
+    ):
+        self.id = id
+        self.ip_address = ip_address
+        self.mac = mac
+        self.ident_id = ident_id
+        self.name = name
+        self.ident_mac = ident_mac
+        self.hostname = hostname
+        self.parent_id = parent_id
+        self.rssi = rssi
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "UispDevice":
+        """Proyecta un dispositivo crudo de la API UISP al registro compacto."""
+        ident = raw.get("identification") or {}
+        return cls(
+            id=raw.get("id"),
+            ip_address=raw.get("ipAddress"),
+            mac=raw.get("mac"),
+            ident_id=ident.get("id"),
+            name=ident.get("name"),
+            ident_mac=ident.get("mac"),
+            hostname=ident.get("hostname"),
+            parent_id=raw.get("parentId"),
+            rssi=raw.get("rssi"),
+        )
+
+    @property
+    def identification(self) -> Dict[str, Any]:
+        # Sin las claves vacías: `.get("name", ip)` cae al default como con
+        # el dict crudo de UISP
+        ident = {
+            "id": self.ident_id,
+            "name": self.name,
+            "mac": self.ident_mac,
+            "hostname": self.hostname,
+        }
+        return {k: v for k, v in ident.items() if v is not None}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Devuelve el registro con la forma (reducida) del dict de UISP."""
+        return {
+            "id": self.id,
+            "ipAddress": self.ip_address,
+            "mac": self.mac,
+            "identification": self.identification,
+            "parentId": self.parent_id,
+            "rssi": self.rssi,
+        }
+
+    # Acceso estilo dict, compatible con el código que consume UISP crudo
+    _KEYS = {
+        "id": "id",
+        "ipAddress": "ip_address",
+        "mac": "mac",
+        "parentId": "parent_id",
+        "rssi": "rssi",
+    }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "identification":
+            return self.identification
+        attr = self._KEYS.get(key)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "identification":
+            return self.identification
+        try:
+            return getattr(self, self._KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key == "identification" or key in self._KEYS
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, UispDevice):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"UispDevice(id={self.id!r}, ip={self.ip_address!r}, name={self.name!r})"
+
+
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Decodifica de forma incremental un JSON cuyo nivel superior es una lista
+    (o un objeto `{"data": [...]}`) y entrega cada elemento apenas está completo.
+
+    Nunca materializa la lista entera: en memoria solo vive el buffer de texto
+    pendiente y el elemento que se está decodificando.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    it = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        try:
+            chunk = next(it)
+        except StopIteration:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+            pos = 0
+            return False
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        return True
+
+    def skip_ws() -> Optional[str]:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return None
+
+    first = skip_ws()
+    if first is None:
+        return
+    if first == "{":
+        # Respuesta envuelta: no es el caso habitual, se decodifica completa
+        while fill():
+            pass
+        data = json.loads(buf[pos:])
+        for item in data.get("data", []) if isinstance(data, dict) else []:
+            yield item
+        return
+    if first != "[":
+        raise ValueError(f"JSON inesperado: se esperaba una lista, llegó {first!r}")
+    pos += 1
+
+    while True:
+        ch = skip_ws()
+        if ch is None:
+            raise ValueError("JSON truncado: falta ']' de cierre")
+        if ch == "]":
+            return
+        if ch == ",":
+            pos += 1
+            continue
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # Un número al final del buffer podría seguir en el próximo bloque
+            if end == len(buf) and not eof and ch not in '{["':
+                if fill():
+                    continue
+            break
+        pos = end
+        yield item
+
+
+def parse_uisp_device_stream(chunks: Iterable[bytes]) -> Iterator[UispDevice]:
+    """Convierte el cuerpo (en bloques) de `/devices` en registros `UispDevice`."""
+    for raw in _iter_json_array(chunks):
+        if isinstance(raw, dict):
+            yield UispDevice.from_dict(raw)
+
+
+def _counted(chunks: Iterable[bytes], endpoint: str) -> Iterator[bytes]:
+    for chunk in chunks:
+        UISP_RESPONSE_BYTES.inc(len(chunk), endpoint=endpoint)
+        yield chunk
+
+
+def _get(url: str, endpoint: str) -> requests.Response:
+    """GET a UISP con métricas de latencia y bytes."""
+    t0 = time.perf_counter()
+    result = "error"
+    try:
+        with child_span("uisp.get", {"uisp.endpoint": endpoint}):
+            resp = requests.get(url, headers=HEADERS, timeout=10, verify=False)
+            resp.raise_for_status()
+        UISP_RESPONSE_BYTES.inc(len(resp.content), endpoint=endpoint)
+        result = "ok"
+        return resp
+    finally:
+        UISP_REQUEST_SECONDS.observe(
+            time.perf_counter() - t0, endpoint=endpoint, result=result
+        )
+
+
+def iter_uisp_devices() -> Iterator[UispDevice]:
+    """
+    Descarga `/nms/api/v2.1/devices` en streaming y entrega registros compactos
+    a medida que llegan. Lanza excepción ante errores HTTP o de parseo.
+    """
+    url = f"{UISP_URL}/nms/api/v2.1/devices"
+    logger.info(f"GET {url} (stream)")
+    t0 = time.perf_counter()
+    result = "error"
+    try:
+        with requests.get(
+            url, headers=HEADERS, timeout=10, verify=False, stream=True
+        ) as resp:
+            resp.raise_for_status()
+            yield from parse_uisp_device_stream(
+                _counted(resp.iter_content(STREAM_CHUNK_SIZE), "devices")
+            )
+        result = "ok"
+    finally:
+        UISP_REQUEST_SECONDS.observe(
+            time.perf_counter() - t0, endpoint="devices", result=result
+        )
+
+
+def get_uisp_device_records() -> List[UispDevice]:
+    """
+    Igual que `get_uisp_devices` pero con registros `UispDevice` proyectados
+    durante la descarga. Retorna siempre una lista (o lista vacía en error).
+    """
+    try:
+        with (
+            span("get_uisp_devices"),
+            child_span(
+                "uisp.get", {"uisp.endpoint": "devices", "uisp.stream": True}
+            ) as s,
+        ):
+            devices = list(iter_uisp_devices())
+            if s is not None:
+                s.set_attribute("uisp.devices", len(devices))
+            return devices
+    except Exception as e:
+        logger.warning(f"Error al obtener dispositivos UISP: {e}")
+        return []
+
 
 def get_uisp_devices() -> list:
     """
@@ -25,9 +312,8 @@ def get_uisp_devices() -> list:
     try:
         url = f"{UISP_URL}/nms/api/v2.1/devices"
         logger.info(f"GET {url}")
-        resp = requests.get(url, headers=HEADERS, timeout=10, verify=False)
-        resp.raise_for_status()
-        data = resp.json()
+        with span("get_uisp_devices"):
+            data = _get(url, "devices").json()
         # Algunos endpoints devuelven { data: […] }, otros directamente […]
         return data.get("data", data) if isinstance(data, dict) else data
     except Exception as e:
@@ -42,9 +328,8 @@ def get_uisp_device_stats(device_id: str) -> dict:
     try:
         url = f"{UISP_URL}/nms/api/v2.1/devices/{device_id}/statistics"
         logger.info(f"GET {url}")
-        resp = requests.get(url, headers=HEADERS, timeout=10, verify=False)
-        resp.raise_for_status()
-        data = resp.json()
+        with span("get_uisp_device_stats"):
+            data = _get(url, "statistics").json()
         return data.get("data", {}) if isinstance(data, dict) else {}
     except Exception as e:
         logger.warning(f"Error al obtener stats del dispositivo {device_id}: {e}")
@@ -2,139 +2,300 @@
 """
 Script profesional para verificar correspondencia entre clientes de CSV y dispositivos UISP.
 Genera reportes en JSON y CSV para un análisis detallado.
+
+Procesa el CSV en bloques (apto para cientos de miles de abonados) y genera
+un diff contra la corrida anterior para revisar solo los cambios.
 """
 
 import argparse
-import csv
 import json
 import logging
 import os
 import sys
 from datetime import datetime
 
+import pandas as pd
+
+try:  # Parquet es opcional: requiere pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = pq = None
+
 # Asegurar que podamos importar el paquete 'app' desde la raíz del proyecto
 dir_path = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.abspath(os.path.join(dir_path, "..", ".."))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from app.services.client_service import load_clients_csv  # noqa: E402
-from app.services.uisp_service import get_uisp_devices  # noqa: E402
+from app.services.association_engine import (  # noqa: E402
+    TIER_IP,
+    TIER_MAC,
+    TIER_NAME,
+    associate_frame,
+    build_device_frame,
+)
+from app.services.uisp_service import get_uisp_device_records  # noqa: E402
+from app.utils.clientes_loader import client_csv_loader  # noqa: E402
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 
+# Clientes por bloque al recorrer el CSV
+VERIFY_CHUNK_SIZE = int(os.getenv("VERIFY_CHUNK_SIZE", "50000"))
+
+
+# Niveles exactos usados en la verificación y su etiqueta en los reportes
+VERIFY_TIERS = {TIER_IP: "ip", TIER_MAC: "mac", TIER_NAME: "name"}
+
+DETAIL_COLUMNS = [
+    "cliente_id",
+    "cliente_nombre",
+    "cliente_ip",
+    "cliente_mac",
+    "matched",
+    "método",
+    "uisp_id",
+    "uisp_name",
+    "uisp_ip",
+    "uisp_mac",
+]
+CLIENT_FIELDS = ["cliente_id", "cliente_nombre", "cliente_ip", "cliente_mac"]
+
 
-def build_indices(devices):
+def build_detail(clients, devices, device_frame=None):
     """
-    Construye índices por IP, MAC y nombre para búsqueda rápida.
+    Asocia por IP, MAC y nombre exacto (sin distinguir mayúsculas) con el
+    motor columnar y devuelve el DataFrame de detalle (`DETAIL_COLUMNS`).
     """
-    idx_ip, idx_mac, idx_name = {}, {}, {}
+    frame = associate_frame(
+        clients,
+        devices,
+        tiers=tuple(VERIFY_TIERS),
+        name_case_sensitive=False,
+        device_frame=device_frame,
+    )
+    detalle = frame.rename(
+        columns={
+            "ip": "cliente_ip",
+            "dispositivo_id": "uisp_id",
+        }
+    )
+    detalle["método"] = detalle["método"].map(VERIFY_TIERS)
+    return detalle[DETAIL_COLUMNS]
+
 
-    for dev in devices:
-        ip = dev.get("ipAddress", "")
-        mac = dev.get("mac") or dev.get("identification", {}).get("mac")
-        name = dev.get("identification", {}).get("name")
+def _records(frame):
+    """Filas como dicts JSON-serializables (NaN → None)."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
 
-        if ip:
-            idx_ip[ip] = dev
-        if mac:
-            idx_mac[mac.lower()] = dev
-        if name:
-            idx_name[name.lower()] = dev
-    return idx_ip, idx_mac, idx_name
 
+def _client_keys(detalle, offset):
+    """Clave por cliente para comparar corridas: Id, o número de fila global."""
+    ids = detalle["cliente_id"]
+    rows = [f"row:{offset + i}" for i in range(len(detalle))]
+    return [
+        str(cid) if isinstance(cid, str) and cid else r for cid, r in zip(ids, rows)
+    ]
 
-def verify(csv_path, out_dir):
+
+def load_previous_run(detail_path):
     """
-    Ejecuta la verificación, genera reportes en out_dir.
+    Lee el detalle de la corrida anterior (en bloques, solo las columnas
+    necesarias) como {clave_cliente: uisp_id o None si no tenía match}.
     """
-    logger.info(f"Cargando clientes desde CSV: {csv_path}")
-    clients = load_clients_csv(csv_path)
+    previous = {}
+    if not os.path.exists(detail_path):
+        return None
+    offset = 0
+    for chunk in pd.read_csv(
+        detail_path,
+        dtype=str,
+        usecols=lambda c: c in ("cliente_id", "matched", "uisp_id"),
+        chunksize=VERIFY_CHUNK_SIZE,
+    ):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for key, matched, uisp_id in zip(
+            _client_keys(chunk, offset), chunk["matched"], chunk["uisp_id"]
+        ):
+            previous[key] = (uisp_id or "") if matched == "True" else None
+        offset += len(chunk)
+    return previous
+
+
+def diff_chunk(detalle, keys, previous):
+    """
+    Cambios respecto de la corrida anterior para un bloque de detalle:
+    nuevo_match, nuevo_sin_match o cambio_dispositivo.
+    """
+    cambios = []
+    for key, row in zip(keys, _records(detalle)):
+        before = previous.pop(key, None)
+        now = None
+        if row["matched"]:
+            now = "" if row["uisp_id"] is None else str(row["uisp_id"])
+        if before == now:
+            continue
+        if before is None:
+            cambio = "nuevo_match"
+        elif now is None:
+            cambio = "nuevo_sin_match"
+        else:
+            cambio = "cambio_dispositivo"
+        cambios.append(
+            {
+                "cliente_id": row["cliente_id"],
+                "cliente_nombre": row["cliente_nombre"],
+                "cambio": cambio,
+                "uisp_id_anterior": before,
+                "uisp_id_actual": now,
+            }
+        )
+    return cambios
+
+
+class _JsonArrayWriter:
+    """Escribe una lista JSON elemento a elemento."""
+
+    def __init__(self, path):
+        self._f = open(path, "w", encoding="utf-8")
+        self._f.write("[")
+        self._first = True
+
+    def extend(self, items):
+        for item in items:
+            self._f.write("\n  " if self._first else ",\n  ")
+            json.dump(item, self._f, ensure_ascii=False)
+            self._first = False
+
+    def close(self):
+        self._f.write("\n]\n" if not self._first else "]\n")
+        self._f.close()
+
+
+def verify(csv_path, out_dir, chunk_size=None):
+    """
+    Ejecuta la verificación en modo streaming y genera reportes en out_dir.
+
+    El CSV se procesa en bloques de `chunk_size` filas; el detalle se escribe
+    a medida (CSV y, si pyarrow está instalado, Parquet) y se compara contra
+    el detalle de la corrida anterior para producir el diff.
+    """
+    chunk_size = chunk_size or VERIFY_CHUNK_SIZE
+    os.makedirs(out_dir, exist_ok=True)
+    detail_path = os.path.join(out_dir, "detalle_uisp_vs_clients.csv")
+    parquet_path = os.path.join(out_dir, "detalle_uisp_vs_clients.parquet")
+    sin_path = os.path.join(out_dir, "clientes_sin_match.json")
+    diff_path = os.path.join(out_dir, "diff_uisp_vs_clients.json")
+    json_path = os.path.join(out_dir, "resumen_uisp_vs_clients.json")
+
+    if pq is None:
+        logger.info("pyarrow no está instalado: se omite el detalle en Parquet")
+
+    previous = load_previous_run(detail_path)
+    if previous is None:
+        logger.info("Sin corrida anterior: el diff quedará vacío")
 
     logger.info("Obteniendo dispositivos UISP...")
-    devices = get_uisp_devices()
+    devices = get_uisp_device_records()
+    device_frame = build_device_frame(devices)
     logger.info(f"Dispositivos UISP obtenidos: {len(devices)}")
 
-    idx_ip, idx_mac, idx_name = build_indices(devices)
-
     resumen = {
         "timestamp": datetime.utcnow().isoformat() + "Z",
-        "total_clients": len(clients),
+        "total_clients": 0,
         "matched": 0,
         "unmatched": 0,
+        "chunks": 0,
     }
-    detalle = []
-    sin_match = []
-
-    for _, row in clients.iterrows():
-        client_ip = str(row.get("Ip") or row.get("ip") or "").strip()
-        client_mac = str(row.get("Mac") or row.get("mac") or "").strip().lower()
-        client_name = str(row.get("Nombre") or row.get("nombre") or "").strip().lower()
-
-        match = None
-        método = None
-
-        # 1. Por IP
-        if client_ip and client_ip in idx_ip:
-            match = idx_ip[client_ip]
-            método = "ip"
-        # 2. Por MAC
-        elif client_mac and client_mac in idx_mac:
-            match = idx_mac[client_mac]
-            método = "mac"
-        # 3. Por nombre exacto
-        elif client_name and client_name in idx_name:
-            match = idx_name[client_name]
-            método = "name"
-
-        entry = {
-            "cliente_id": row.get("Id"),
-            "cliente_nombre": row.get("Nombre"),
-            "cliente_ip": client_ip,
-            "cliente_mac": client_mac,
-        }
-        if match:
-            resumen["matched"] += 1
-            entry.update(
-                {
-                    "matched": True,
-                    "método": método,
-                    "uisp_id": match.get("identification", {}).get("id"),
-                    "uisp_name": match.get("identification", {}).get("name"),
-                    "uisp_ip": match.get("ipAddress"),
-                    "uisp_mac": match.get("mac")
-                    or match.get("identification", {}).get("mac"),
-                }
+    diff_counts = {"nuevo_match": 0, "nuevo_sin_match": 0, "cambio_dispositivo": 0}
+
+    logger.info(f"Procesando clientes desde CSV: {csv_path} (bloques de {chunk_size})")
+    tmp_detail = f"{detail_path}.tmp"
+    sin_writer = _JsonArrayWriter(f"{sin_path}.tmp")
+    diff_writer = _JsonArrayWriter(f"{diff_path}.tmp")
+    parquet_writer = None
+    try:
+        # Cabecera aunque no haya clientes (evita reportes rotos)
+        pd.DataFrame(columns=DETAIL_COLUMNS).to_csv(tmp_detail, index=False)
+        chunks = client_csv_loader.read_csv(csv_path, chunksize=chunk_size)
+        for chunk in chunks:
+            chunk.index = range(
+                resumen["total_clients"], resumen["total_clients"] + len(chunk)
             )
-        else:
-            resumen["unmatched"] += 1
-            entry["matched"] = False
-            sin_match.append(entry)
+            detalle = build_detail(chunk, devices, device_frame)
+            matched = int(detalle["matched"].sum())
+            resumen["chunks"] += 1
+            resumen["total_clients"] += len(detalle)
+            resumen["matched"] += matched
+            resumen["unmatched"] += len(detalle) - matched
 
-        detalle.append(entry)
+            detalle.to_csv(
+                tmp_detail, mode="a", header=False, index=False, encoding="utf-8"
+            )
+            if pq is not None:
+                table = pa.Table.from_pandas(
+                    detalle.astype({"matched": bool}).astype(
+                        {c: "string" for c in DETAIL_COLUMNS if c != "matched"}
+                    ),
+                    preserve_index=False,
+                )
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(
+                        f"{parquet_path}.tmp", table.schema
+                    )
+                parquet_writer.write_table(table)
 
-    # Escribir reportes
-    os.makedirs(out_dir, exist_ok=True)
+            sin_writer.extend(
+                _records(detalle.loc[~detalle["matched"], CLIENT_FIELDS + ["matched"]])
+            )
+            if previous is not None:
+                keys = _client_keys(detalle, int(chunk.index[0]) if len(chunk) else 0)
+                cambios = diff_chunk(detalle, keys, previous)
+                for c in cambios:
+                    diff_counts[c["cambio"]] += 1
+                diff_writer.extend(cambios)
+            logger.info(f"  bloque {resumen['chunks']}: {len(detalle)} clientes")
 
-    json_path = os.path.join(out_dir, "resumen_uisp_vs_clients.json")
+        # Clientes que ya no están en el CSV y antes tenían match
+        if previous:
+            gone = [
+                {
+                    "cliente_id": key,
+                    "cliente_nombre": None,
+                    "cambio": "nuevo_sin_match",
+                    "uisp_id_anterior": uisp_id,
+                    "uisp_id_actual": None,
+                }
+                for key, uisp_id in previous.items()
+                if uisp_id is not None
+            ]
+            diff_counts["nuevo_sin_match"] += len(gone)
+            diff_writer.extend(gone)
+    finally:
+        sin_writer.close()
+        diff_writer.close()
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    # Publicar reportes (reemplazo atómico de la corrida anterior)
+    os.replace(tmp_detail, detail_path)
+    logger.info(f"Detalle guardado en {detail_path}")
+    if parquet_writer is not None:
+        os.replace(f"{parquet_path}.tmp", parquet_path)
+        logger.info(f"Detalle columnar guardado en {parquet_path}")
+    os.replace(f"{sin_path}.tmp", sin_path)
+    logger.info(f"Clientes sin match guardados en {sin_path}")
+    os.replace(f"{diff_path}.tmp", diff_path)
+    logger.info(f"Diff contra corrida anterior guardado en {diff_path}")
+
+    resumen["diff"] = diff_counts if previous is not None else None
     with open(json_path, "w", encoding="utf-8") as jf:
         json.dump(resumen, jf, indent=2, ensure_ascii=False)
     logger.info(f"Resumen guardado en {json_path}")
 
-    csv_path = os.path.join(out_dir, "detalle_uisp_vs_clients.csv")
-    with open(csv_path, "w", newline="", encoding="utf-8") as cf:
-        writer = csv.DictWriter(cf, fieldnames=list(detalle[0].keys()))
-        writer.writeheader()
-        writer.writerows(detalle)
-    logger.info(f"Detalle guardado en {csv_path}")
-
-    sin_path = os.path.join(out_dir, "clientes_sin_match.json")
-    with open(sin_path, "w", encoding="utf-8") as sf:
-        json.dump(sin_match, sf, indent=2, ensure_ascii=False)
-    logger.info(f"Clientes sin match guardados en {sin_path}")
-
     logger.info("¡Verificación completada!")
+    return resumen
 
 
 if __name__ == "__main__":
@@ -145,6 +306,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "--out", default="reports", help="Carpeta de salida para reportes"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=VERIFY_CHUNK_SIZE,
+        help="Clientes por bloque al procesar el CSV",
+    )
     args = parser.parse_args()
 
-    verify(args.csv, args.out)
+    verify(args.csv, args.out, args.chunk_size)
@@ -0,0 +1,509 @@
+# File: app/services/write_spool.py
+"""
+Write-behind durable para las escrituras a Supabase.
+
+`SpooledStorage` envuelve otro `Storage`: `upsert_topology` e
+`insert_alarms` solo agregan un registro al spool local y vuelven de
+inmediato; un hilo de fondo (shipper) los envía en lotes al
+almacenamiento real. Las lecturas van directo al almacenamiento real
+(lo pendiente en el spool todavía no se ve).
+
+- El spool (`WriteSpool`) es un directorio de segmentos append-only
+  (`seg-000001.log`, ...). Cada registro es una línea
+  `<crc32> <json>`: al leer se descartan las líneas con checksum
+  inválido o cortadas por un apagón. Un segmento nuevo por proceso y al
+  superar `SPOOL_SEGMENT_BYTES`.
+- El avance del shipper se guarda en `checkpoint.json` (segmento,
+  offset) recién después de que el lote quedó escrito; los segmentos ya
+  enviados se borran. Tras un reinicio se reanuda desde ahí.
+- Cada proceso toma el primer slot libre `SPOOL_DIR/worker-<n>` (lock
+  exclusivo): con `uvicorn --workers N` cada worker tiene su spool y al
+  reiniciar vuelve a tomar uno con lo pendiente.
+- Reintentos con backoff exponencial (`SPOOL_RETRY_SECONDS` hasta
+  `SPOOL_RETRY_MAX_SECONDS`) mientras el destino falle. Si un lote falla,
+  se envía registro por registro; uno que el destino rechaza
+  `SPOOL_MAX_ATTEMPTS` veces (error que no es de red) pasa a
+  `dead-letter.log` y no frena a los que vienen detrás.
+- El spool no pasa de `SPOOL_MAX_BYTES`: lleno, las escrituras fallan
+  con `SpoolFull` (como fallaría la escritura directa con Supabase caído).
+- `topologia` es un upsert, reenviarlo no duplica. Las alarmas solo son
+  idempotentes si se configura `ALARM_IDEMPOTENCY_COLUMN`; si no, un
+  reenvío tras una respuesta perdida puede duplicar una alarma.
+- Métricas: `monitor360_spool_bytes`, `monitor360_spool_lag_seconds`,
+  `monitor360_spool_records_total` y `..._ship_failures_total`.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.services.metrics import (
+    SPOOL_BYTES,
+    SPOOL_LAG_SECONDS,
+    SPOOL_RECORDS,
+    SPOOL_SHIP_FAILURES,
+)
+from app.services.storage import ALARM_IDEMPOTENCY_COLUMN, Storage
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", "spool")
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+# Filas máximas por envío al destino
+SPOOL_BATCH_ROWS = int(os.getenv("SPOOL_BATCH_ROWS", "500"))
+SPOOL_RETRY_SECONDS = float(os.getenv("SPOOL_RETRY_SECONDS", "1"))
+SPOOL_RETRY_MAX_SECONDS = float(os.getenv("SPOOL_RETRY_MAX_SECONDS", "60"))
+# fsync por registro: sobrevive a un corte de energía (no solo a un crash)
+SPOOL_FSYNC = os.getenv("SPOOL_FSYNC", "1") == "1"
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(256 * 1024 * 1024)))
+# Rechazos del destino antes de mandar un registro a dead-letter
+SPOOL_MAX_ATTEMPTS = int(os.getenv("SPOOL_MAX_ATTEMPTS", "5"))
+# Slots `worker-<n>` que se prueban antes de desistir
+SPOOL_SLOTS = int(os.getenv("SPOOL_SLOTS", "64"))
+
+# (número de segmento, offset en bytes)
+Position = Tuple[int, int]
+
+
+class SpoolFull(RuntimeError):
+    """El spool llegó a `SPOOL_MAX_BYTES`."""
+
+
+class SpoolLocked(RuntimeError):
+    """Otro proceso usa el directorio del spool."""
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """
+    Errores de red o de disponibilidad del destino: se reintentan sin
+    límite. El resto (p. ej. PostgREST rechaza una columna) cuenta como
+    rechazo del registro.
+    """
+    if isinstance(exc, (OSError, TimeoutError)):
+        return True
+    if type(exc).__module__.split(".")[0] in ("httpx", "httpcore"):
+        return True
+    # PGRST00x: PostgREST sin conexión a la base; 08/53/57: clases de
+    # error de Postgres de conexión/recursos; 5xx: error del gateway
+    code = str(getattr(exc, "code", "") or "")
+    return code.startswith(("PGRST00", "08", "53", "57", "5"))
+
+
+def _encode(record: Dict) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def _decode(line: bytes) -> Optional[Dict]:
+    """Registro de una línea completa, o None si el checksum no coincide."""
+    try:
+        crc, payload = line.rstrip(b"\n").split(b" ", 1)
+        if int(crc, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class WriteSpool:
+    """Segmentos append-only con checkpoint de lectura (un solo lector)."""
+
+    def __init__(
+        self,
+        directory: str = SPOOL_DIR,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        fsync: bool = SPOOL_FSYNC,
+        max_bytes: int = SPOOL_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._acquire(os.path.join(directory, "lock"))
+        self._lock = threading.Lock()
+        self._file = None
+        self._active: Optional[int] = None
+        self._checkpoint_path = os.path.join(directory, "checkpoint.json")
+        self.position = self._load_checkpoint()
+        self._pending = self.size()
+
+    @classmethod
+    def for_process(cls, base: str = SPOOL_DIR, **kwargs) -> "WriteSpool":
+        """Spool en el primer slot `base/worker-<n>` que no use otro proceso."""
+        for slot in range(SPOOL_SLOTS):
+            try:
+                return cls(os.path.join(base, f"worker-{slot}"), **kwargs)
+            except SpoolLocked:
+                continue
+        raise SpoolLocked(f"Sin slots libres en {base} ({SPOOL_SLOTS} en uso)")
+
+    @staticmethod
+    def _acquire(path: str) -> int:
+        """
+        Lock exclusivo del directorio (dos shippers se pisarían los
+        segmentos). Devuelve el descriptor, abierto mientras viva el spool.
+        """
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            import fcntl
+
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            pass  # Windows: sin lock
+        except BlockingIOError:
+            os.close(fd)
+            raise SpoolLocked(
+                f"El spool {os.path.dirname(path)} está en uso por otro proceso"
+            ) from None
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    # ── Segmentos ────────────────────────────────────────────────
+    def _path(self, number: int) -> str:
+        return os.path.join(self.directory, f"seg-{number:06d}.log")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[4:10])
+            for name in os.listdir(self.directory)
+            if name.startswith("seg-") and name.endswith(".log")
+        )
+
+    def _load_checkpoint(self) -> Position:
+        try:
+            with open(self._checkpoint_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+
+    # ── Escritura ────────────────────────────────────────────────
+    def append(self, record: Dict):
+        line = _encode(record)
+        with self._lock:
+            if self._pending + len(line) > self.max_bytes:
+                raise SpoolFull(
+                    f"Spool {self.directory} lleno ({self._pending} bytes pendientes)"
+                )
+            self._pending += len(line)
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                self._roll()
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def _roll(self):
+        # Nunca se agrega a un segmento de otro proceso (pudo quedar cortado)
+        if self._file is not None:
+            self._file.close()
+        segments = self._segments()
+        self._active = (segments[-1] if segments else 0) + 1
+        # Queda abierto para los append siguientes; se cierra en _roll/close
+        self._file = open(self._path(self._active), "ab")  # noqa: SIM115
+
+    # ── Lectura (shipper) ────────────────────────────────────────
+    def _scan(self) -> Iterator[Tuple[Optional[Dict], Position]]:
+        """
+        (registro o None si está corrupto, posición siguiente) desde el
+        checkpoint. Se detiene ante una línea incompleta del segmento
+        activo: el escritor todavía la está agregando.
+        """
+        segment, offset = self.position
+        for number in self._segments():
+            if number < segment:
+                continue
+            if number > segment:
+                offset = 0
+            try:
+                with open(self._path(number), "rb") as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b"\n") and number == self._active:
+                            return
+                        offset += len(line)
+                        record = _decode(line) if line.endswith(b"\n") else None
+                        yield record, (number, offset)
+            except FileNotFoundError:
+                continue  # ya enviado y borrado por commit()
+            # Segmento leído completo: la posición pasa al final
+            yield None, (number, -1)
+
+    def read(self, max_rows: int) -> Tuple[List[Tuple[Dict, Position]], Position]:
+        """
+        Registros pendientes (hasta `max_rows` filas) con la posición tras
+        cada uno, y la posición tras el último (incluye corruptos salteados).
+        """
+        records: List[Tuple[Dict, Position]] = []
+        rows = 0
+        position = self.position
+        for record, after in self._scan():
+            if after[1] == -1:
+                if after[0] != self._active:
+                    position = (after[0] + 1, 0)
+                continue
+            if record is None:
+                SPOOL_RECORDS.inc(spool=self.directory, result="corrupt")
+                logger.warning(f"Spool {self.directory}: registro corrupto en {after}")
+                position = after
+                continue
+            if records and rows + len(record["rows"]) > max_rows:
+                break
+            records.append((record, after))
+            rows += len(record["rows"])
+            position = after
+        return records, position
+
+    def commit(self, position: Position):
+        """Guarda el checkpoint y borra los segmentos ya enviados."""
+        tmp = f"{self._checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self._checkpoint_path)
+        self.position = position
+        for number in self._segments():
+            if number < position[0] and number != self._active:
+                os.remove(self._path(number))
+        pending = self.size()
+        with self._lock:
+            self._pending = pending
+
+    def dead_letter(self, record: Dict):
+        """Aparta un registro que el destino rechaza (para revisarlo a mano)."""
+        with open(os.path.join(self.directory, "dead-letter.log"), "ab") as f:
+            f.write(_encode(record))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    # ── Estado ───────────────────────────────────────────────────
+    def size(self) -> int:
+        """Bytes pendientes de enviar."""
+        segment, offset = self.position
+        total = 0
+        for number in self._segments():
+            if number < segment:
+                continue
+            try:
+                size = os.path.getsize(self._path(number))
+            except OSError:
+                continue
+            total += size - offset if number == segment else size
+        return max(total, 0)
+
+    def lag(self) -> float:
+        """Segundos desde que se agregó el registro pendiente más viejo."""
+        for record, after in self._scan():
+            if record is not None:
+                return max(time.time() - record["ts"], 0.0)
+        return 0.0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.close(self._lock_fd)
+
+
+class SpooledStorage(Storage):
+    """`Storage` con escrituras diferidas y durables sobre `inner`."""
+
+    def __init__(
+        self,
+        inner: Storage,
+        spool: Optional[WriteSpool] = None,
+        batch_rows: int = SPOOL_BATCH_ROWS,
+        retry_seconds: float = SPOOL_RETRY_SECONDS,
+        retry_max_seconds: float = SPOOL_RETRY_MAX_SECONDS,
+        max_attempts: int = SPOOL_MAX_ATTEMPTS,
+    ):
+        self.inner = inner
+        self.name = inner.name
+        self.spool = spool or WriteSpool.for_process()
+        self.batch_rows = max(1, batch_rows)
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._attempts: Dict[str, int] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Event()
+        self._shipper = threading.Thread(
+            target=self._run, name="spool-shipper", daemon=True
+        )
+        self._shipper.start()
+        SPOOL_BYTES.set_function(self.spool.size, spool=self.spool.directory)
+        SPOOL_LAG_SECONDS.set_function(self.spool.lag, spool=self.spool.directory)
+
+    # ── Escrituras: al spool ─────────────────────────────────────
+    def _append(
+        self, table: str, op: str, rows: List[Dict], key: Optional[str] = None
+    ) -> int:
+        if not rows:
+            return 0
+        try:
+            self.spool.append(
+                {
+                    "key": key or uuid.uuid4().hex,
+                    "table": table,
+                    "op": op,
+                    "ts": time.time(),
+                    "rows": rows,
+                }
+            )
+        except SpoolFull:
+            SPOOL_RECORDS.inc(spool=self.spool.directory, result="rejected")
+            raise
+        SPOOL_RECORDS.inc(spool=self.spool.directory, result="appended")
+        self._idle.clear()
+        self._wake.set()
+        return len(rows)
+
+    def upsert_topology(self, rows):
+        return self._append("topologia", "upsert", list(rows))
+
+    def insert_alarms(self, rows):
+        rows = [dict(row) for row in rows]
+        key = uuid.uuid4().hex
+        if ALARM_IDEMPOTENCY_COLUMN:
+            # Clave fija desde que entra al spool: el reenvío no duplica
+            for i, row in enumerate(rows):
+                row.setdefault(ALARM_IDEMPOTENCY_COLUMN, f"{key}-{i}")
+        return self._append("alarmas", "insert", rows, key)
+
+    # ── Lecturas: directo al destino ─────────────────────────────
+    def connect(self):
+        self.inner.connect()
+
+    def query_alarms(self, *args, **kwargs):
+        return self.inner.query_alarms(*args, **kwargs)
+
+    def get_alarm(self, alarm_id, columns):
+        return self.inner.get_alarm(alarm_id, columns)
+
+    def count_alarms(self, *args, **kwargs):
+        return self.inner.count_alarms(*args, **kwargs)
+
+    # ── Shipper ──────────────────────────────────────────────────
+    def _send(self, records: List[Dict]):
+        # Registros consecutivos de la misma tabla van en un solo envío
+        groups: List[Tuple[str, List[Dict]]] = []
+        for record in records:
+            if groups and groups[-1][0] == record["table"]:
+                groups[-1][1].extend(record["rows"])
+            else:
+                groups.append((record["table"], list(record["rows"])))
+        for table, rows in groups:
+            if table == "topologia":
+                self.inner.upsert_topology(rows)
+            else:
+                self.inner.insert_alarms(rows)
+
+    def _rejected(self, record: Dict, exc: Exception) -> bool:
+        """True si el registro pasa a dead-letter; si no, hay que reintentar."""
+        if _is_transient(exc):
+            return False
+        attempts = self._attempts.get(record["key"], 0) + 1
+        if attempts < self.max_attempts:
+            self._attempts[record["key"]] = attempts
+            return False
+        self._attempts.pop(record["key"], None)
+        self.spool.dead_letter(record)
+        SPOOL_RECORDS.inc(spool=self.spool.directory, result="dead_letter")
+        logger.error(
+            f"Spool {self.spool.directory}: registro {record['key']} "
+            f"({record['table']}) a dead-letter tras {attempts} rechazos: {exc}"
+        )
+        return True
+
+    def ship_once(self) -> int:
+        """Envía un lote del spool; devuelve registros procesados (0: vacío)."""
+        entries, position = self.spool.read(self.batch_rows)
+        try:
+            self._send([record for record, _ in entries])
+        except Exception:
+            # Uno por uno, avanzando el checkpoint: un registro rechazado
+            # no bloquea a los que vienen detrás
+            for record, after in entries:
+                try:
+                    self._send([record])
+                except Exception as exc:
+                    if not self._rejected(record, exc):
+                        raise
+                else:
+                    self._attempts.pop(record["key"], None)
+                    SPOOL_RECORDS.inc(spool=self.spool.directory, result="shipped")
+                self.spool.commit(after)
+        else:
+            if entries:
+                SPOOL_RECORDS.inc(
+                    len(entries), spool=self.spool.directory, result="shipped"
+                )
+        if position != self.spool.position:
+            self.spool.commit(position)
+        return len(entries)
+
+    def _run(self):
+        delay = 0.0
+        while True:
+            try:
+                shipped = self.ship_once()
+            except Exception as e:
+                SPOOL_SHIP_FAILURES.inc(spool=self.spool.directory)
+                delay = min(max(delay * 2, self.retry_seconds), self.retry_max_seconds)
+                logger.warning(
+                    f"Spool {self.spool.directory}: envío falló, reintento en "
+                    f"{delay:.1f} s: {e}"
+                )
+                # Jitter: varios procesos caídos juntos no reintentan a la vez
+                if self._stop.wait(delay * random.uniform(0.5, 1.0)):
+                    return
+                continue
+            delay = 0.0
+            if shipped:
+                continue
+            self._idle.set()
+            if self._stop.is_set():
+                return
+            self._wake.wait(1.0)
+            self._wake.clear()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que el spool quede vacío (True si lo logró a tiempo)."""
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        while self.spool.size():
+            if time.monotonic() > deadline:
+                return False
+            self._idle.wait(min(0.05, max(deadline - time.monotonic(), 0)))
+            self._wake.set()
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Intenta vaciar el spool; lo que no se envió queda para el próximo arranque."""
+        if not self.flush(timeout):
+            logger.warning(
+                f"Spool {self.spool.directory}: {self.spool.size()} bytes "
+                "pendientes quedan en disco"
+            )
+        self._stop.set()
+        self._wake.set()
+        self._shipper.join(timeout)
+        self.spool.close()
+        self.inner.close(timeout)
+
+
+__all__ = ["SpoolFull", "SpoolLocked", "SpooledStorage", "WriteSpool"]
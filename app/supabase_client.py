@@ -1,11 +1,53 @@
+"""
+Cliente de Supabase creado al primer uso (`get_supabase()`).
+
+Importar este módulo no importa `supabase` ni valida credenciales: así
+la API arranca rápido y un worker sin variables de Supabase falla recién
+al escribir (con un error claro), no al importar. `supabase` se mantiene
+como atributo perezoso del módulo por compatibilidad.
+"""
+
 import os
+import threading
 
 from dotenv import load_dotenv
-from supabase import create_client
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+
+class SupabaseNotConfigured(RuntimeError):
+    """Faltan las variables de entorno de Supabase."""
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_supabase():
+    """Cliente global del proceso (se crea al primer uso)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+                    raise SupabaseNotConfigured(
+                        "Definí NEXT_PUBLIC_SUPABASE_URL y "
+                        "NEXT_PUBLIC_SUPABASE_ANON_KEY para usar Supabase"
+                    )
+                from supabase import create_client
+
+                _client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    return _client
+
+
+def __getattr__(name):
+    # `from app.supabase_client import supabase` sigue funcionando
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["SupabaseNotConfigured", "get_supabase"]
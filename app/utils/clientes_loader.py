@@ -1,14 +1,236 @@
 # File: app/utils/clientes_loader.py
+"""
+Carga del CSV de clientes exportado desde MikroWisp.
+
+`ClientCsvLoader` lee solo las columnas que usa Monitor360 (con dtype
+explícito) y guarda el DataFrame ya parseado en un cache binario (pickle)
+identificado por el sha1 del archivo, las columnas y las versiones de
+pandas/Python y del formato; al leerlo se verifica que sea un DataFrame
+con esas columnas. `start_watching()` (opcional, lo llama el arranque de
+la API) vigila los archivos cargados en segundo plano y los recarga
+apenas cambian.
+"""
+
+import hashlib
+import logging
+import os
+import platform
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
 
 import pandas as pd
 
+from app.services.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Columnas (ya normalizadas) que se leen del export de 36 columnas
+CLIENT_CSV_COLUMNS = tuple(
+    c.strip()
+    for c in os.getenv("CLIENT_CSV_COLUMNS", "id,status,nombre,ip,mac,plan").split(",")
+    if c.strip()
+)
+CLIENT_CSV_CACHE_DIR = os.getenv("CLIENT_CSV_CACHE_DIR", ".cache/clientes")
+# Versión del formato del cache en disco (cambiarla invalida los anteriores)
+CLIENT_CSV_CACHE_VERSION = 1
+# Intervalo de sondeo del watcher en segundos (0 lo desactiva)
+CLIENT_CSV_WATCH_SECONDS = float(os.getenv("CLIENT_CSV_WATCH_SECONDS", "10"))
+
+
+def normalize_column(name: str) -> str:
+    """'Dirección Principal ' → 'dirección_principal'."""
+    return str(name).strip().lower().replace(" ", "_")
+
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ClientCsvLoader:
+    """Loader con cache en memoria y en disco del CSV de clientes."""
+
+    def __init__(
+        self,
+        columns: Optional[Sequence[str]] = CLIENT_CSV_COLUMNS,
+        cache_dir: Optional[str] = CLIENT_CSV_CACHE_DIR,
+        watch_seconds: float = CLIENT_CSV_WATCH_SECONDS,
+    ):
+        self.columns = tuple(columns) if columns else None
+        self.cache_dir = cache_dir
+        self.watch_seconds = watch_seconds
+        self._lock = threading.RLock()
+        # path → (mtime_ns, size, DataFrame)
+        self._memory: Dict[str, Tuple[int, int, pd.DataFrame]] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ── API pública ──────────────────────────────────────────────
+    def load(self, path: str) -> pd.DataFrame:
+        """
+        Devuelve el DataFrame del CSV. Orden de búsqueda: memoria (mismo
+        mtime/tamaño), cache binario en disco (mismo sha1) y por último el CSV.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            st = os.stat(path)
+            cached = self._memory.get(path)
+            if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+                self._stats[path]["hits"] += 1
+                CACHE_REQUESTS.inc(cache="clientes_csv", result="hit")
+                return cached[2].copy(deep=False)
+            df = self._load_fresh(path, st)
+        return df.copy(deep=False)
+
+    def stats(self, path: Optional[str] = None) -> Dict:
+        """Tiempo y memoria de la última carga (del archivo indicado o todos)."""
+        with self._lock:
+            if path is not None:
+                return dict(self._stats.get(os.path.abspath(path), {}))
+            return {p: dict(s) for p, s in self._stats.items()}
+
+    def invalidate(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(os.path.abspath(path), None)
+
+    # ── Carga ────────────────────────────────────────────────────
+    def read_csv(self, path: str, **kwargs):
+        """
+        `pd.read_csv` con columnas normalizadas y solo las necesarias. Con
+        `chunksize` devuelve un iterador de DataFrames (sin pasar por cache).
+        """
+        wanted = set(self.columns) if self.columns else None
+        reader = pd.read_csv(
+            path,
+            sep=",",
+            dtype=str,
+            usecols=(lambda c: normalize_column(c) in wanted) if wanted else None,
+            **kwargs,
+        )
+        if isinstance(reader, pd.DataFrame):
+            reader.columns = [normalize_column(c) for c in reader.columns]
+            return reader
+        return self._normalized_chunks(reader)
+
+    @staticmethod
+    def _normalized_chunks(reader):
+        with reader:
+            for chunk in reader:
+                chunk.columns = [normalize_column(c) for c in chunk.columns]
+                yield chunk
+
+    def _cache_path(self, sha1: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        signature = hashlib.sha1(
+            f"{CLIENT_CSV_CACHE_VERSION}|{self.columns}|{pd.__version__}|"
+            f"{platform.python_version()}".encode()
+        ).hexdigest()[:8]
+        return os.path.join(self.cache_dir, f"{sha1}-{signature}.pkl")
+
+    def _read_cache(self, cache_path: str) -> pd.DataFrame:
+        df = pd.read_pickle(cache_path)
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError(f"contiene {type(df).__name__}, no un DataFrame")
+        if self.columns and not set(df.columns) <= set(self.columns):
+            raise ValueError(f"columnas inesperadas {list(df.columns)}")
+        return df
+
+    def _load_fresh(self, path: str, st: os.stat_result) -> pd.DataFrame:
+        t0 = time.perf_counter()
+        sha1 = _file_sha1(path)
+        cache_path = self._cache_path(sha1)
+        source = "csv"
+        df = None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                df = self._read_cache(cache_path)
+                source = "disk_cache"
+            except Exception as e:
+                logger.warning(f"Cache de clientes inválido {cache_path}: {e}")
+                df = None
+        if df is None:
+            df = self.read_csv(path)
+            if cache_path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp = f"{cache_path}.tmp"
+                    df.to_pickle(tmp)
+                    os.replace(tmp, cache_path)
+                except Exception as e:
+                    logger.warning(f"No se pudo escribir cache de clientes: {e}")
+
+        elapsed = time.perf_counter() - t0
+        CACHE_REQUESTS.inc(
+            cache="clientes_csv",
+            result="disk_hit" if source == "disk_cache" else "miss",
+        )
+        prev = self._stats.get(path, {})
+        self._memory[path] = (st.st_mtime_ns, st.st_size, df)
+        self._stats[path] = {
+            "source": source,
+            "seconds": round(elapsed, 4),
+            "rows": len(df),
+            "columns": list(df.columns),
+            "memory_bytes": int(df.memory_usage(deep=True).sum()),
+            "sha1": sha1,
+            "loads": prev.get("loads", 0) + 1,
+            "hits": prev.get("hits", 0),
+        }
+        logger.info(
+            f"Clientes cargados desde {source}: {len(df)} filas en "
+            f"{elapsed * 1000:.1f} ms, "
+            f"{self._stats[path]['memory_bytes'] / 2**20:.2f} MiB ({path})"
+        )
+        return df
+
+    # ── Watcher ──────────────────────────────────────────────────
+    def start_watching(self):
+        """Arranca (una vez) el hilo que recarga los CSV modificados."""
+        if self.watch_seconds <= 0:
+            return
+        with self._lock:
+            if self._watcher and self._watcher.is_alive():
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, name="clientes-csv-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_seconds):
+            for path in list(self._memory):
+                try:
+                    st = os.stat(path)
+                    with self._lock:
+                        cached = self._memory.get(path)
+                        if cached and cached[:2] != (st.st_mtime_ns, st.st_size):
+                            logger.info(f"CSV de clientes modificado: {path}")
+                            self._load_fresh(path, st)
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.warning(f"Error recargando CSV de clientes {path}: {e}")
+
+
+# Loader compartido por los servicios
+client_csv_loader = ClientCsvLoader()
+
 
 def load_clients_csv(file_path: str = "Lista de Usuarios.csv") -> pd.DataFrame:
     """
     Carga y normaliza el CSV exportado desde MikroWisp.
     """
-    df = pd.read_csv(file_path)
-    df.columns = (
-        df.columns.str.lower().str.strip()
-    )  # Asegura nombres de columnas consistentes
-    return df
+    return client_csv_loader.load(file_path)
@@ -0,0 +1,197 @@
+# File: app/utils/responses.py
+"""
+Respuestas JSON rápidas y compresión negociada para payloads grandes.
+
+- `FastJSONResponse` serializa con orjson si está instalado (json estándar
+  si no). Los endpoints pesados la devuelven directamente para saltear
+  `jsonable_encoder`, que recorre campo por campo cada nodo/dispositivo.
+- `versioned_response()` agrega una versión derivada del contenido (campo
+  `version` + cabecera `ETag`) y responde `304 Not Modified` si el
+  cliente ya la tiene (`If-None-Match`).
+- `CompressionMiddleware` comprime con brotli (si está instalado) o gzip
+  según `Accept-Encoding`, solo cuando el cuerpo supera
+  `COMPRESS_MIN_BYTES`. Un `ETag` fuerte pasa a débil (`W/`) al
+  comprimir: describe los bytes sin comprimir, no los enviados. Las
+  respuestas en streaming (SSE, NDJSON o cualquier cuerpo enviado en
+  varias partes) pasan sin tocar para no retener eventos en un buffer.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, time
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:  # Serializador rápido opcional
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+try:  # Brotli es opcional; sin él se usa gzip
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# Calidad 4-5 da casi el tamaño de gzip -9 a una fracción del costo
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# Tipos que nunca se comprimen aunque lleguen en un solo bloque
+STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def _json_default(value: Any) -> Any:
+    # Igual que orjson: fechas en ISO 8601/RFC 3339 y numpy como nativos
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def dumps_json(content: Any) -> bytes:
+    """Serializa a JSON (UTF-8); otros tipos no nativos se convierten con str()."""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def content_version(body: bytes) -> str:
+    """Versión corta y estable del contenido serializado."""
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def versioned_response(request: Request, content: Dict[str, Any]) -> Response:
+    """
+    Respuesta JSON con `version` (hash del contenido) en el cuerpo y como
+    `ETag`. Si `If-None-Match` coincide devuelve 304 sin cuerpo.
+    """
+    body = dumps_json(content)
+    version = content_version(body)
+    headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    # Se antepone "version" al objeto ya serializado (evita serializar dos veces)
+    prefix = b'{"version":"' + version.encode() + b'"'
+    body = prefix + (b"," + body[1:] if body != b"{}" else b"}")
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Codificación preferida disponible: "br", "gzip" o "" (ninguna)."""
+    offered = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = params.strip()
+        try:
+            weight = float(q[2:]) if q.startswith("q=") else 1.0
+        except ValueError:
+            weight = 1.0
+        if weight > 0:
+            offered.add(name.strip().lower())
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return ""
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI de compresión por umbral de tamaño."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer bloque del cuerpo
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            media_type = headers.get("content-type", "").split(";")[0].strip()
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or media_type in STREAMING_MEDIA_TYPES
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            # El ETag fuerte describe los bytes sin comprimir: comprimido
+            # pasa a débil (If-None-Match compara en forma débil y sigue
+            # coincidiendo)
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            passthrough = True
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+__all__ = [
+    "CompressionMiddleware",
+    "FastJSONResponse",
+    "dumps_json",
+    "versioned_response",
+]
@@ -0,0 +1,5 @@
+# File: benchmarks/__init__.py
+"""
+Benchmarks de Monitor360 (no forman parte de la suite de tests).
+Se ejecutan como módulos: `python -m benchmarks.<nombre>`.
+"""
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# File: benchmarks/bench_fuzzy_match.py
+"""
+Compara el paso fuzzy de asociación: barrido completo con difflib
+(comportamiento anterior) vs `NameMatcher` con índice de trigramas.
+
+Uso:
+    python -m benchmarks.bench_fuzzy_match --clients 1064 --devices 3000
+"""
+
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+
+from app.services.name_matcher import NameMatcher, normalize_name
+
+FIRST = ["Juan", "María", "José", "Luis", "Ana", "Matías", "Sofía", "Jorge"]
+LAST = ["Gómez", "Pérez", "Guidone", "Cara", "Álvarez", "Fernández", "Ruiz", "Sosa"]
+
+
+def synthetic_names(n: int, rng: random.Random) -> list:
+    return [
+        f"{rng.choice(LAST)} {rng.choice(FIRST)} {rng.choice(FIRST)} {i}"
+        for i in range(n)
+    ]
+
+
+def _mutate(name: str, rng: random.Random) -> str:
+    """Simula cómo aparece el cliente en MikroWisp: mayúsculas, typo, estado."""
+    chars = list(name.upper())
+    pos = rng.randrange(len(chars))
+    chars[pos] = rng.choice("AEIOU")
+    return "".join(chars) + rng.choice(["  ACTIVO", " SUSPENDIDO", ""])
+
+
+def brute_force(client_names, device_names, threshold):
+    """Barrido O(clientes × dispositivos) sobre nombres normalizados."""
+    norm_devices = [normalize_name(d) for d in device_names]
+    out = []
+    for name in client_names:
+        query = normalize_name(name)
+        best_pos, best_ratio = None, 0.0
+        for pos, dev in enumerate(norm_devices):
+            if dev:
+                ratio = SequenceMatcher(None, query, dev).ratio()
+                if ratio > best_ratio:
+                    best_pos, best_ratio = pos, ratio
+        out.append(best_pos if best_ratio >= threshold else None)
+    return out
+
+
+def indexed(client_names, device_names, threshold):
+    matcher = NameMatcher(device_names)
+    out = []
+    for name in client_names:
+        hit = matcher.best_match(name, threshold)
+        out.append(hit[0] if hit else None)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1064)
+    parser.add_argument("--devices", type=int, default=3000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=360)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    devices = synthetic_names(args.devices, rng)
+    clients = [_mutate(rng.choice(devices), rng) for _ in range(args.clients)]
+
+    t0 = time.perf_counter()
+    expected = brute_force(clients, devices, args.threshold)
+    t_brute = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = indexed(clients, devices, args.threshold)
+    t_index = time.perf_counter() - t0
+
+    same = sum(1 for a, b in zip(expected, got) if a == b)
+    matched = sum(1 for x in got if x is not None)
+    print(f"clientes={args.clients} dispositivos={args.devices}")
+    print(f"difflib completo : {t_brute:8.2f} s")
+    print(f"trigramas top-k  : {t_index:8.2f} s  ({t_brute / t_index:.0f}x)")
+    print(f"coincidencias    : {same}/{len(got)} idénticas, {matched} asociados")
+
+
+if __name__ == "__main__":
+    main()
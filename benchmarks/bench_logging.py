@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# File: benchmarks/bench_logging.py
+"""
+Costo del logging en el loop de descubrimiento, medido en el hilo que
+loguea: `FileHandler` síncrono con texto plano (configuración anterior,
+`basicConfig` en los servicios) contra el pipeline de `logging_setup`
+(JSON, cola + hilo escritor, límite de `routeros.auth_failed`).
+
+Cada router simula `--failures` contraseñas fallidas, la conexión y un
+evento de fin de router. `--io-delay-ms` agrega una espera por escritura
+para emular un disco lento o un volumen de red.
+
+Uso:
+    python -m benchmarks.bench_logging --routers 2000 --failures 4
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app.services import logging_setup
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, path: str, delay_s: float):
+        super().__init__(path, encoding="utf-8")
+        self.delay_s = delay_s
+
+    def emit(self, record):
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        super().emit(record)
+
+
+def discovery_loop_plain(logger: logging.Logger, routers: int, failures: int):
+    for r in range(routers):
+        ip = f"10.0.{r >> 8 & 0xFF}.{r & 0xFF}"
+        for attempt in range(failures):
+            logger.warning(f"Fallo conexión a {ip} con 'password{attempt}': timeout")
+        logger.info(f"Conexión exitosa a {ip} con contraseña 'password{failures}'")
+        logger.info(f"Router {ip} procesado en 12.5 ms")
+
+
+def discovery_loop_structured(log, routers: int, failures: int):
+    for r in range(routers):
+        ip = f"10.0.{r >> 8 & 0xFF}.{r & 0xFF}"
+        for attempt in range(failures):
+            log.warning(
+                "routeros.auth_failed", router_ip=ip, attempt=attempt, error="timeout"
+            )
+        log.info("routeros.connected", router_ip=ip, attempt=failures + 1)
+        log.info("discovery.router", router_ip=ip, duration_ms=12.5)
+
+
+def run(routers: int, failures: int, io_delay_ms: float):
+    delay = io_delay_ms / 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        # Anterior: escritura síncrona en el hilo del descubrimiento
+        plain = logging.getLogger("bench.plain")
+        plain.propagate = False
+        plain.setLevel(logging.INFO)
+        handler = SlowFileHandler(os.path.join(tmp, "plain.log"), delay)
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+        )
+        plain.addHandler(handler)
+        t0 = time.perf_counter()
+        discovery_loop_plain(plain, routers, failures)
+        plain_s = time.perf_counter() - t0
+        handler.close()
+        plain_lines = sum(1 for _ in open(handler.baseFilename, encoding="utf-8"))
+
+        # Nuevo: JSON encolado, escrito por el listener
+        structured_path = os.path.join(tmp, "structured.log")
+        listener = logging_setup.configure_logging(log_file=structured_path)
+        for target in listener.handlers:
+            target.emit = _delayed(target.emit, delay)
+        log = logging_setup.get_logger("bench.structured")
+        t0 = time.perf_counter()
+        discovery_loop_structured(log, routers, failures)
+        structured_s = time.perf_counter() - t0
+        logging_setup.shutdown_logging()
+        drained_s = time.perf_counter() - t0
+        structured_lines = sum(1 for _ in open(structured_path, encoding="utf-8"))
+
+    per_router = 1e6 / routers
+    print(f"routers={routers} fallos/router={failures} io_delay={io_delay_ms} ms")
+    print(
+        f"  {'texto síncrono':<24} loop={plain_s * 1000:9.1f} ms "
+        f"({plain_s * per_router:7.1f} µs/router)  líneas={plain_lines:>7,}"
+    )
+    print(
+        f"  {'JSON en cola':<24} loop={structured_s * 1000:9.1f} ms "
+        f"({structured_s * per_router:7.1f} µs/router)  líneas={structured_lines:>7,}"
+        f"  (escrito en {drained_s * 1000:.1f} ms)"
+    )
+
+
+def _delayed(emit, delay_s: float):
+    if not delay_s:
+        return emit
+
+    def wrapper(record):
+        time.sleep(delay_s)
+        emit(record)
+
+    return wrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routers", type=int, default=2000)
+    parser.add_argument("--failures", type=int, default=4)
+    parser.add_argument("--io-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    run(args.routers, args.failures, args.io_delay_ms)
+
+
+if __name__ == "__main__":
+    main()
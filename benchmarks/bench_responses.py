@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# File: benchmarks/bench_responses.py
+"""
+Tiempo y bytes de las respuestas de /topology y /status: ruta anterior
+(`jsonable_encoder` + `JSONResponse`, sin comprimir) contra
+`FastJSONResponse` + `CompressionMiddleware` (identity, gzip y brotli).
+
+Los servicios se reemplazan por payloads sintéticos, así se mide solo la
+serialización y el transporte HTTP (TestClient, sin red).
+
+Uso:
+    python -m benchmarks.bench_responses --nodes 10000 --devices 5000
+"""
+
+import argparse
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import app.routers.monitoring as monitoring
+from app.main import app
+from app.utils.responses import brotli, dumps_json, orjson
+from benchmarks.bench_uisp_devices import synthetic_device
+
+
+def synthetic_topology(n: int) -> dict:
+    nodes, edges = [], []
+    for i in range(n):
+        ip = f"10.{(i >> 16) & 0xFF}.{(i >> 8) & 0xFF}.{i & 0xFF}"
+        nodes.append(
+            {
+                "id": ip,
+                "label": f"Cliente {i}",
+                "type": "client",
+                "signal": -50 - (i % 30),
+                "cliente_id": str(i),
+                "cliente_nombre": f"Cliente {i} ACTIVO",
+                "plan": "30M",
+                "matched": True,
+                "método": "ip_exact",
+                "similarity": 1.0,
+                "dispositivo_id": f"dev-{i:08d}",
+                "hostname": f"cpe-{i}",
+            }
+        )
+        edges.append({"source": f"10.0.0.{i % 8}", "target": ip})
+    return {"nodes": nodes, "edges": edges}
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def _row(label: str, ms: float, size: int):
+    print(f"  {label:<34} t={ms:8.1f} ms  bytes={size:>11,}")
+
+
+def bench(client: TestClient, path: str, body: dict, payload: dict, repeat: int):
+    print(f"\n{path}")
+    legacy = lambda: JSONResponse(jsonable_encoder(payload)).body  # noqa: E731
+    _row("jsonable_encoder + json (antes)", _time(legacy, repeat), len(legacy()))
+    _row(
+        "dumps_json",
+        _time(lambda: dumps_json(payload), repeat),
+        len(dumps_json(payload)),
+    )
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    for enc in encodings:
+        headers = {"Accept-Encoding": enc}
+
+        def call(headers=headers):
+            return client.post(path, json=body, headers=headers)
+
+        size = int(call().headers["content-length"])
+        _row(f"HTTP {enc}", _time(call, repeat), size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    topology = synthetic_topology(args.nodes)
+    devices = [synthetic_device(i) for i in range(args.devices)]
+    status = {"mikrotik": {"10.0.0.1": True}, "uisp": devices}
+
+    monitoring.get_enriched_topology = lambda ips: topology
+    monitoring.scan_mikrotiks = lambda ips: status["mikrotik"]
+    monitoring.get_uisp_devices = lambda: devices
+
+    print(f"orjson={'sí' if orjson else 'no'}  brotli={'sí' if brotli else 'no'}")
+    client = TestClient(app)
+    body = {"ip_list": ["10.0.0.1"]}
+    bench(client, "/api/monitoring/topology", body, topology, args.repeat)
+    bench(client, "/api/monitoring/status", body, status, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# File: benchmarks/bench_scale.py
+"""
+Escalado de Monitor360 sobre una red sintética (100 a 50k clientes).
+
+Por cada tamaño genera una `SyntheticNetwork`, levanta UISP falso por
+HTTP, reemplaza RouterOS y Supabase por dobles en proceso (ver
+`benchmarks/fakes.py`) y mide:
+
+- `uisp_download`: `get_uisp_device_records` (streaming + parseo);
+- `discover_topology` y `get_trunk_topology` sobre todos los routers;
+- `associate_clients_to_devices` con el CSV de MikroWisp sintético;
+- `monitor_and_store` de un router contra `--monitor-clients` clientes;
+- HTTP: `POST /api/monitoring/topology`, `GET .../topology/snapshot`,
+  `GET /api/alarms/` y `GET /metrics` (TestClient, sin red).
+
+`--storage sqlite` escribe en una base SQLite temporal en lugar del
+Supabase falso (que simula `--db-latency-ms` por request) y
+`--write-behind` antepone el spool local con envío en segundo plano.
+
+Los resultados se guardan en JSON (`--output`) y, con `--baseline`, se
+comparan contra una corrida anterior: sale con código 1 si algún
+escenario empeora más de `--max-regression`.
+
+Uso:
+    python -m benchmarks.bench_scale --sizes 100,1000,10000
+    python -m benchmarks.bench_scale --sizes 1000 \\
+        --routeros-command-ms 2 --uisp-latency-ms 50 --routeros-failure-rate 0.05
+    python -m benchmarks.bench_scale --baseline benchmarks/results/baseline.json
+    python -m benchmarks.bench_scale --sizes 1000 --db-latency-ms 30 --storage sqlite
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from app.services.storage import BACKENDS, SqliteStorage
+from app.services.write_spool import SpooledStorage, WriteSpool
+from benchmarks.fakes import FakeRouterOsPool, FakeSupabase, FakeUispServer
+from benchmarks.synthetic import SyntheticNetwork
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = "100,1000,10000,50000"
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _measure(fn: Callable, repeat: int):
+    """(mejor tiempo en segundos, resultado de la última corrida)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+class Environment:
+    """Conecta los servicios de la app a los dobles de una red sintética."""
+
+    def __init__(self, network: SyntheticNetwork, workdir: str, args):
+        from app import supabase_client
+        from app.services import (
+            client_service,
+            logging_setup,
+            mikrotik_service,
+            monitoring_service,
+            storage,
+            tracing,
+            uisp_service,
+        )
+
+        self.network = network
+        self.db = FakeSupabase(args.db_latency_ms)
+        self.uisp = FakeUispServer(
+            network, args.uisp_latency_ms, args.uisp_failure_rate
+        ).__enter__()
+        FakeRouterOsPool.configure(
+            network,
+            connect_ms=args.routeros_connect_ms,
+            command_ms=args.routeros_command_ms,
+            failure_rate=args.routeros_failure_rate,
+        )
+        self.csv_path = network.write_client_csv(os.path.join(workdir, "clientes.csv"))
+
+        self._saved = []
+        self._cwd = os.getcwd()
+        os.chdir(workdir)  # caches y salidas relativas quedan en el temporal
+        self._set(os.environ, "ENRICHED_OUTPUT", os.path.join(workdir, "enriched.json"))
+        logging_setup.shutdown_logging()
+        logging_setup.configure_logging(log_file=os.path.join(workdir, "bench.log"))
+        tracing.set_exporter(tracing._NullExporter())
+        self._set(supabase_client, "_client", self.db)
+        if args.storage == "sqlite":
+            self.storage = SqliteStorage(os.path.join(workdir, "monitor360.db"))
+        else:
+            self.storage = storage.SupabaseStorage()
+        if args.write_behind:
+            self.storage = SpooledStorage(
+                self.storage, WriteSpool(os.path.join(workdir, "spool"))
+            )
+        self._set(storage, "_storage", self.storage)
+        self._set(mikrotik_service, "RouterOsApiPool", FakeRouterOsPool)
+        self._set(mikrotik_service, "PASSWORDS", ["admin"])
+        self._set(
+            mikrotik_service,
+            "CREDENTIALS_FILE",
+            os.path.join(workdir, "credentials.json"),
+        )
+        self._set(uisp_service, "UISP_URL", self.uisp.url)
+        self._set(client_service, "CLIENT_CSV_PATH", self.csv_path)
+        # El traffic-generator falso responde al instante
+        self._set(
+            monitoring_service,
+            "time",
+            SimpleNamespace(sleep=lambda s: None, perf_counter=time.perf_counter),
+        )
+
+    def _set(self, target, name: str, value):
+        if isinstance(target, MutableMapping):
+            self._saved.append((target, name, target.get(name)))
+            target[name] = value
+        else:
+            self._saved.append((target, name, getattr(target, name)))
+            setattr(target, name, value)
+
+    def _backend(self):
+        return getattr(self.storage, "inner", self.storage)
+
+    def seed_alarms(self, rows: List[Dict]):
+        """Carga alarmas existentes en el almacenamiento elegido."""
+        if isinstance(self._backend(), SqliteStorage):
+            self._backend().insert_alarms(rows)
+        else:
+            self.db.seed("alarmas", rows)
+
+    def db_rows(self) -> int:
+        """Filas escritas (Supabase falso) o guardadas (SQLite)."""
+        if isinstance(self.storage, SpooledStorage):
+            self.storage.flush()
+        if isinstance(self._backend(), SqliteStorage):
+            with sqlite3.connect(self._backend().path) as conn:
+                return sum(
+                    conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("alarmas", "topologia")
+                )
+        return sum(self.db.rows.values())
+
+    def close(self):
+        """Detiene UISP falso y deja los servicios como estaban."""
+        from app.services import logging_setup, tracing
+
+        self.uisp.__exit__(None, None, None)
+        self.storage.close()
+        for target, name, value in reversed(self._saved):
+            if not isinstance(target, MutableMapping):
+                setattr(target, name, value)
+            elif value is None:
+                target.pop(name, None)
+            else:
+                target[name] = value
+        logging_setup.shutdown_logging()
+        tracing.set_exporter(None)
+        os.chdir(self._cwd)
+
+
+def run_size(clients: int, args) -> List[Dict]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services.client_service import (
+        associate_clients_to_devices,
+        load_clients_csv,
+    )
+    from app.services.discovery_service import discover_topology
+    from app.services.monitoring_service import monitor_and_store
+    from app.services.trunk_service import get_trunk_topology
+    from app.services.uisp_service import get_uisp_device_records
+
+    network = SyntheticNetwork(clients, routers=args.routers)
+    routers = network.routers
+    results = []
+
+    def record(scenario: str, seconds: float, **extra):
+        results.append(
+            {
+                "scenario": scenario,
+                "clients": clients,
+                "routers": len(routers),
+                "seconds": round(seconds, 4),
+                **extra,
+            }
+        )
+        detail = " ".join(f"{k}={v}" for k, v in extra.items())
+        print(f"  {scenario:<26} {seconds * 1000:10.1f} ms  {detail}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = Environment(network, workdir, args)
+        try:
+            seconds, devices = _measure(get_uisp_device_records, args.repeat)
+            record("uisp_download", seconds, devices=len(devices))
+
+            seconds, topo = _measure(lambda: discover_topology(routers), args.repeat)
+            record(
+                "discover_topology",
+                seconds,
+                nodes=len(topo["nodes"]),
+                edges=len(topo["edges"]),
+                routeros_commands=FakeRouterOsPool.commands,
+            )
+
+            seconds, trunk = _measure(lambda: get_trunk_topology(routers), args.repeat)
+            record("get_trunk_topology", seconds, edges=len(trunk["edges"]))
+
+            client_df = load_clients_csv(env.csv_path)
+            seconds, assoc = _measure(
+                lambda: associate_clients_to_devices(client_df, devices), args.repeat
+            )
+            matched = sum(1 for a in assoc if a.get("matched"))
+            record("associate_clients", seconds, matched=matched)
+
+            sample = [c["ip"] for c in network.clients if c["router"] == routers[0]][
+                : args.monitor_clients
+            ]
+            seconds, measured = _measure(
+                lambda: monitor_and_store(routers[:1], sample), args.repeat
+            )
+            record("monitor_and_store", seconds, pairs=len(measured))
+
+            http = TestClient(app)
+            for scenario, method, path, body in (
+                (
+                    "http_topology",
+                    "post",
+                    "/api/monitoring/topology",
+                    {"ip_list": routers},
+                ),
+                (
+                    "http_topology_snapshot",
+                    "get",
+                    "/api/monitoring/topology/snapshot",
+                    None,
+                ),
+                ("http_alarms", "get", "/api/alarms/?limit=100", None),
+                ("http_metrics", "get", "/metrics", None),
+            ):
+                kwargs = {"json": body} if body is not None else {}
+                seconds, resp = _measure(
+                    lambda call=getattr(http, method), path=path, kwargs=kwargs: call(
+                        path, headers={"accept-encoding": "gzip"}, **kwargs
+                    ),
+                    args.repeat,
+                )
+                record(
+                    scenario,
+                    seconds,
+                    status=resp.status_code,
+                    bytes=len(resp.content),
+                )
+            record("db_writes", 0.0, rows=env.db_rows())
+        finally:
+            env.close()
+    return results
+
+
+def compare(results: List[Dict], baseline_path: str, max_regression: float) -> bool:
+    """Imprime la comparación; False si algún escenario empeoró de más."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["clients"]): r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\nContra {baseline_path} (tolerancia {max_regression:.0%}):")
+    for r in results:
+        base = baseline.get((r["scenario"], r["clients"]))
+        if base is None or not base["seconds"]:
+            continue
+        change = r["seconds"] / base["seconds"] - 1
+        # Debajo de 5 ms el ruido domina: no se marca como regresión
+        regressed = change > max_regression and r["seconds"] > 0.005
+        ok &= not regressed
+        print(
+            f"  {'REGRESIÓN' if regressed else 'ok':<10} {r['scenario']:<26} "
+            f"n={r['clients']:<6} {base['seconds'] * 1000:9.1f} → "
+            f"{r['seconds'] * 1000:9.1f} ms ({change:+.0%})"
+        )
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--routers", type=int, default=0, help="0: clientes/250")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--monitor-clients", type=int, default=50)
+    parser.add_argument("--routeros-connect-ms", type=float, default=0.0)
+    parser.add_argument("--routeros-command-ms", type=float, default=0.0)
+    parser.add_argument("--routeros-failure-rate", type=float, default=0.0)
+    parser.add_argument("--uisp-latency-ms", type=float, default=0.0)
+    parser.add_argument("--uisp-failure-rate", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--storage", choices=BACKENDS, default="supabase")
+    parser.add_argument("--write-behind", action="store_true", help="spool local")
+    parser.add_argument("--output", help="JSON de resultados (por defecto en results/)")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    os.environ.setdefault("WARMUP", "0")
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"\n{size} clientes")
+        results.extend(run_size(size, args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"scale-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "commit": _git_commit(),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                    "args": vars(args),
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResultados en {output}")
+
+    if args.baseline and not compare(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
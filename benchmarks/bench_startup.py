@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# File: benchmarks/bench_startup.py
+"""
+Tiempo de importación de `app.main` (arranque en frío y cada `--reload`).
+
+Importa la app en subprocesos limpios y reporta la mediana, si quedaron
+cargados módulos pesados (pandas, supabase) y los módulos con mayor
+tiempo acumulado según `python -X importtime`.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 --top 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("pandas", "numpy", "supabase", "rapidfuzz")
+
+_PROBE = (
+    "import sys, time; t0 = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t0); "
+    f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ, WARMUP="0")
+    # Un worker sin credenciales de Supabase también tiene que arrancar
+    env.pop("NEXT_PUBLIC_SUPABASE_URL", None)
+    env.pop("NEXT_PUBLIC_SUPABASE_ANON_KEY", None)
+    return env
+
+
+def import_app() -> tuple:
+    """(segundos importando app.main, módulos pesados cargados)."""
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    ).stdout.splitlines()
+    return float(out[0]), [m for m in out[1].split(",") if m]
+
+
+def top_imports(n: int) -> list:
+    """Módulos con mayor tiempo acumulado (µs) al importar app.main."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    samples = [import_app() for _ in range(args.runs)]
+    elapsed = time.perf_counter() - t0
+    times = [s for s, _ in samples]
+    print(
+        f"import app.main: mediana={statistics.median(times) * 1000:.1f} ms "
+        f"min={min(times) * 1000:.1f} ms ({args.runs} corridas, {elapsed:.1f} s)"
+    )
+    print(f"módulos pesados cargados: {samples[-1][1] or 'ninguno'}")
+    print(f"\nTop {args.top} por tiempo acumulado:")
+    for cumulative, name in top_imports(args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# File: benchmarks/bench_uisp_devices.py
+"""
+Compara memoria y tiempo entre el listado UISP como dicts crudos
+(`resp.json()`) y el parseo en streaming a registros `UispDevice`.
+
+Uso:
+    python -m benchmarks.bench_uisp_devices --devices 5000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from app.services.uisp_service import parse_uisp_device_stream
+
+
+def synthetic_device(i: int) -> dict:
+    """Dispositivo con la forma (y el volumen) aproximado de UISP v2.1."""
+    mac = ":".join(f"{(i >> s) & 0xFF:02X}" for s in (40, 32, 24, 16, 8, 0))
+    return {
+        "id": f"dev-{i:08d}",
+        "ipAddress": f"10.{(i >> 16) & 0xFF}.{(i >> 8) & 0xFF}.{i & 0xFF}",
+        "mac": mac,
+        "parentId": f"dev-{i // 20:08d}" if i >= 20 else None,
+        "rssi": -50 - (i % 30),
+        "identification": {
+            "id": f"dev-{i:08d}",
+            "name": f"Cliente {i} ACTIVO",
+            "mac": mac,
+            "hostname": f"cpe-{i}",
+            "model": "LBE-5AC-Gen2",
+            "modelName": "LiteBeam 5AC Gen2",
+            "type": "airMax",
+            "category": "wireless",
+            "firmwareVersion": "8.7.11",
+            "site": {"id": f"site-{i % 50}", "name": f"Sitio {i % 50}"},
+        },
+        "overview": {
+            "status": "active",
+            "cpu": i % 100,
+            "ram": (i * 7) % 100,
+            "uptime": 86400 + i,
+            "signal": -50 - (i % 30),
+            "frequency": 5180 + (i % 20) * 5,
+            "linkScore": {"score": 0.9, "scoreMax": 1.0, "airTimeScore": 0.8},
+        },
+        "attributes": {
+            "ssid": "CONECTA360",
+            "apDevice": {"id": f"dev-{i // 20:08d}", "name": f"AP {i // 20}"},
+        },
+        "interfaces": [
+            {"identification": {"name": "eth0", "mac": mac}, "status": "up"},
+            {"identification": {"name": "ath0", "mac": mac}, "status": "up"},
+        ],
+    }
+
+
+def _chunks(payload: bytes, size: int = 64 * 1024):
+    for start in range(0, len(payload), size):
+        yield payload[start : start + size]
+
+
+def _measure(label: str, fn):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<28} n={len(result):>7}  t={elapsed * 1000:8.1f} ms  "
+        f"retenido={retained / 2**20:7.2f} MiB  pico={peak / 2**20:7.2f} MiB"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=5000)
+    args = parser.parse_args()
+
+    payload = json.dumps([synthetic_device(i) for i in range(args.devices)]).encode()
+    print(f"Payload: {len(payload) / 2**20:.2f} MiB, {args.devices} dispositivos")
+
+    # El pico de `json.loads` incluye el cuerpo completo decodificado
+    _measure("dicts (resp.json)", lambda: json.loads(payload.decode("utf-8")))
+    _measure(
+        "UispDevice (streaming)",
+        lambda: list(parse_uisp_device_stream(_chunks(payload))),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# File: benchmarks/fakes.py
+"""
+Dobles en proceso de RouterOS, UISP y Supabase para los benchmarks.
+
+- `FakeRouterOsPool`: reemplazo de `routeros_api.RouterOsApiPool` que
+  responde con las tablas de una `SyntheticNetwork`. Simula latencia por
+  conexión y por comando, y una fracción de routers inalcanzables.
+- `FakeUispServer`: servidor HTTP real (hilo de fondo, puerto efímero)
+  con `/nms/api/v2.1/devices` y `/devices/{id}/statistics`, así se mide
+  también la descarga en streaming y el parseo.
+- `FakeSupabase`: tabla en memoria compatible con el builder de
+  supabase-py que usan los servicios; cuenta filas escritas y sirve
+  lecturas de las tablas sembradas.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic import SyntheticNetwork
+
+
+class FakeLatency:
+    """Espera configurable (ms) con jitter uniforme de ±`jitter`."""
+
+    def __init__(self, ms: float = 0.0, jitter: float = 0.2, seed: int = 7):
+        self.seconds = ms / 1000
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.seconds <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(self.seconds * factor)
+
+
+# ──────────────────────────────────────────────
+# RouterOS
+# ──────────────────────────────────────────────
+
+
+class FakeResource:
+    def __init__(self, api: "FakeRouterOsApi", path: str):
+        self._api = api
+        self._path = path
+
+    def get(self, **filters) -> List[Dict]:
+        self._api.command()
+        rows = self._api.tables.get(self._path, [])
+        if not filters:
+            return [dict(r) for r in rows]
+        return [dict(r) for r in rows if all(r.get(k) == v for k, v in filters.items())]
+
+    def add(self, **kwargs):
+        self._api.command()
+        if self._path == "/tool/traffic-generator":
+            self._api.traffic_tests[kwargs["name"]] = kwargs
+            # Resultado inmediato: el benchmark no espera la duración real
+            self._api.tables.setdefault(self._path, []).append(
+                {"name": kwargs["name"], "tx-rate": "9.4Mbps", "loss": "0.5"}
+            )
+        return {"ret": f"*{len(self._api.traffic_tests)}"}
+
+    def set(self, **kwargs):
+        self._api.command()
+
+    def remove(self, **kwargs):
+        self._api.command()
+
+    def call(self, command: str, arguments: Optional[Dict] = None):
+        self._api.command()
+        return []
+
+
+class FakeRouterOsApi:
+    def __init__(self, pool: "FakeRouterOsPool", tables: Dict[str, List[Dict]]):
+        self._pool = pool
+        self.tables = tables
+        self.traffic_tests: Dict[str, Dict] = {}
+
+    def command(self):
+        type(self._pool).commands += 1
+        self._pool.command_latency.wait()
+
+    def get_resource(self, path: str, *args, **kwargs) -> FakeResource:
+        return FakeResource(self, path)
+
+    get_binary_resource = get_resource
+
+
+class FakeRouterOsPool:
+    """
+    Fábrica compatible con `RouterOsApiPool(host=..., password=...)`.
+
+    Se configura a nivel de clase con `FakeRouterOsPool.configure(...)` y
+    se inyecta con `monkeypatch`/asignación en `mikrotik_service`.
+    """
+
+    network: Optional[SyntheticNetwork] = None
+    password = "admin"
+    connect_latency = FakeLatency()
+    command_latency = FakeLatency()
+    unreachable: set = set()
+    connects = 0
+    commands = 0
+
+    @classmethod
+    def configure(
+        cls,
+        network: SyntheticNetwork,
+        connect_ms: float = 0.0,
+        command_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        password: str = "admin",
+        seed: int = 11,
+    ):
+        rng = random.Random(seed)
+        cls.network = network
+        cls.password = password
+        cls.connect_latency = FakeLatency(connect_ms)
+        cls.command_latency = FakeLatency(command_ms)
+        cls.unreachable = {ip for ip in network.routers if rng.random() < failure_rate}
+        cls.connects = 0
+        cls.commands = 0
+
+    def __init__(
+        self, host: str, username: str = "admin", password: str = "", **kwargs
+    ):
+        self.host = host
+        self._password = password
+
+    def get_api(self) -> FakeRouterOsApi:
+        cls = type(self)
+        cls.connects += 1
+        cls.connect_latency.wait()
+        if self.host in cls.unreachable or self.host not in cls.network._router_index:
+            raise ConnectionError(f"timed out connecting to {self.host}")
+        if self._password != cls.password:
+            raise ConnectionError("invalid user name or password (6)")
+        return FakeRouterOsApi(self, cls.network.routeros_tables(self.host))
+
+    def set_timeout(self, timeout: float):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+# ──────────────────────────────────────────────
+# UISP
+# ──────────────────────────────────────────────
+
+
+class FakeUispServer:
+    """Servidor HTTP de UISP en `127.0.0.1:<puerto efímero>`."""
+
+    def __init__(
+        self,
+        network: SyntheticNetwork,
+        latency_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 13,
+    ):
+        self.network = network
+        self.latency = FakeLatency(latency_ms)
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._devices = json.dumps(network.uisp_devices()).encode()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-uisp", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeUispServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake.requests += 1
+                fake.latency.wait()
+                if fake.failure_rate and fake._rng.random() < fake.failure_rate:
+                    return self._send(503, b'{"error": "unavailable"}')
+                path = self.path.split("?")[0]
+                if path == "/nms/api/v2.1/devices":
+                    return self._send(200, fake._devices)
+                prefix, suffix = "/nms/api/v2.1/devices/", "/statistics"
+                if path.startswith(prefix) and path.endswith(suffix):
+                    device_id = path[len(prefix) : -len(suffix)]
+                    body = json.dumps(fake.network.uisp_statistics(device_id))
+                    return self._send(200, body.encode())
+                self._send(404, b'{"error": "not found"}')
+
+            def _send(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+# ──────────────────────────────────────────────
+# Supabase
+# ──────────────────────────────────────────────
+
+
+class _FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._rows: List[Dict] = []
+        self._write = False
+        self._limit: Optional[int] = None
+        self._head = False
+
+    def insert(self, rows, **kwargs):
+        self._rows = rows if isinstance(rows, list) else [rows]
+        self._write = True
+        return self
+
+    upsert = insert
+
+    def select(self, *columns, head: bool = False, **kwargs):
+        self._head = head
+        return self
+
+    def limit(self, n: int, **kwargs):
+        self._limit = n
+        return self
+
+    def __getattr__(self, name):
+        # eq/in_/order/...: los filtros se ignoran
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self._db.latency.wait()
+        stored = self._db.data.get(self._table)
+        if self._write:
+            with self._db._lock:
+                self._db.rows[self._table] = self._db.rows.get(self._table, 0) + len(
+                    self._rows
+                )
+                self._db.writes += 1
+                if stored is not None:
+                    stored.extend(self._rows)
+            return SimpleNamespace(data=[], count=0)
+        stored = stored or []
+        data = [] if self._head else stored[: self._limit]
+        return SimpleNamespace(data=data, count=len(stored))
+
+
+class FakeSupabase:
+    """
+    Cuenta filas escritas por tabla. Las tablas sembradas con `seed`
+    además guardan lo escrito y responden lecturas (sin filtrar, con
+    `limit` y `count`).
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = FakeLatency(latency_ms)
+        self.rows: Dict[str, int] = {}
+        self.data: Dict[str, List[Dict]] = {}
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def seed(self, table: str, rows: List[Dict]) -> "FakeSupabase":
+        self.data[table] = list(rows)
+        return self
+
+    def table(self, name: str) -> _FakeQuery:
+        return _FakeQuery(self, name)
+
+
+__all__ = [
+    "FakeLatency",
+    "FakeRouterOsPool",
+    "FakeSupabase",
+    "FakeUispServer",
+]
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+# File: benchmarks/load_test.py
+"""
+Prueba de carga de la API con reporte de latencia contra SLOs.
+
+Usuarios virtuales en lazo cerrado (cada uno manda un request, espera la
+respuesta y, con `--think-ms`, una pausa exponencial) contra la app con
+los dobles de `benchmarks/fakes.py` (RouterOS, UISP y Supabase, como en
+`bench_scale`). Por cada nivel de `--users` mide, por endpoint,
+throughput y p50/p95/p99.
+
+Modos (`--mode`):
+
+- `asgi`: en proceso con `httpx.ASGITransport`, sin sockets;
+- `uvicorn`: servidor uvicorn real en un hilo, por TCP con keep-alive;
+- `--url`: una instancia ya levantada (sin dobles: usa sus backends).
+
+En `asgi` y `uvicorn` cliente y servidor comparten proceso (y GIL): los
+números son una cota inferior de lo que rinde una instancia dedicada.
+
+Perfiles (`--profile`):
+
+- `dashboard`: topología completa, sondeo con `If-None-Match`,
+  listado y resumen de alarmas;
+- `api`: estado de routers, alarmas, envío y consulta de trabajos;
+- `mixed`: ambos.
+
+Con `--slo` (ver `benchmarks/slo.json`) se evalúan los umbrales en cada
+nivel y se informa el máximo de usuarios que los cumple; con
+`--baseline` se compara el p99 contra una corrida anterior. Sale con
+código 1 si algún SLO no se cumple o el p99 empeora más de
+`--max-regression`.
+
+Uso:
+    python -m benchmarks.load_test --users 1,10,50 --duration 10
+    python -m benchmarks.load_test --mode uvicorn --profile dashboard \\
+        --slo benchmarks/slo.json --db-latency-ms 20
+    python -m benchmarks.load_test --url http://monitor360:8000 --users 5,20
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from app.services.storage import BACKENDS
+from benchmarks.bench_scale import RESULTS_DIR, Environment, _git_commit
+from benchmarks.synthetic import SyntheticNetwork
+
+DEFAULT_USERS = "1,5,10,25,50"
+
+
+# ──────────────────────────────────────────────
+# Operaciones y perfiles
+# ──────────────────────────────────────────────
+
+
+class Operation:
+    """Un tipo de request; `path` puede depender del estado compartido."""
+
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        path,
+        body: Optional[Callable[[Dict], Dict]] = None,
+        headers: Optional[Callable[[Dict], Dict]] = None,
+        after: Optional[Callable[[Dict, object], None]] = None,
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.after = after
+
+    async def send(self, client, state: Dict):
+        path = self.path(state) if callable(self.path) else self.path
+        kwargs = {}
+        if self.body is not None:
+            kwargs["json"] = self.body(state)
+        if self.headers is not None:
+            kwargs["headers"] = self.headers(state)
+        resp = await client.request(self.method, path, **kwargs)
+        if self.after is not None:
+            self.after(state, resp)
+        return resp
+
+
+def _remember_version(state: Dict, resp):
+    if resp.status_code == 200 and resp.headers.get("etag"):
+        state["etag"] = resp.headers["etag"]
+
+
+def _remember_job(state: Dict, resp):
+    if resp.status_code == 202:
+        state["jobs"].append(resp.json()["id"])
+
+
+def _job_path(state: Dict) -> str:
+    return f"/api/jobs/{state['jobs'][-1]}" if state["jobs"] else "/api/jobs/"
+
+
+OPERATIONS = {
+    op.name: op
+    for op in (
+        Operation("health", "GET", "/"),
+        Operation(
+            "topology",
+            "GET",
+            "/api/monitoring/topology/snapshot",
+            after=_remember_version,
+        ),
+        # Dashboard que sondea: casi siempre 304 sin cuerpo
+        Operation(
+            "topology_poll",
+            "GET",
+            "/api/monitoring/topology/snapshot",
+            headers=lambda s: {"if-none-match": s.get("etag", '"none"')},
+            after=_remember_version,
+        ),
+        Operation("alarms", "GET", "/api/alarms/?limit=100"),
+        Operation("alarm_summary", "GET", "/api/alarms/summary"),
+        Operation(
+            "status",
+            "POST",
+            "/api/monitoring/status",
+            body=lambda s: {"ip_list": s["routers"][:2]},
+        ),
+        Operation(
+            "job_submit",
+            "POST",
+            "/api/jobs/trunk",
+            body=lambda s: {"ip_list": s["routers"][:2]},
+            after=_remember_job,
+        ),
+        Operation("job_status", "GET", _job_path),
+    )
+}
+
+PROFILES: Dict[str, Dict[str, int]] = {
+    "dashboard": {
+        "topology": 2,
+        "topology_poll": 6,
+        "alarms": 4,
+        "alarm_summary": 1,
+        "health": 1,
+    },
+    "api": {"status": 2, "alarms": 3, "job_submit": 1, "job_status": 3},
+}
+PROFILES["mixed"] = {
+    name: PROFILES["dashboard"].get(name, 0) + PROFILES["api"].get(name, 0)
+    for name in OPERATIONS
+}
+
+
+# ──────────────────────────────────────────────
+# Medición
+# ──────────────────────────────────────────────
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por rango más cercano (`sorted_values` ya ordenado)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: Dict[str, List], seconds: float) -> Dict[str, Dict]:
+    """Por endpoint: cantidad, rps, percentiles (ms), errores y códigos."""
+    out = {}
+    for name, items in sorted(samples.items()):
+        latencies = sorted(lat for lat, _ in items)
+        statuses: Dict[str, int] = {}
+        for _, status in items:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        # 0 = error de transporte; 429 es contrapresión esperada, no error
+        errors = sum(1 for _, status in items if status == 0 or status >= 500)
+        out[name] = {
+            "count": len(items),
+            "rps": round(len(items) / seconds, 1) if seconds else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(items), 4) if items else 0.0,
+            "statuses": statuses,
+        }
+    return out
+
+
+async def _virtual_user(client, ops, weights, state, samples, stop_at, think_s, rng):
+    while time.perf_counter() < stop_at:
+        op = rng.choices(ops, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            status = (await op.send(client, state)).status_code
+        except Exception:
+            status = 0
+        if state["recording"]:
+            samples.setdefault(op.name, []).append((time.perf_counter() - t0, status))
+        if think_s:
+            await asyncio.sleep(rng.expovariate(1 / think_s))
+
+
+async def run_level(
+    client,
+    users: int,
+    profile: Dict[str, int],
+    state: Dict,
+    duration_s: float,
+    warmup_s: float = 0.0,
+    think_ms: float = 0.0,
+    seed: int = 48,
+) -> Dict:
+    """Un nivel de concurrencia: `warmup_s` sin medir y `duration_s` medidos."""
+    ops = [OPERATIONS[name] for name, weight in profile.items() if weight]
+    weights = [profile[op.name] for op in ops]
+    samples: Dict[str, List] = {}
+    state["recording"] = False
+    start = time.perf_counter()
+    stop_at = start + warmup_s + duration_s
+    loop = asyncio.get_running_loop()
+    loop.call_later(warmup_s, state.__setitem__, "recording", True)
+    await asyncio.gather(
+        *(
+            _virtual_user(
+                client,
+                ops,
+                weights,
+                state,
+                samples,
+                stop_at,
+                think_ms / 1000,
+                random.Random(seed + i),
+            )
+            for i in range(users)
+        )
+    )
+    measured = time.perf_counter() - start - warmup_s
+    total = sum(len(items) for items in samples.values())
+    return {
+        "users": users,
+        "seconds": round(measured, 3),
+        "requests": total,
+        "rps": round(total / measured, 1) if measured else 0.0,
+        "endpoints": summarize(samples, measured),
+    }
+
+
+# ──────────────────────────────────────────────
+# SLOs y comparación
+# ──────────────────────────────────────────────
+
+
+def evaluate_slo(level: Dict, slo: Dict) -> List[str]:
+    """
+    Violaciones de un nivel. `slo` = {"default": {...}, "endpoints":
+    {nombre: {...}}} con claves `p50_ms`, `p95_ms`, `p99_ms` (máximos),
+    `error_rate` (máximo) y `min_rps` (mínimo).
+    """
+    violations = []
+    default = slo.get("default", {})
+    for name, stats in level["endpoints"].items():
+        limits = {**default, **slo.get("endpoints", {}).get(name, {})}
+        for key, limit in limits.items():
+            if key == "min_rps":
+                if stats["rps"] < limit:
+                    violations.append(f"{name}: rps {stats['rps']} < {limit}")
+            elif key in stats and stats[key] > limit:
+                violations.append(f"{name}: {key} {stats[key]} > {limit}")
+    return violations
+
+
+def compare(runs: List[Dict], baseline_path: str, max_regression: float) -> bool:
+    """p99 por (modo, usuarios, endpoint) contra una corrida anterior."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (run["mode"], level["users"], name): stats["p99_ms"]
+            for run in json.load(f)["runs"]
+            for level in run["levels"]
+            for name, stats in level["endpoints"].items()
+        }
+    ok = True
+    print(f"\nContra {baseline_path} (tolerancia {max_regression:.0%}):")
+    for run in runs:
+        for level in run["levels"]:
+            for name, stats in level["endpoints"].items():
+                base = baseline.get((run["mode"], level["users"], name))
+                if not base:
+                    continue
+                change = stats["p99_ms"] / base - 1
+                # Debajo de 5 ms el ruido domina
+                regressed = change > max_regression and stats["p99_ms"] > 5
+                ok &= not regressed
+                if regressed:
+                    print(
+                        f"  REGRESIÓN {run['mode']:<8} u={level['users']:<4} "
+                        f"{name:<14} p99 {base:.1f} → {stats['p99_ms']:.1f} ms "
+                        f"({change:+.0%})"
+                    )
+    if ok:
+        print("  sin regresiones")
+    return ok
+
+
+# ──────────────────────────────────────────────
+# Servidores
+# ──────────────────────────────────────────────
+
+
+class UvicornThread:
+    """uvicorn en un hilo de fondo sobre un puerto efímero."""
+
+    def __init__(self, app):
+        import uvicorn
+
+        # proto explícito: asyncio solo activa TCP_NODELAY en sockets
+        # aceptados si `proto == IPPROTO_TCP` (con 0, ~40 ms por respuesta)
+        self._sock = socket.socket(
+            socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP
+        )
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        # Sin lifespan: el entorno de dobles ya configuró logging y demás
+        config = uvicorn.Config(
+            app, lifespan="off", log_level="warning", access_log=False
+        )
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(
+            target=self.server.run,
+            kwargs={"sockets": [self._sock]},
+            name="uvicorn",
+            daemon=True,
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "UvicornThread":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("uvicorn no arrancó")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self._thread.join()
+        self._sock.close()
+
+
+async def _drive(client, levels: List[int], profile, state, args) -> List[Dict]:
+    # La topología del snapshot se genera una vez antes de medir
+    resp = await client.post(
+        "/api/monitoring/topology", json={"ip_list": state["routers"]}
+    )
+    resp.raise_for_status()
+    results = []
+    for users in levels:
+        level = await run_level(
+            client,
+            users,
+            profile,
+            state,
+            args.duration,
+            args.warmup,
+            args.think_ms,
+            args.seed,
+        )
+        _print_level(level)
+        results.append(level)
+    return results
+
+
+def _print_level(level: Dict):
+    print(
+        f"\n  {level['users']} usuarios: {level['requests']} requests, "
+        f"{level['rps']} req/s"
+    )
+    for name, s in level["endpoints"].items():
+        codes = " ".join(f"{k}×{v}" for k, v in sorted(s["statuses"].items()))
+        print(
+            f"    {name:<14} {s['rps']:8.1f} req/s  p50 {s['p50_ms']:8.1f}  "
+            f"p95 {s['p95_ms']:8.1f}  p99 {s['p99_ms']:8.1f} ms  {codes}"
+        )
+
+
+def run_mode(mode: str, levels: List[int], profile, args) -> Dict:
+    """Corre todos los niveles en `mode` (asgi | uvicorn | url)."""
+    import httpx
+
+    print(f"\n── {mode} ──")
+    limits = httpx.Limits(
+        max_connections=max(levels), max_keepalive_connections=max(levels)
+    )
+    timeout = httpx.Timeout(args.timeout)
+
+    if mode == "url":
+        state = {"routers": args.routers.split(","), "jobs": deque(maxlen=50)}
+
+        async def remote():
+            async with httpx.AsyncClient(
+                base_url=args.url, limits=limits, timeout=timeout
+            ) as client:
+                return await _drive(client, levels, profile, state, args)
+
+        return {"mode": mode, "levels": asyncio.run(remote())}
+
+    from app.main import app
+
+    network = SyntheticNetwork(args.clients)
+    state = {"routers": network.routers, "jobs": deque(maxlen=50)}
+    with tempfile.TemporaryDirectory() as workdir:
+        env = Environment(network, workdir, args)
+        env.seed_alarms(network.alarms(args.alarms))
+        try:
+            if mode == "asgi":
+                transport = httpx.ASGITransport(app=app)
+
+                async def in_process():
+                    async with httpx.AsyncClient(
+                        transport=transport,
+                        base_url="http://monitor360",
+                        timeout=timeout,
+                    ) as client:
+                        return await _drive(client, levels, profile, state, args)
+
+                levels_out = asyncio.run(in_process())
+            else:
+                with UvicornThread(app) as server:
+
+                    async def over_tcp():
+                        async with httpx.AsyncClient(
+                            base_url=server.url, limits=limits, timeout=timeout
+                        ) as client:
+                            return await _drive(client, levels, profile, state, args)
+
+                    levels_out = asyncio.run(over_tcp())
+        finally:
+            env.close()
+    return {"mode": mode, "levels": levels_out}
+
+
+# ──────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--mode", choices=("asgi", "uvicorn", "both"), default="both")
+    parser.add_argument("--url", help="instancia externa (ignora --mode)")
+    parser.add_argument("--routers", default="", help="IPs para --url, con coma")
+    parser.add_argument("--users", default=DEFAULT_USERS)
+    parser.add_argument("--duration", type=float, default=10.0, help="s por nivel")
+    parser.add_argument("--warmup", type=float, default=1.0, help="s sin medir")
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=48)
+    parser.add_argument("--clients", type=int, default=1000, help="red sintética")
+    parser.add_argument("--alarms", type=int, default=5000)
+    parser.add_argument("--routeros-connect-ms", type=float, default=0.0)
+    parser.add_argument("--routeros-command-ms", type=float, default=0.0)
+    parser.add_argument("--routeros-failure-rate", type=float, default=0.0)
+    parser.add_argument("--uisp-latency-ms", type=float, default=0.0)
+    parser.add_argument("--uisp-failure-rate", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--storage", choices=BACKENDS, default="supabase")
+    parser.add_argument("--write-behind", action="store_true", help="spool local")
+    parser.add_argument("--slo", help="JSON de SLOs (ver benchmarks/slo.json)")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--output", help="JSON de resultados (por defecto en results/)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("WARMUP", "0")
+    levels = [int(u) for u in args.users.split(",") if u.strip()]
+    profile = PROFILES[args.profile]
+    modes = (
+        ["url"]
+        if args.url
+        else ["asgi", "uvicorn"] if args.mode == "both" else [args.mode]
+    )
+
+    runs = [run_mode(mode, levels, profile, args) for mode in modes]
+
+    ok = True
+    if args.slo:
+        with open(args.slo, encoding="utf-8") as f:
+            slo = json.load(f)
+        print(f"\nSLOs ({args.slo}):")
+        for run in runs:
+            within = []
+            for level in run["levels"]:
+                level["slo_violations"] = evaluate_slo(level, slo)
+                for v in level["slo_violations"]:
+                    print(f"  FALLA {run['mode']:<8} u={level['users']:<4} {v}")
+                if not level["slo_violations"]:
+                    within.append(level["users"])
+            ok &= len(within) == len(run["levels"])
+            run["max_users_within_slo"] = max(within, default=0)
+            print(
+                f"  {run['mode']}: cumple hasta {run['max_users_within_slo']} usuarios"
+            )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "commit": _git_commit(),
+                    "python": sys.version.split()[0],
+                    "args": vars(args),
+                },
+                "runs": runs,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResultados en {output}")
+
+    if args.baseline:
+        ok &= compare(runs, args.baseline, args.max_regression)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+# File: benchmarks/routeros_emulator.py
+"""
+Emulador local de la API de RouterOS (puerto 8728, protocolo de palabras
+con prefijo de longitud) para pruebas de carga y de fallas.
+
+A diferencia de `FakeRouterOsPool` (que reemplaza la librería en
+proceso), acá el cliente es el `routeros_api.RouterOsApiPool` real: se
+ejercitan sockets, timeouts, login y el parseo de sentencias.
+
+Implementa, a partir de tablas de fixture por router:
+
+- `/login` (texto plano y desafío MD5 previo a 6.43);
+- `<ruta>/print` con filtros `?k=v` y `=.proplist=` para
+  `/interface`, `/interface/ethernet`, `/queue/simple`, `/ip/arp`,
+  `/ip/neighbor` y `/tool/traffic-generator`;
+- `add`/`set`/`remove` sobre cualquier tabla y
+  `/tool/traffic-generator/start`;
+- `/ping` (`address`, `count`) y `/quit`.
+
+Cada router tiene su `RouterBehavior`: contraseña, latencia por comando
+y de login, cortes de conexión (probabilidad o tras N comandos) y modo
+colgado (acepta y nunca responde, para probar timeouts).
+
+Los routers escuchan en direcciones de loopback distintas con el mismo
+puerto (`127.255.x.y:<puerto>`, solo Linux: todo 127/8 es local) o en
+puertos distintos de una misma dirección. El primer modo es el que usan
+los servicios, que se conectan siempre a `MIKROTIK_PORT`.
+
+Uso:
+    python -m benchmarks.routeros_emulator --routers 200 --clients 20000
+    python -m benchmarks.routeros_emulator --routers 50 --per-port --port 18728 \\
+        --latency-ms 30 --drop-rate 0.02 --wrong-password-ratio 0.1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+Sentence = List[str]
+
+ROUTEROS_PORT = 8728
+# Mensajes tal como los devuelve RouterOS
+LOGIN_FAILED = "invalid user name or password (6)"
+NOT_LOGGED_IN = "not logged in"
+NO_SUCH_COMMAND = "no such command prefix"
+NO_SUCH_ITEM = "no such item"
+
+
+# ──────────────────────────────────────────────
+# Protocolo
+# ──────────────────────────────────────────────
+
+
+def encode_length(length: int) -> bytes:
+    if length < 0x80:
+        return length.to_bytes(1, "big")
+    if length < 0x4000:
+        return (length | 0x8000).to_bytes(2, "big")
+    if length < 0x200000:
+        return (length | 0xC00000).to_bytes(3, "big")
+    if length < 0x10000000:
+        return (length | 0xE0000000).to_bytes(4, "big")
+    return b"\xf0" + length.to_bytes(4, "big")
+
+
+def encode_sentence(words: Sentence) -> bytes:
+    out = bytearray()
+    for word in words:
+        data = word.encode("utf-8")
+        out += encode_length(len(data)) + data
+    out += b"\x00"
+    return bytes(out)
+
+
+async def _read_length(reader: asyncio.StreamReader) -> int:
+    first = (await reader.readexactly(1))[0]
+    if first < 0x80:
+        return first
+    if first < 0xC0:
+        extra, value = 1, first & 0x3F
+    elif first < 0xE0:
+        extra, value = 2, first & 0x1F
+    elif first < 0xF0:
+        extra, value = 3, first & 0x0F
+    else:
+        extra, value = 4, 0
+    for byte in await reader.readexactly(extra):
+        value = (value << 8) | byte
+    return value
+
+
+async def read_sentence(reader: asyncio.StreamReader) -> Optional[Sentence]:
+    """Lee una sentencia completa; None si el cliente cerró."""
+    words: Sentence = []
+    try:
+        while True:
+            length = await _read_length(reader)
+            if length == 0:
+                return words
+            words.append((await reader.readexactly(length)).decode("utf-8"))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def _reply(kind: str, attrs: Optional[Dict] = None, tag: Optional[str] = None):
+    words = [f"!{kind}"] + [f"={k}={v}" for k, v in (attrs or {}).items()]
+    if tag is not None:
+        words.append(f".tag={tag}")
+    return words
+
+
+# ──────────────────────────────────────────────
+# Routers
+# ──────────────────────────────────────────────
+
+
+@dataclass
+class RouterBehavior:
+    """Cómo responde un router emulado."""
+
+    password: str = "admin"
+    username: str = "admin"
+    latency_ms: float = 0.0  # por comando
+    login_delay_ms: float = 0.0
+    drop_rate: float = 0.0  # probabilidad de cortar en cada comando
+    drop_after: Optional[int] = None  # corta tras N comandos (en total)
+    hang: bool = False  # acepta la conexión y nunca responde
+    ping_ms: float = 1.0
+    ping_loss: float = 0.0  # fracción de pings perdidos
+    tg_tx_rate: str = "9.4Mbps"  # resultado del traffic-generator
+    tg_loss: str = "0.5"
+
+
+@dataclass
+class RouterStats:
+    connections: int = 0
+    active: int = 0
+    peak_active: int = 0
+    logins: int = 0
+    login_failures: int = 0
+    commands: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class EmulatedRouter:
+    ip: str
+    tables: Dict[str, List[Dict]]
+    behavior: RouterBehavior = field(default_factory=RouterBehavior)
+    host: str = "127.0.0.1"
+    port: int = 0
+    stats: RouterStats = field(default_factory=RouterStats)
+
+    def __post_init__(self):
+        # Copia propia: add/set/remove no alteran el fixture original
+        self.tables = {
+            path: [{".id": f"*{i:X}", **row} for i, row in enumerate(rows, 1)]
+            for path, rows in self.tables.items()
+        }
+        self.tables.setdefault("/tool/traffic-generator", [])
+        self._next_id = 1 + max((len(rows) for rows in self.tables.values()), default=0)
+        self._rng = random.Random(self.ip)
+
+    # ── Comandos ─────────────────────────────────────────────────
+    def execute(self, words: Sentence, session: Dict) -> Tuple[List[Sentence], bool]:
+        """(respuestas, cerrar conexión) para una sentencia del cliente."""
+        command, attrs, queries, tag = words[0], {}, [], None
+        for word in words[1:]:
+            if word.startswith("="):
+                key, _, value = word[1:].partition("=")
+                attrs[key] = value
+            elif word.startswith("?"):
+                key, _, value = word.lstrip("?=").partition("=")
+                queries.append((key, value))
+            elif word.startswith(".tag="):
+                tag = word[5:]
+
+        if command == "/login":
+            return self._login(attrs, session, tag), False
+        # `!fatal` real no lleva `=message=` ni tag; así la librería lo
+        # reporta como error de comando en vez de error de parseo
+        if not session.get("user"):
+            return [_reply("fatal", {"message": NOT_LOGGED_IN}, tag)], True
+        if command == "/quit":
+            return [
+                _reply("fatal", {"message": "session terminated on request"}, tag)
+            ], True
+        if command == "/ping":
+            return self._ping(attrs, tag), False
+
+        path, _, verb = command.rpartition("/")
+        rows = self.tables.get(path)
+        if rows is None:
+            return self._trap(NO_SUCH_COMMAND, tag), False
+        if verb == "print":
+            return self._print(rows, attrs, queries, tag), False
+        if verb == "add":
+            row = {".id": f"*{self._next_id:X}", **attrs}
+            self._next_id += 1
+            if path == "/tool/traffic-generator":
+                row.update({"running": "false", "tx-rate": "0bps", "loss": "100"})
+            rows.append(row)
+            return [_reply("done", {"ret": row[".id"]}, tag)], False
+        target = self._find(rows, attrs.pop(".id", None) or attrs.pop("numbers", None))
+        if target is None:
+            return self._trap(NO_SUCH_ITEM, tag), False
+        if verb == "set":
+            target.update(attrs)
+        elif verb == "remove":
+            rows.remove(target)
+        elif verb == "start" and path == "/tool/traffic-generator":
+            target.update(
+                {
+                    "running": "true",
+                    "tx-rate": self.behavior.tg_tx_rate,
+                    "loss": self.behavior.tg_loss,
+                }
+            )
+        else:
+            return self._trap(NO_SUCH_COMMAND, tag), False
+        return [_reply("done", tag=tag)], False
+
+    def _login(self, attrs: Dict, session: Dict, tag) -> List[Sentence]:
+        name = attrs.get("name")
+        if "password" in attrs:
+            ok = attrs["password"] == self.behavior.password
+        elif "response" in attrs and session.get("challenge"):
+            digest = hashlib.md5(
+                b"\x00" + self.behavior.password.encode() + session["challenge"]
+            ).hexdigest()
+            ok = attrs["response"] == "00" + digest
+        else:
+            # Login previo a 6.43: primero se pide el desafío
+            session["challenge"] = os.urandom(16)
+            return [_reply("done", {"ret": session["challenge"].hex()}, tag)]
+        if ok and name == self.behavior.username:
+            session["user"] = name
+            self.stats.logins += 1
+            return [_reply("done", tag=tag)]
+        self.stats.login_failures += 1
+        return self._trap(LOGIN_FAILED, tag)
+
+    def _print(self, rows, attrs: Dict, queries, tag) -> List[Sentence]:
+        proplist = attrs.get(".proplist")
+        keys = proplist.split(",") if proplist else None
+        out = []
+        for row in rows:
+            if all((row.get(k) == v) if v else (k in row) for k, v in queries):
+                shown = {k: row[k] for k in keys if k in row} if keys else row
+                out.append(_reply("re", shown, tag))
+        out.append(_reply("done", tag=tag))
+        return out
+
+    def _ping(self, attrs: Dict, tag) -> List[Sentence]:
+        address = attrs.get("address")
+        if not address:
+            return self._trap("missing value for address", tag)
+        count = min(int(attrs.get("count", 4) or 4), 100)
+        out, received = [], 0
+        for seq in range(count):
+            lost = self._rng.random() < self.behavior.ping_loss
+            received += not lost
+            row = {"seq": seq, "host": address, "sent": seq + 1}
+            if lost:
+                row["status"] = "timeout"
+            else:
+                row.update(
+                    {"size": 56, "ttl": 64, "time": f"{self.behavior.ping_ms:g}ms"}
+                )
+            row["received"] = received
+            row["packet-loss"] = round(100 * (seq + 1 - received) / (seq + 1))
+            out.append(_reply("re", row, tag))
+        out.append(_reply("done", tag=tag))
+        return out
+
+    @staticmethod
+    def _find(rows, ref: Optional[str]) -> Optional[Dict]:
+        for row in rows:
+            if ref in (row.get(".id"), row.get("name")):
+                return row
+        return None
+
+    @staticmethod
+    def _trap(message: str, tag) -> List[Sentence]:
+        return [_reply("trap", {"message": message}, tag), _reply("done", tag=tag)]
+
+
+# ──────────────────────────────────────────────
+# Servidor
+# ──────────────────────────────────────────────
+
+
+class RouterOsEmulator:
+    """
+    Varios routers RouterOS en un único loop asyncio de fondo.
+
+    >>> emu = RouterOsEmulator()
+    >>> emu.add_router("127.255.0.1", tables, RouterBehavior(password="x"))
+    >>> with emu:
+    ...     RouterOsApiPool("127.255.0.1", password="x", port=emu.port, ...)
+
+    `host=None` en `add_router` escucha en la propia IP del router;
+    `per_port=True` usa `host` fijo y un puerto por router.
+    """
+
+    def __init__(self, port: int = 0, host: str = "127.0.0.1", per_port: bool = False):
+        self.port = port
+        self.host = host
+        self.per_port = per_port
+        self.routers: Dict[str, EmulatedRouter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._servers: List[asyncio.AbstractServer] = []
+        self._writers: set = set()
+
+    def add_router(
+        self,
+        ip: str,
+        tables: Dict[str, List[Dict]],
+        behavior: Optional[RouterBehavior] = None,
+    ) -> EmulatedRouter:
+        router = EmulatedRouter(ip, tables, behavior or RouterBehavior())
+        self.routers[ip] = router
+        return router
+
+    @classmethod
+    def from_network(
+        cls, network, behaviors: Optional[Dict[str, RouterBehavior]] = None, **kwargs
+    ):
+        """Un router emulado por router de una `SyntheticNetwork`."""
+        emulator = cls(**kwargs)
+        for ip in network.routers:
+            emulator.add_router(
+                ip, network.routeros_tables(ip), (behaviors or {}).get(ip)
+            )
+        return emulator
+
+    def stats(self) -> Dict[str, int]:
+        """Totales de todos los routers."""
+        total: Dict[str, int] = {}
+        for router in self.routers.values():
+            for key, value in vars(router.stats).items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    # ── Ciclo de vida ────────────────────────────────────────────
+    def start(self) -> "RouterOsEmulator":
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="routeros-emulator", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._listen(), self._loop).result()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "RouterOsEmulator":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    async def _listen(self):
+        for i, router in enumerate(self.routers.values()):
+            if self.per_port:
+                router.host = self.host
+                port = self.port + i if self.port else 0
+            else:
+                router.host = router.ip
+                port = self.port
+            server = await asyncio.start_server(
+                lambda r, w, router=router: self._serve(router, r, w),
+                router.host,
+                port,
+            )
+            router.port = server.sockets[0].getsockname()[1]
+            if not self.per_port and not self.port:
+                # Todos los routers comparten el puerto que tocó al primero
+                self.port = router.port
+            self._servers.append(server)
+
+    async def _close(self):
+        for server in self._servers:
+            server.close()
+        for writer in list(self._writers):
+            writer.transport.abort()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+
+    async def _serve(self, router: EmulatedRouter, reader, writer):
+        behavior, stats = router.behavior, router.stats
+        stats.connections += 1
+        stats.active += 1
+        stats.peak_active = max(stats.peak_active, stats.active)
+        self._writers.add(writer)
+        session: Dict = {}
+        try:
+            if behavior.hang:
+                await reader.read()  # hasta que el cliente se rinda
+                return
+            while True:
+                words = await read_sentence(reader)
+                if words is None:
+                    return
+                if not words:
+                    continue
+                if words[0] == "/login":
+                    await asyncio.sleep(behavior.login_delay_ms / 1000)
+                else:
+                    stats.commands += 1
+                    if (
+                        behavior.drop_after is not None
+                        and stats.commands > behavior.drop_after
+                    ) or (
+                        behavior.drop_rate and router._rng.random() < behavior.drop_rate
+                    ):
+                        stats.dropped += 1
+                        writer.transport.abort()
+                        return
+                    await asyncio.sleep(behavior.latency_ms / 1000)
+                replies, close = router.execute(words, session)
+                writer.write(b"".join(encode_sentence(s) for s in replies))
+                await writer.drain()
+                if close:
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            stats.active -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+
+__all__ = [
+    "EmulatedRouter",
+    "RouterBehavior",
+    "RouterOsEmulator",
+    "RouterStats",
+    "encode_sentence",
+    "read_sentence",
+]
+
+
+# ──────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────
+
+
+def _load_fixtures(path: str) -> Dict[str, Dict]:
+    """JSON `{ip: {"tables": {...}, "behavior": {...}}}`."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    from benchmarks.synthetic import SyntheticNetwork
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--routers", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=0, help="0: routers × 250")
+    parser.add_argument(
+        "--fixtures", help="JSON de tablas por router (en vez de sintético)"
+    )
+    parser.add_argument("--port", type=int, default=ROUTEROS_PORT)
+    parser.add_argument("--host", default="127.0.0.1", help="con --per-port")
+    parser.add_argument("--per-port", action="store_true", help="un puerto por router")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--wrong-password-ratio", type=float, default=0.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--login-delay-ms", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--hang-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=8728)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    def behavior(overrides: Optional[Dict] = None) -> RouterBehavior:
+        wrong = rng.random() < args.wrong_password_ratio
+        return RouterBehavior(
+            password=f"{args.password}-otra" if wrong else args.password,
+            latency_ms=args.latency_ms,
+            login_delay_ms=args.login_delay_ms,
+            drop_rate=args.drop_rate,
+            hang=rng.random() < args.hang_ratio,
+            **(overrides or {}),
+        )
+
+    emulator = RouterOsEmulator(args.port, args.host, args.per_port)
+    if args.fixtures:
+        for ip, fixture in _load_fixtures(args.fixtures).items():
+            emulator.add_router(
+                ip, fixture["tables"], behavior(fixture.get("behavior"))
+            )
+    else:
+        network = SyntheticNetwork(
+            args.clients or args.routers * 250,
+            routers=args.routers,
+            router_prefix="127.255",
+        )
+        for ip in network.routers:
+            emulator.add_router(ip, network.routeros_tables(ip), behavior())
+
+    with emulator:
+        for router in list(emulator.routers.values())[:5]:
+            print(f"  {router.ip:<16} → {router.host}:{router.port}")
+        if len(emulator.routers) > 5:
+            print(f"  ... {len(emulator.routers)} routers")
+        print("Ctrl-C para terminar")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    print(json.dumps(emulator.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# File: benchmarks/synthetic.py
+"""
+Red sintética para benchmarks de escala.
+
+`SyntheticNetwork(clients=10_000)` genera, de forma determinística
+(semilla fija):
+
+- routers MikroTik con sus tablas RouterOS (`/interface`,
+  `/interface/ethernet`, `/queue/simple`, `/ip/arp`, `/ip/neighbor`),
+  enlazados en anillo (`router_prefix="127.255"` los deja en loopback
+  para `benchmarks/routeros_emulator.py`);
+- APs y CPEs de UISP (forma de `/nms/api/v2.1/devices`, CPE → AP por
+  `parentId`) con estadísticas por dispositivo;
+- el CSV de clientes en el formato de exportación de MikroWisp;
+- un historial de alarmas con la forma de la tabla `alarmas`.
+
+Una fracción de clientes (`ip_match_ratio`) tiene en UISP la misma IP
+que en el CSV; el resto solo coincide por MAC, subred o nombre, así se
+ejercitan todas las etapas del motor de asociación.
+"""
+
+import csv
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+# Cabecera del export de MikroWisp (36 columnas, con las vacías en los bordes)
+MIKROWISP_HEADER = [
+    "",
+    "Id",
+    "Status",
+    "Nombre",
+    "Ip",
+    "IP Receptor",
+    "Ultimo vencimiento",
+    "Ultimo pago",
+    "Tipo estrato",
+    "Caja nap",
+    "Dirección Principal",
+    "Fecha suspendido",
+    "Plan voip",
+    "Dirección Servicio",
+    "Mac",
+    "Dia pago",
+    "Deuda actual",
+    "Correo",
+    "Telefono",
+    "Plan",
+    "Proximo pago",
+    "Movil",
+    "Saldo",
+    "Emisor",
+    "Router",
+    "Instalado",
+    "Cedula",
+    "User PPP/Hotspot",
+    "Pasarela",
+    "Codigo",
+    "User ubnt",
+    "Coordenadas",
+    "Total cobrar",
+    "Zona",
+    "Servicios personalizados",
+    "",
+]
+
+PLANS = ("Familiar 3 mb", "Premium 6 mb", "Corporativo 9 mb", "Fibra 30 mb")
+
+
+def _mac(prefix: int, i: int) -> str:
+    octets = [prefix] + [(i >> shift) & 0xFF for shift in (32, 24, 16, 8, 0)]
+    return ":".join(f"{b:02X}" for b in octets)
+
+
+class SyntheticNetwork:
+    """Routers, APs, clientes e inventario UISP coherentes entre sí."""
+
+    def __init__(
+        self,
+        clients: int,
+        routers: int = 0,
+        clients_per_ap: int = 20,
+        ip_match_ratio: float = 0.8,
+        degraded_ratio: float = 0.05,
+        seed: int = 360,
+        router_prefix: str = "10.255",
+    ):
+        rng = random.Random(seed)
+        self.n_clients = clients
+        self.n_routers = routers or max(2, clients // 250)
+        self.routers: List[str] = [
+            f"{router_prefix}.{(r + 1) >> 8}.{(r + 1) & 0xFF}"
+            for r in range(self.n_routers)
+        ]
+        self._router_index = {ip: r for r, ip in enumerate(self.routers)}
+
+        # Cliente i → router, AP e IP (una /24 por AP dentro de 10/8)
+        self.clients: List[Dict] = []
+        self.aps: List[Dict] = []
+        for i in range(clients):
+            ap_index = i // clients_per_ap
+            if ap_index == len(self.aps):
+                self.aps.append(
+                    {
+                        "id": f"ap-{ap_index:06d}",
+                        "ip": f"172.{16 + (ap_index >> 16)}.{(ap_index >> 8) & 0xFF}.{ap_index & 0xFF}",
+                        "mac": _mac(0xDC, ap_index),
+                        "name": f"AP {ap_index}",
+                        "router": self.routers[ap_index % self.n_routers],
+                    }
+                )
+            ap = self.aps[ap_index]
+            host = 2 + i % clients_per_ap
+            subnet = f"10.{ap_index >> 8}.{ap_index & 0xFF}"
+            ip = f"{subnet}.{host}"
+            matched = rng.random() < ip_match_ratio
+            self.clients.append(
+                {
+                    "id": f"{i + 1:06d}",
+                    "name": f"Cliente {i} Apellido{i % 997}",
+                    "ip": ip,
+                    # Sin coincidencia exacta: UISP reporta otra IP de la subred
+                    "uisp_ip": ip if matched else f"{subnet}.{200 + i % 50}",
+                    "mac": _mac(0xF4, i),
+                    "plan": PLANS[i % len(PLANS)],
+                    "status": "ONLINE" if rng.random() < 0.9 else "OFFLINE",
+                    "ap": ap["id"],
+                    "router": ap["router"],
+                    "rssi": -45 - rng.randrange(40),
+                }
+            )
+
+        self._by_router: Dict[str, List[Dict]] = {ip: [] for ip in self.routers}
+        for c in self.clients:
+            self._by_router[c["router"]].append(c)
+        self._degraded = {ip for ip in self.routers if rng.random() < degraded_ratio}
+
+    # ── RouterOS ─────────────────────────────────────────────────
+    def routeros_tables(self, router_ip: str) -> Dict[str, List[Dict]]:
+        """Tablas que consulta Monitor360, con las claves de RouterOS."""
+        idx = self._router_index[router_ip]
+        clients = self._by_router.get(router_ip, [])
+        neighbors = {
+            self.routers[(idx - 1) % self.n_routers],
+            self.routers[(idx + 1) % self.n_routers],
+        } - {router_ip}
+        ethernet = [
+            {"name": f"ether{p}", "running": "true", "link-speed": "1Gbps"}
+            for p in range(1, 5)
+        ]
+        if router_ip in self._degraded:
+            ethernet[-1]["link-speed"] = "10Mbps"
+        interfaces = [
+            {"name": e["name"], "type": "ether", "running": e["running"]}
+            for e in ethernet
+        ] + [{"name": "bridge", "type": "bridge", "running": "true"}]
+        return {
+            "/interface": interfaces,
+            "/interface/ethernet": ethernet,
+            "/queue/simple": [
+                {
+                    "name": f"q-{c['id']}",
+                    "target": f"{c['ip']}/32",
+                    "max-limit": "10M/10M",
+                }
+                for c in clients
+            ],
+            "/ip/arp": [
+                {"address": c["ip"], "mac-address": c["mac"], "interface": "bridge"}
+                for c in clients
+            ],
+            "/ip/neighbor": [
+                {"address": n, "identity": f"RB-{n}", "interface": "ether1"}
+                for n in sorted(neighbors)
+            ],
+        }
+
+    # ── UISP ─────────────────────────────────────────────────────
+    def uisp_devices(self) -> List[Dict]:
+        """Inventario de UISP: APs y CPEs (con `parentId` al AP)."""
+        devices = []
+        for ap in self.aps:
+            devices.append(
+                {
+                    "id": ap["id"],
+                    "ipAddress": ap["ip"],
+                    "mac": ap["mac"],
+                    "parentId": None,
+                    "identification": {
+                        "id": ap["id"],
+                        "name": ap["name"],
+                        "mac": ap["mac"],
+                        "hostname": ap["name"].lower().replace(" ", "-"),
+                        "model": "R5AC-Lite",
+                        "type": "airMax",
+                    },
+                    "overview": {"status": "active", "signal": None},
+                }
+            )
+        for i, c in enumerate(self.clients):
+            devices.append(
+                {
+                    "id": f"cpe-{i:07d}",
+                    "ipAddress": c["uisp_ip"],
+                    "mac": c["mac"],
+                    "parentId": c["ap"],
+                    "rssi": c["rssi"],
+                    "identification": {
+                        "id": f"cpe-{i:07d}",
+                        "name": c["name"],
+                        "mac": c["mac"],
+                        "hostname": f"cpe-{i}",
+                        "model": "LBE-5AC-Gen2",
+                        "type": "airMax",
+                    },
+                    "overview": {"status": "active", "signal": c["rssi"]},
+                }
+            )
+        return devices
+
+    def uisp_statistics(self, device_id: str) -> Dict:
+        index = int(device_id.split("-")[1]) if device_id.startswith("cpe-") else 0
+        rssi = self.clients[index]["rssi"] if self.clients else -60
+        return {"data": {"rssi": rssi, "signal": rssi, "ccq": 90}}
+
+    # ── Alarmas ──────────────────────────────────────────────────
+    def alarms(self, count: int, seed: int = 361) -> List[Dict]:
+        """Filas de `alarmas`, más nuevas primero (una por minuto)."""
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+        rows = []
+        for i in range(count):
+            client = self.clients[rng.randrange(len(self.clients))]
+            severity = rng.choice(("critical", "warning", "warning", "info"))
+            rows.append(
+                {
+                    "id": count - i,
+                    "client_id": int(client["id"]),
+                    "severity": severity,
+                    "message": f"{client['ip']}: pérdida {rng.randrange(100)}%",
+                    "timestamp": (now - timedelta(minutes=i)).isoformat(),
+                }
+            )
+        return rows
+
+    # ── MikroWisp ────────────────────────────────────────────────
+    def write_client_csv(self, path: str) -> str:
+        """Escribe el CSV de clientes con la cabecera de MikroWisp."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(MIKROWISP_HEADER)
+            for c in self.clients:
+                row = dict.fromkeys(MIKROWISP_HEADER, "")
+                row.update(
+                    {
+                        "Id": c["id"],
+                        "Status": c["status"],
+                        "Nombre": f"{c['name']}  ACTIVO",
+                        "Ip": c["ip"],
+                        "IP Receptor": c["ip"],
+                        "Mac": c["mac"],
+                        "Plan": c["plan"],
+                        "Router": "RB_ADMINISTRADOR",
+                    }
+                )
+                writer.writerow([row[h] if h else "" for h in MIKROWISP_HEADER])
+        return path
+
+
+__all__ = ["MIKROWISP_HEADER", "SyntheticNetwork"]
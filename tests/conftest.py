@@ -0,0 +1,36 @@
+import pytest
+
+from app.services import storage, tracing
+
+
+class MemoryExporter:
+    """Guarda los spans exportados en memoria (sin escribir `traces.jsonl`)."""
+
+    dropped = 0
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_otlp())
+
+    def flush(self, timeout=0):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def span_exporter():
+    exporter = MemoryExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(None)
+
+
+@pytest.fixture(autouse=True)
+def local_storage():
+    """Cada test escribe en un SQLite en memoria: nada sale a la red."""
+    db = storage.SqliteStorage(":memory:")
+    storage.set_storage(db)
+    yield db
+    storage.set_storage(None)
+    db.close()
@@ -0,0 +1,54 @@
+from app.services.alarm_correlator import EMIT, FOLD, SUPPRESS, AlarmCorrelator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_suppresses_repeats_and_reports_count():
+    clock = Clock()
+    corr = AlarmCorrelator(window=60, clock=clock)
+    args = ("warning", "10.0.0.5: capacidad baja", "monitoring", "capacity", "10.0.0.5")
+
+    assert corr.process(*args).action == EMIT
+    clock.now += 10
+    assert corr.process(*args).action == SUPPRESS
+    clock.now += 10
+    assert corr.process(*args).action == SUPPRESS
+
+    clock.now += 45  # sigue activa, pero pasó la ventana desde la emisión
+    decision = corr.process(*args)
+    assert decision.action == EMIT
+    assert "repetida 2 veces" in decision.message
+    assert corr.snapshot()[0]["occurrences"] == 4
+
+
+def test_folds_downstream_alarms_under_root_cause():
+    corr = AlarmCorrelator(window=60, clock=Clock())
+    corr.set_topology([("10.0.0.1", "10.0.1.1"), ("10.0.1.1", "10.0.1.50")])
+
+    root = corr.process(
+        "critical", "Router caído", "discovery", "reachability", "10.0.0.1"
+    )
+    assert root.action == EMIT
+    child = corr.process("critical", "pérdida 100%", "monitoring", "loss", "10.0.1.50")
+    assert child.action == FOLD
+    assert child.root == ("discovery", "reachability", "10.0.0.1")
+
+    # Resuelta la causa raíz, la alarma del cliente vuelve a escribirse
+    corr.clear("discovery", "reachability", "10.0.0.1")
+    again = corr.process("critical", "pérdida 100%", "monitoring", "loss", "10.0.1.50")
+    assert again.action == EMIT
+
+
+def test_set_topology_keeps_edges_of_unreachable_routers():
+    corr = AlarmCorrelator(window=60, clock=Clock())
+    corr.set_topology([("r1", "c1"), ("r2", "c2")])
+    corr.set_topology([("r2", "c3")], keep_parents={"r1"})
+    corr.process("critical", "r1 caído", "discovery", "reachability", "r1")
+    assert corr.process("warning", "x", "monitoring", "loss", "c1").action == FOLD
+    assert corr.process("warning", "y", "monitoring", "loss", "c2").action == EMIT
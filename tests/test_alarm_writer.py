@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+
+from app.services.alarm_writer import AlarmWriter
+
+
+class FakeTable:
+    def __init__(self):
+        self.batches = []
+        self.down = False
+
+    def insert(self, rows):
+        if self.down:
+            raise ConnectionError("Supabase inaccesible")
+        self.batches.append(list(rows))
+
+
+def alarm(i):
+    return {"severity": "warning", "message": f"alarma {i}", "client_id": None}
+
+
+def test_batches_by_size_and_flushes_on_close(tmp_path):
+    table = FakeTable()
+    writer = AlarmWriter(
+        table.insert, batch_size=3, flush_ms=5000, spool_path=str(tmp_path / "s")
+    )
+    for i in range(7):
+        writer.submit(alarm(i))
+    writer.close()
+    assert [len(b) for b in table.batches] == [3, 3, 1]
+    assert writer.stats["written"] == 7
+
+
+def test_spools_while_down_and_replays_in_order(tmp_path):
+    table = FakeTable()
+    table.down = True
+    spool = tmp_path / "spool.jsonl"
+    writer = AlarmWriter(
+        table.insert, batch_size=10, flush_ms=10, spool_path=str(spool), retry_seconds=0
+    )
+    writer.submit(alarm(0))
+    writer.submit(alarm(1))
+    assert writer.flush(timeout=2)
+    assert len(spool.read_text().splitlines()) == 2
+
+    table.down = False
+    writer.submit(alarm(2))
+    writer.close()
+    sent = [row["message"] for batch in table.batches for row in batch]
+    assert sent == ["alarma 0", "alarma 1", "alarma 2"]
+    assert spool.read_text() == ""
+
+
+def test_backpressure_drop_oldest_and_spool(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    writer = AlarmWriter(
+        lambda rows: None, max_queue=2, backpressure="spool", spool_path=str(spool)
+    )
+    writer._ensure_worker = lambda: None  # sin consumidor: la cola se llena
+    for i in range(3):
+        writer.submit(alarm(i))
+    assert json.loads(spool.read_text())["message"] == "alarma 2"
+
+    writer = AlarmWriter(lambda rows: None, max_queue=2, backpressure="drop_oldest")
+    writer._ensure_worker = lambda: None
+    for i in range(3):
+        writer.submit(alarm(i))
+    assert [writer._queue.get_nowait()["message"] for _ in range(2)] == [
+        "alarma 1",
+        "alarma 2",
+    ]
+    assert writer.stats["dropped"] == 1
+
+
+def test_torn_spool_line_is_skipped_and_worker_survives(tmp_path):
+    table = FakeTable()
+    spool = tmp_path / "spool.jsonl"
+    # Crash a mitad de un append: la última línea quedó cortada
+    spool.write_text(json.dumps(alarm(0)) + '\n{"severity": "warn')
+    writer = AlarmWriter(
+        table.insert, batch_size=10, flush_ms=10, spool_path=str(spool), retry_seconds=0
+    )
+    writer.submit(alarm(1))
+    assert writer.flush(timeout=2)
+    assert writer._worker.is_alive()
+    writer.close()
+    sent = [row["message"] for batch in table.batches for row in batch]
+    assert sent == ["alarma 0", "alarma 1"]
+    assert writer.stats["corrupt"] == 1
+    assert spool.read_text() == ""
+
+
+def test_spooling_does_not_wait_for_a_slow_replay(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    spool.write_text(json.dumps(alarm(0)) + "\n")
+    release, sent = threading.Event(), []
+
+    def slow_insert(rows):
+        release.wait(5)
+        sent.extend(row["message"] for row in rows)
+
+    writer = AlarmWriter(slow_insert, spool_path=str(spool), retry_seconds=0)
+    replay = threading.Thread(target=writer._replay_spool)
+    replay.start()
+    time.sleep(0.05)
+    t0 = time.monotonic()
+    writer._spool([alarm(1)])  # productor con la cola llena
+    assert time.monotonic() - t0 < 1
+    release.set()
+    replay.join()
+    # Lo agregado durante el reenvío queda para el próximo
+    assert sent == ["alarma 0"]
+    assert [json.loads(line)["message"] for line in spool.read_text().splitlines()] == [
+        "alarma 1"
+    ]
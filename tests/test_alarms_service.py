@@ -0,0 +1,113 @@
+import re
+import sys
+import types
+
+import pytest
+
+from app.services import alarms_service, storage
+
+
+class FakeQuery:
+    """Subconjunto del builder de postgrest evaluado sobre una lista en memoria."""
+
+    def __init__(self, rows, columns, head=False):
+        self.rows = rows
+        self.columns = columns
+        self.head = head
+
+    def _keep(self, pred):
+        self.rows = [r for r in self.rows if pred(r)]
+        return self
+
+    def in_(self, col, values):
+        return self._keep(lambda r: r[col] in values)
+
+    def eq(self, col, value):
+        return self._keep(lambda r: r[col] == value)
+
+    def gte(self, col, value):
+        return self._keep(lambda r: r[col] >= value)
+
+    def lt(self, col, value):
+        return self._keep(lambda r: r[col] < value)
+
+    def or_(self, expr):
+        ts, last_id = re.fullmatch(
+            r'timestamp\.lt\."(.+)",and\(timestamp\.eq\."(.+)",id\.lt\.(\d+)\)', expr
+        ).group(1, 3)
+        return self._keep(
+            lambda r: r["timestamp"] < ts
+            or (r["timestamp"] == ts and r["id"] < int(last_id))
+        )
+
+    def order(self, col, desc=False):
+        # Orden estable: se aplica de la última clave a la primera
+        self.orders = [(col, desc)] + getattr(self, "orders", [])
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def execute(self):
+        rows = list(self.rows)
+        for col, desc in getattr(self, "orders", []):
+            rows.sort(key=lambda r: r[col], reverse=desc)
+        rows = rows[: getattr(self, "n", None)]
+        data = [] if self.head else [{c: r[c] for c in self.columns} for r in rows]
+        return types.SimpleNamespace(data=data, count=len(rows))
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, columns, count=None, head=False):
+        return FakeQuery(list(self.rows), columns.split(","), head)
+
+
+@pytest.fixture
+def alarms(monkeypatch):
+    rows = [
+        {
+            "id": i,
+            "client_id": i % 3,
+            "severity": ("critical", "warning", "info")[i % 3],
+            "message": f"alarma {i}",
+            # Pares con el mismo timestamp para ejercitar el desempate por id
+            "timestamp": f"2026-01-01T00:{i // 2:02d}:00+00:00",
+        }
+        for i in range(1, 26)
+    ]
+    client = types.SimpleNamespace(table=lambda name: FakeTable(rows))
+    module = types.SimpleNamespace(supabase=client)
+    monkeypatch.setitem(sys.modules, "app.supabase_client", module)
+    storage.set_storage(storage.SupabaseStorage())
+    return rows
+
+
+def test_keyset_pages_cover_everything_once(alarms):
+    seen, cursor = [], None
+    while True:
+        page = alarms_service.query_alarms(limit=4, cursor=cursor)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    expected = sorted(alarms, key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+    assert seen == [r["id"] for r in expected]
+
+
+def test_filters_and_field_projection(alarms):
+    page = alarms_service.query_alarms(
+        limit=100, severity=["critical"], fields=["id", "severity"]
+    )
+    assert page["next_cursor"] is None
+    assert {item["severity"] for item in page["items"]} == {"critical"}
+    assert set(page["items"][0]) == {"id", "severity"}
+
+
+def test_count_and_invalid_cursor(alarms):
+    assert alarms_service.count_alarms(severity=["warning"]) == 9
+    with pytest.raises(ValueError):
+        alarms_service.query_alarms(cursor="no-es-un-cursor")
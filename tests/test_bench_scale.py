@@ -0,0 +1,22 @@
+from benchmarks.bench_scale import parse_args, run_size
+from benchmarks.synthetic import SyntheticNetwork
+
+
+def test_synthetic_network_is_consistent():
+    network = SyntheticNetwork(100)
+    assert len(network.routers) == 2
+    tables = network.routeros_tables(network.routers[0])
+    assert len(tables["/ip/arp"]) == 60  # APs 0, 2 y 4
+    assert [n["address"] for n in tables["/ip/neighbor"]] == [network.routers[1]]
+    # APs + CPEs
+    assert len(network.uisp_devices()) == 5 + 100
+
+
+def test_scale_smoke_run(monkeypatch):
+    monkeypatch.setenv("WARMUP", "0")
+    results = {r["scenario"]: r for r in run_size(100, parse_args([]))}
+    topo = results["discover_topology"]
+    assert topo["nodes"] >= 100 and topo["routeros_commands"] > 0
+    assert results["http_topology"]["status"] == 200
+    assert results["monitor_and_store"]["pairs"] == 50
+    assert results["db_writes"]["rows"] > 0
@@ -1,6 +1,9 @@
 import pandas as pd
 
+from app.services.association_cache import AssociationCache
+from app.services.association_engine import RESULT_COLUMNS, associate_frame
 from app.services.client_service import associate_clients_to_devices
+from app.services.name_matcher import NameMatcher, normalize_name
 
 # Simulamos dispositivos UISP
 DEVICES = [
@@ -76,3 +79,113 @@ def test_name_fuzzy_match():
     assert out[0]["matched"]
     assert out[0]["método"] == "name_fuzzy"
     assert out[0]["similarity"] >= 0.8
+
+
+def test_name_fuzzy_ignores_status_suffix_and_accents():
+    df = make_df([{"nombre": "CLIENTË DOS  ACTIVO", "ip": "", "mac": "", "plan": ""}])
+    out = associate_clients_to_devices(df, DEVICES)
+    assert out[0]["método"] == "name_fuzzy"
+    assert out[0]["dispositivo_id"] == 2
+
+
+def test_name_fuzzy_below_threshold_unmatched():
+    df = make_df([{"nombre": "Zzzzzz", "ip": "", "mac": "", "plan": ""}])
+    out = associate_clients_to_devices(df, DEVICES)
+    assert not out[0]["matched"]
+    assert out[0]["método"] is None
+
+
+def test_name_matcher_matches_brute_force_tie_break():
+    names = ["Perez Juan", "Perez Juana", "Perez Juan"]
+    matcher = NameMatcher(names, top_k=2)
+    assert normalize_name("Pérez  Juan ACTIVO") == "perez juan"
+    assert matcher.best_match("PEREZ JUAN", 0.8) == (0, 1.0)
+
+
+def test_subnet_picks_closest_device_and_custom_prefix():
+    df = make_df([{"nombre": "Z", "ip": "192.168.1.18", "mac": "", "plan": ""}])
+    out = associate_clients_to_devices(df, DEVICES)
+    assert out[0]["dispositivo_id"] == 2  # .20 está más cerca que .10
+
+    df = make_df([{"nombre": "Z", "ip": "10.0.200.1", "mac": "", "plan": ""}])
+    assert not associate_clients_to_devices(df, DEVICES)[0]["matched"]
+    out = associate_clients_to_devices(df, DEVICES, subnet_prefix=16)
+    assert out[0]["método"] == "subnet_16"
+    assert out[0]["uisp_ip"] == "10.0.0.5"
+
+
+def test_associate_frame_columnar_result():
+    df = make_df(
+        [
+            {"id": "7", "nombre": "X", "ip": "192.168.1.10", "mac": None},
+            {"id": None, "nombre": "cliente1", "ip": None, "mac": None},
+        ]
+    )
+    frame = associate_frame(df, DEVICES, name_case_sensitive=False)
+    assert list(frame.columns) == RESULT_COLUMNS
+    assert frame["método"].tolist() == ["ip_exact", "name_exact"]
+    assert frame["cliente_id"].tolist() == ["7", None]
+    assert frame["ip"].tolist() == ["192.168.1.10", ""]  # sin 'nan'
+    assert frame["uisp_pos"].tolist() == [0, 0]
+
+
+def test_associate_frame_with_duplicate_index():
+    # Índice repetido como el que deja pd.concat de dos CSV
+    df = pd.concat(
+        [
+            make_df([{"nombre": "X", "ip": "192.168.1.10", "mac": ""}]),
+            make_df([{"nombre": "Nadie", "ip": "", "mac": ""}]),
+        ]
+    )
+    assert list(df.index) == [0, 0]
+    frame = associate_frame(df, DEVICES)
+    assert list(frame.index) == [0, 0]
+    assert frame["matched"].tolist() == [True, False]
+    assert frame["método"].iloc[0] == "ip_exact"
+    assert frame["uisp_pos"].tolist() == [0, -1]
+
+
+def test_incremental_association_reuses_unchanged_rows(tmp_path):
+    cache = AssociationCache(str(tmp_path / "assoc.json"))
+    df = make_df(
+        [
+            {"id": "1", "nombre": "X", "ip": "192.168.1.10", "mac": ""},
+            {"id": "2", "nombre": "Otro", "ip": "", "mac": ""},
+            {"id": "3", "nombre": "Nadie", "ip": "", "mac": ""},
+        ]
+    )
+    first = cache.associate(df, DEVICES)
+    assert cache.last_run["reassociated"] == 3
+
+    again = cache.associate(df, DEVICES)
+    assert cache.last_run["reassociated"] == 0
+    assert again.equals(first)
+
+    # Cambia un dispositivo no asociado: solo se recalcula el cliente sin match
+    devices = DEVICES[:2] + [dict(DEVICES[2], ipAddress="10.0.0.6")]
+    cache.associate(df, devices)
+    assert cache.last_run["reassociated"] == 2
+
+    # Un proceso nuevo lee la tabla persistida sin recalcular
+    table = AssociationCache(cache.path).table()
+    assert table["total"] == 3
+    assert table["associations"][0]["método"] == "ip_exact"
+
+
+def test_cached_association_matches_uncached_with_duplicate_index(tmp_path):
+    df = pd.concat(
+        [
+            make_df([{"id": "1", "nombre": "X", "ip": "192.168.1.10", "mac": ""}]),
+            make_df([{"id": "2", "nombre": "Otro", "ip": "", "mac": ""}]),
+            make_df([{"id": "", "nombre": "Nadie", "ip": "", "mac": ""}]),
+        ]
+    )
+    expected = associate_frame(df, DEVICES)
+    cache = AssociationCache(str(tmp_path / "assoc.json"))
+    first = cache.associate(df, DEVICES)
+    again = cache.associate(df, DEVICES)
+    assert cache.last_run["reused"] == 3
+    for frame in (first, again):
+        assert list(frame.index) == [0, 0, 0]
+        assert frame["uisp_pos"].tolist() == expected["uisp_pos"].tolist() == [0, 2, -1]
+        assert frame["matched"].tolist() == expected["matched"].tolist()
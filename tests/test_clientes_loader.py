@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+
+from app.utils.clientes_loader import ClientCsvLoader
+
+CSV = (
+    '"","Id","Nombre","Ip","Dirección Principal","Mac","Plan","Correo"\n'
+    '"","000001","Cara Jose  ACTIVO","172.24.79.43","Zampal","E0:63","9 mb","a@b"\n'
+)
+
+
+def test_loads_only_needed_columns_and_caches(tmp_path):
+    path = tmp_path / "clientes.csv"
+    path.write_text(CSV, encoding="utf-8")
+    loader = ClientCsvLoader(cache_dir=str(tmp_path / "cache"), watch_seconds=0)
+
+    df = loader.load(str(path))
+    assert list(df.columns) == ["id", "nombre", "ip", "mac", "plan"]
+    assert df.loc[0, "id"] == "000001"  # dtype str: conserva ceros
+    assert loader.stats(str(path))["source"] == "csv"
+
+    loader.load(str(path))
+    assert loader.stats(str(path))["hits"] == 1
+
+    loader.invalidate()
+    loader.load(str(path))
+    assert loader.stats(str(path))["source"] == "disk_cache"
+
+
+def test_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "clientes.csv"
+    path.write_text(CSV, encoding="utf-8")
+    loader = ClientCsvLoader(cache_dir=None, watch_seconds=0)
+    assert len(loader.load(str(path))) == 1
+
+    path.write_text(CSV + CSV.splitlines()[1] + "\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert len(loader.load(str(path))) == 2
+    assert loader.stats(str(path))["loads"] == 2
+
+
+def test_watcher_is_opt_in_and_cache_is_versioned(tmp_path, monkeypatch):
+    path = tmp_path / "clientes.csv"
+    path.write_text(CSV, encoding="utf-8")
+    loader = ClientCsvLoader(cache_dir=str(tmp_path / "cache"), watch_seconds=0.01)
+    loader.load(str(path))
+    assert loader._watcher is None
+
+    # Otra versión de pandas no lee el pickle escrito por esta
+    monkeypatch.setattr(pd, "__version__", "0.0.0")
+    loader.invalidate()
+    loader.load(str(path))
+    assert loader.stats(str(path))["source"] == "csv"
+
+    # Un cache que no es un DataFrame se descarta y se relee el CSV
+    monkeypatch.undo()
+    pd.to_pickle({"no": "df"}, loader._cache_path(loader.stats(str(path))["sha1"]))
+    loader.invalidate()
+    assert len(loader.load(str(path))) == 1
+    assert loader.stats(str(path))["source"] == "csv"
@@ -0,0 +1,48 @@
+from concurrent.futures import Future
+
+from app.services import discovery_service
+
+
+def test_router_records_stream_before_uisp_is_ready(monkeypatch):
+    monkeypatch.setattr(
+        discovery_service, "connect_mikrotik_with_learning", lambda ip: object()
+    )
+    monkeypatch.setattr(discovery_service, "resolve_alarm", lambda *a: None)
+    monkeypatch.setattr(discovery_service, "_interface_details", lambda api: [])
+    monkeypatch.setattr(
+        discovery_service,
+        "_discover_switch_neighbors",
+        lambda api: [{"address": "10.0.0.2", "identity": "sw", "interface": "e1"}],
+    )
+    monkeypatch.setattr(
+        discovery_service, "_discover_clients_from_router", lambda api: {"10.1.0.5"}
+    )
+
+    uisp = Future()
+    records = discovery_service.iter_topology(["10.0.0.1"], uisp)
+
+    # Router y vecino salen sin esperar a UISP
+    assert next(records) == (
+        "node",
+        {"id": "10.0.0.1", "label": "10.0.0.1", "type": "router", "status": True},
+    )
+    assert next(records)[1]["id"] == "10.0.0.2"
+    assert next(records)[0] == "edge"
+    assert not uisp.done()
+
+    uisp.set_result(
+        [
+            {"id": "ap", "ipAddress": "10.1.0.1", "identification": {"name": "AP"}},
+            {
+                "id": "cpe",
+                "ipAddress": "10.1.0.5",
+                "parentId": "ap",
+                "rssi": -60,
+                "identification": {"name": "Cliente"},
+            },
+        ]
+    )
+    rest = list(records)
+    client = next(item for kind, item in rest if item.get("id") == "10.1.0.5")
+    assert client["label"] == "Cliente" and client["signal"] == -60
+    assert ("edge", {"source": "10.1.0.1", "target": "10.1.0.5"}) in rest
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services.event_bus import EventBus, topology_diff
+
+
+def test_fan_out_serializes_once_and_resumes_from_last_id():
+    bus = EventBus(history=10, client_buffer=10)
+    a, b = bus.subscribe(), bus.subscribe()
+    first = bus.publish("alarm", {"message": "caído"})
+    bus.publish("alarm", {"message": "otra"})
+
+    frames_a, frames_b = a.drain(), b.drain()
+    assert frames_a == frames_b and len(frames_a) == 2
+    assert frames_a[0].startswith(f"id: {first}\nevent: alarm\n")
+
+    resumed = bus.subscribe(last_event_id=first).drain()
+    assert resumed == frames_a[1:]
+
+
+def test_slow_client_gets_resync_and_old_history_triggers_resync():
+    bus = EventBus(history=3, client_buffer=2)
+    slow = bus.subscribe()
+    for i in range(5):
+        bus.publish("alarm", {"n": i})
+    frames = slow.drain()
+    assert frames[0].startswith("event: resync") and '"dropped": 3' in frames[0]
+    assert len(frames) == 3
+
+    late = bus.subscribe(last_event_id=0).drain()
+    assert late[0].startswith("event: resync")
+
+
+def test_last_event_id_from_previous_run_triggers_resync():
+    # Tras un reinicio los ids vuelven a empezar: un id viejo es "del futuro"
+    bus = EventBus(history=10, client_buffer=10)
+    assert bus.subscribe(last_event_id=42).drain()[0].startswith("event: resync")
+    bus.publish("alarm", {"n": 1})
+    frames = bus.subscribe(last_event_id=42).drain()
+    assert frames[0].startswith("event: resync") and len(frames) == 2
+    assert bus.subscribe(last_event_id=bus.last_id).drain() == []
+
+
+def test_wait_wakes_on_publish_from_other_thread():
+    bus = EventBus()
+
+    async def scenario():
+        sub = bus.subscribe()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, lambda: loop.run_in_executor(None, bus.publish, "x", 1))
+        return await sub.wait(timeout=2)
+
+    assert len(asyncio.run(scenario())) == 1
+
+
+def test_topology_diff():
+    before = {
+        "nodes": [{"id": "a", "type": "router"}, {"id": "b", "type": "client"}],
+        "edges": [{"source": "a", "target": "b"}],
+    }
+    after = {
+        "nodes": [{"id": "a", "type": "router", "x": 1}, {"id": "c"}],
+        "edges": [{"source": "a", "target": "c"}],
+    }
+    diff = topology_diff(before, after)
+    assert diff["nodes_added"] == [{"id": "c"}]
+    assert diff["nodes_removed"] == ["b"]
+    assert diff["nodes_changed"] == [{"id": "a", "type": "router", "x": 1}]
+    assert diff["edges_removed"] == [["a", "b"]]
+    assert not any(topology_diff(after, after).values())
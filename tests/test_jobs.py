@@ -0,0 +1,72 @@
+import threading
+import time
+
+from app.services.jobs import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    SUCCEEDED,
+    JobManager,
+    check_cancelled,
+    report_progress,
+)
+
+
+def wait_for(job, timeout=2):
+    deadline = time.time() + timeout
+    while job.finished_at is None and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_progress_partial_and_result():
+    manager = JobManager(workers=2, limits={})
+
+    def work(items):
+        for i, item in enumerate(items):
+            report_progress((i + 1) / len(items), partial=item * 2)
+        return sum(items)
+
+    job = wait_for(manager.submit("run", work, [1, 2, 3]))
+    assert job.status == SUCCEEDED
+    assert job.result == 6 and job.partial == [2, 4, 6] and job.progress == 1.0
+
+    failing = wait_for(manager.submit("run", lambda: 1 / 0))
+    assert failing.status == FAILED and "division" in failing.error
+    manager.shutdown()
+
+
+def test_per_type_limit_queues_and_cancel():
+    manager = JobManager(workers=4, limits={"topology": 1})
+    release = threading.Event()
+
+    def blocking():
+        while not release.is_set():
+            check_cancelled()
+            time.sleep(0.01)
+        return "ok"
+
+    first = manager.submit("topology", blocking)
+    second = manager.submit("topology", blocking)
+    time.sleep(0.05)
+    assert second.status == QUEUED
+    assert manager.stats()["queued"] == {"topology": 1}
+
+    manager.cancel(second.id)
+    assert second.status == CANCELLED
+    manager.cancel(first.id)
+    assert wait_for(first).status == CANCELLED
+    manager.shutdown()
+
+
+def test_finished_jobs_expire_after_retention():
+    manager = JobManager(workers=1, limits={}, retention=0)
+    job = wait_for(manager.submit("trunk", lambda: None))
+    time.sleep(0.01)
+    assert manager.get(job.id) is None
+    manager.shutdown()
+
+
+def test_helpers_are_noops_outside_a_job():
+    report_progress(0.5, "sin trabajo")
+    check_cancelled()
@@ -0,0 +1,75 @@
+import asyncio
+from collections import deque
+
+import httpx
+import pytest
+
+from benchmarks.load_test import (
+    PROFILES,
+    UvicornThread,
+    evaluate_slo,
+    percentile,
+    run_level,
+)
+
+
+def test_percentile_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 0.5) == 0.05
+    assert percentile(values, 0.99) == 0.099
+    assert percentile([], 0.99) == 0.0
+
+
+def test_evaluate_slo_merges_default_and_endpoint_limits():
+    level = {
+        "endpoints": {
+            "alarms": {"p99_ms": 120.0, "error_rate": 0.0, "rps": 50.0},
+            "topology": {"p99_ms": 600.0, "error_rate": 0.05, "rps": 5.0},
+        }
+    }
+    slo = {
+        "default": {"p99_ms": 500, "error_rate": 0.01},
+        "endpoints": {"topology": {"p99_ms": 750, "min_rps": 10}},
+    }
+    assert evaluate_slo(level, slo) == [
+        "topology: error_rate 0.05 > 0.01",
+        "topology: rps 5.0 < 10",
+    ]
+
+
+@pytest.mark.parametrize("transport", ["asgi", "uvicorn"])
+def test_run_level_reports_every_endpoint(transport):
+    from fastapi import FastAPI, Response
+
+    app = FastAPI()
+
+    @app.get("/")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/api/monitoring/topology/snapshot")
+    def snapshot():
+        return Response(status_code=304)
+
+    profile = {"health": 1, "topology_poll": 1}
+    state = {"routers": [], "jobs": deque()}
+
+    async def drive(client):
+        return await run_level(client, 3, profile, state, duration_s=0.3)
+
+    if transport == "asgi":
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+        level = asyncio.run(drive(client))
+    else:
+        pytest.importorskip("uvicorn")
+        with UvicornThread(app) as server:
+            level = asyncio.run(drive(httpx.AsyncClient(base_url=server.url)))
+
+    assert set(level["endpoints"]) == {"health", "topology_poll"}
+    assert level["endpoints"]["topology_poll"]["statuses"] == {
+        "304": level["endpoints"]["topology_poll"]["count"]
+    }
+    assert level["endpoints"]["health"]["errors"] == 0
+    assert set(PROFILES["mixed"]) >= set(PROFILES["dashboard"])
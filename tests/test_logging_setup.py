@@ -0,0 +1,90 @@
+import json
+import logging
+
+import pytest
+import structlog
+
+from app.services import logging_setup, mikrotik_service
+from app.services.logging_setup import RateLimiter, parse_rate_limits
+from app.services.tracing import start_span
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "monitor360.log"
+    logging_setup.shutdown_logging()  # por si otro test importó app.main
+    logging_setup.configure_logging(log_file=str(path), level="INFO")
+    yield path
+    logging_setup.shutdown_logging()
+    structlog.reset_defaults()
+
+
+def read_events(path):
+    logging_setup.shutdown_logging()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("routeros.auth_failed=3/60, x=1") == {
+        "routeros.auth_failed": (3, 60.0),
+        "x": (1, 1.0),
+    }
+
+
+def test_rate_limiter_reports_suppressed_events():
+    clock = FakeClock()
+    limiter = RateLimiter({"routeros.auth_failed": (2, 60)}, clock=clock)
+    allowed = [limiter.allow("routeros.auth_failed", "10.0.0.1") for _ in range(5)]
+    assert allowed == [(True, 0), (True, 0), (False, 0), (False, 0), (False, 0)]
+    # Otro router tiene su propia ventana; otros eventos no se limitan
+    assert limiter.allow("routeros.auth_failed", "10.0.0.2") == (True, 0)
+    assert limiter.allow("discovery.router", "10.0.0.1") == (True, 0)
+
+    clock.now = 61
+    assert limiter.allow("routeros.auth_failed", "10.0.0.1") == (True, 3)
+
+
+def test_events_are_json_with_trace_context(log_file):
+    log = logging_setup.get_logger("test")
+    with start_span("discovery.run") as run:
+        with start_span("discovery.router", {"router.ip": "10.0.0.1"}):
+            log.info("discovery.router", duration_ms=12.5)
+            logging.getLogger("legacy").warning("mensaje %s", "viejo")
+    log.debug("debajo.del.nivel")
+
+    structured, legacy = read_events(log_file)
+    assert structured["event"] == "discovery.router"
+    assert structured["run_id"] == run.trace_id
+    assert structured["router_ip"] == "10.0.0.1"
+    assert structured["duration_ms"] == 12.5
+    assert structured["level"] == "info" and structured["timestamp"].endswith("Z")
+    assert legacy["event"] == "mensaje viejo"
+    assert legacy["run_id"] == run.trace_id and legacy["level"] == "warning"
+
+
+def test_failed_logins_never_log_passwords(log_file, monkeypatch):
+    class RefusingPool:
+        def __init__(self, **kwargs):
+            raise ConnectionError("invalid user name or password")
+
+    monkeypatch.setattr(mikrotik_service, "RouterOsApiPool", RefusingPool)
+    monkeypatch.setattr(mikrotik_service, "PASSWORDS", ["s3cr3t-1", "s3cr3t-2"])
+    monkeypatch.setattr(mikrotik_service, "load_known_credentials", lambda: {})
+
+    assert mikrotik_service.connect_mikrotik_with_learning("10.9.9.9") is None
+
+    events = read_events(log_file)
+    assert "s3cr3t" not in log_file.read_text()
+    failed = [e for e in events if e["event"] == "routeros.auth_failed"]
+    assert [e["attempt"] for e in failed] == [1, 2]
+    assert all(e["router_ip"] == "10.9.9.9" for e in failed)
+    (summary,) = [e for e in events if e["event"] == "routeros.connect_failed"]
+    assert summary["attempts"] == 2 and "duration_ms" in summary
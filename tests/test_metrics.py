@@ -0,0 +1,81 @@
+import pytest
+
+from app.services.metrics import (
+    ROUTEROS_COMMAND_ERRORS,
+    ROUTEROS_COMMAND_SECONDS,
+    Counter,
+    Gauge,
+    Histogram,
+    InstrumentedApi,
+    Registry,
+)
+
+
+def test_histogram_and_gauge_render_prometheus_text():
+    registry = Registry()
+    hist = registry.register(
+        Histogram("t_seconds", "latencia", ["path"], buckets=(0.1, 1.0))
+    )
+    for value in (0.05, 0.5, 3):
+        hist.observe(value, path="/ip/arp")
+    depth = registry.register(Gauge("t_depth", "cola", ["queue"]))
+    depth.set_function(lambda: 7, queue="alarms")
+    hits = registry.register(Counter("t_hits_total", "hits", ["cache"]))
+    hits.inc(cache='c"1')
+
+    text = registry.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{path="/ip/arp",le="0.1"} 1' in text
+    assert 't_seconds_bucket{path="/ip/arp",le="1"} 2' in text
+    assert 't_seconds_bucket{path="/ip/arp",le="+Inf"} 3' in text
+    assert 't_seconds_count{path="/ip/arp"} 3' in text
+    assert 't_depth{queue="alarms"} 7' in text
+    assert 't_hits_total{cache="c\\"1"} 1' in text
+
+    with pytest.raises(ValueError):
+        hist.observe(1, wrong="x")
+
+
+class FakeResource:
+    def get(self):
+        return [{"address": "10.0.0.2"}]
+
+    def call(self, cmd):
+        raise RuntimeError("timeout")
+
+
+class FakeApi:
+    def get_resource(self, path):
+        return FakeResource()
+
+    def get_binary_resource(self, path):
+        return FakeResource()
+
+
+def test_instrumented_api_times_commands_per_path():
+    api = InstrumentedApi(FakeApi())
+    before = ROUTEROS_COMMAND_SECONDS.count(path="/ip/neighbor", command="get")
+    assert api.get_resource("/ip/neighbor").get() == [{"address": "10.0.0.2"}]
+    assert ROUTEROS_COMMAND_SECONDS.count(path="/ip/neighbor", command="get") == (
+        before + 1
+    )
+
+    errors = ROUTEROS_COMMAND_ERRORS.value(path="/tool/x", command="call")
+    with pytest.raises(RuntimeError):
+        api.get_resource("/tool/x").call("start")
+    assert ROUTEROS_COMMAND_ERRORS.value(path="/tool/x", command="call") == errors + 1
+
+    before = ROUTEROS_COMMAND_SECONDS.count(path="/file", command="get")
+    api.get_binary_resource("/file").get()
+    assert ROUTEROS_COMMAND_SECONDS.count(path="/file", command="get") == before + 1
+
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    r = TestClient(app).get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "# TYPE monitor360_router_connect_seconds histogram" in r.text
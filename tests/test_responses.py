@@ -0,0 +1,162 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils import responses
+from app.utils.responses import CompressionMiddleware, FastJSONResponse, dumps_json
+
+
+def make_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return FastJSONResponse({"nodes": [{"id": f"10.0.0.{i}"} for i in range(200)]})
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            iter([b"x" * 600, b"y" * 600]), media_type="application/x-ndjson"
+        )
+
+    return TestClient(app)
+
+
+def test_large_json_is_gzipped_when_accepted(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    client = make_client()
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert int(r.headers["content-length"]) < len(r.content)
+    assert r.json()["nodes"][199] == {"id": "10.0.0.199"}
+    assert "accept-encoding" in r.headers["vary"].lower()
+
+
+def test_small_streaming_and_identity_are_untouched():
+    client = make_client()
+    assert (
+        "content-encoding"
+        not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    )
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in r.headers
+    assert r.content == b"x" * 600 + b"y" * 600
+    r = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+
+
+def test_choose_encoding_respects_q_zero(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", object())
+    assert responses.choose_encoding("gzip, br") == "br"
+    assert responses.choose_encoding("gzip, br;q=0") == "gzip"
+    assert responses.choose_encoding("identity") == ""
+
+
+def test_dumps_json_handles_non_native_types():
+    import datetime
+
+    data = {"ts": datetime.date(2026, 1, 2), 1: "uno"}
+    assert dumps_json(data) == b'{"ts":"2026-01-02","1":"uno"}'
+
+
+def test_dumps_json_fallback_matches_orjson_dates(monkeypatch):
+    import datetime
+
+    import numpy as np
+
+    data = {
+        "at": datetime.datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2026, 1, 2),
+        "n": np.int64(3),
+    }
+    fast = dumps_json(data)
+    monkeypatch.setattr(responses, "orjson", None)
+    assert dumps_json(data) == fast
+    assert b'"at":"2026-01-02T03:04:05.000006+00:00"' in fast
+
+
+def test_versioned_response_etag_and_304():
+    from fastapi import Request
+
+    from app.utils.responses import versioned_response
+
+    app = FastAPI()
+    payload = {"nodes": [{"id": "10.0.0.1"}], "edges": []}
+
+    @app.get("/topo")
+    def topo(request: Request):
+        return versioned_response(request, payload)
+
+    client = TestClient(app)
+    first = client.get("/topo")
+    etag = first.headers["etag"]
+    assert first.json()["version"] == etag.strip('"')
+    assert first.json()["nodes"] == payload["nodes"]
+
+    assert client.get("/topo", headers={"If-None-Match": etag}).status_code == 304
+    payload["edges"].append({"source": "10.0.0.1", "target": "10.0.0.2"})
+    changed = client.get("/topo", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_compressed_versioned_response_gets_weak_etag():
+    from fastapi import Request
+
+    from app.utils.responses import versioned_response
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    payload = {"nodes": [{"id": f"10.0.0.{i}"} for i in range(50)]}
+
+    @app.get("/topo")
+    def topo(request: Request):
+        return versioned_response(request, payload)
+
+    client = TestClient(app)
+    plain = client.get("/topo", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/topo", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert not plain.headers["etag"].startswith("W/")
+    assert gzipped.headers["etag"] == "W/" + plain.headers["etag"]
+    # La versión débil sigue sirviendo para revalidar
+    again = client.get(
+        "/topo",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+    )
+    assert again.status_code == 304
+
+
+def test_trunk_post_is_plain_and_snapshot_is_versioned(monkeypatch):
+    from app.routers.monitoring import router
+    from app.services import trunk_service
+
+    monkeypatch.setattr(trunk_service, "_last_trunk", None)
+    monkeypatch.setattr(
+        trunk_service, "connect_mikrotik_with_learning", lambda ip: None
+    )
+    app = FastAPI()
+    app.include_router(router, prefix="/api/monitoring")
+    client = TestClient(app)
+
+    assert client.get("/api/monitoring/trunk/snapshot").status_code == 404
+    # El POST siempre ejecuta y responde 200 sin ETag ni `version`
+    posted = client.post(
+        "/api/monitoring/trunk",
+        json={"ip_list": ["10.0.0.1"]},
+        headers={"If-None-Match": "*"},
+    )
+    assert posted.status_code == 200 and "etag" not in posted.headers
+    assert "version" not in posted.json()
+
+    snapshot = client.get("/api/monitoring/trunk/snapshot")
+    assert snapshot.json()["nodes"] == posted.json()["nodes"]
+    etag = snapshot.headers["etag"]
+    again = client.get(
+        "/api/monitoring/trunk/snapshot", headers={"If-None-Match": etag}
+    )
+    assert again.status_code == 304
@@ -0,0 +1,124 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import (
+    discovery_service,
+    mikrotik_service,
+    monitoring_service,
+    trunk_service,
+)
+from benchmarks.routeros_emulator import RouterBehavior, RouterOsEmulator
+from benchmarks.synthetic import SyntheticNetwork
+
+
+@pytest.fixture
+def network():
+    return SyntheticNetwork(60, routers=3, router_prefix="127.255")
+
+
+@pytest.fixture
+def routeros(monkeypatch, tmp_path, network):
+    """Emulador con los 3 routers; el último tiene otra contraseña."""
+    behaviors = {network.routers[2]: RouterBehavior(password="otra")}
+    emulator = RouterOsEmulator.from_network(network, behaviors)
+    with emulator:
+        monkeypatch.setattr(mikrotik_service, "PORT", emulator.port)
+        monkeypatch.setattr(mikrotik_service, "TIMEOUT", 1)
+        monkeypatch.setattr(mikrotik_service, "PASSWORDS", ["mala", "admin"])
+        monkeypatch.setattr(
+            mikrotik_service, "CREDENTIALS_FILE", str(tmp_path / "creds.json")
+        )
+        yield emulator
+
+
+def test_connect_learns_password_and_reads_tables(routeros, network, capsys):
+    ip = network.routers[0]
+    api = mikrotik_service.connect_mikrotik_with_learning(ip)
+    assert api is not None
+    eth = api.get_resource("/interface/ethernet").get()
+    assert [e["name"] for e in eth] == ["ether1", "ether2", "ether3", "ether4"]
+    assert api.get_resource("/ip/arp").get(address="192.0.2.1") == []
+    stats = routeros.routers[ip].stats
+    assert (stats.login_failures, stats.logins) == (1, 1)
+    # El log del intento fallido no incluye la contraseña probada
+    out = capsys.readouterr().out
+    assert "invalid user name or password" in out and "mala" not in out
+
+    # La segunda vez prueba primero la contraseña aprendida
+    assert mikrotik_service.connect_mikrotik_with_learning(ip) is not None
+    assert stats.login_failures == 1
+    assert mikrotik_service.connect_mikrotik_with_learning(network.routers[2]) is None
+
+
+def test_ping_and_unknown_command(routeros, network):
+    api = mikrotik_service.connect_mikrotik_with_learning(network.routers[0])
+    replies = api.get_binary_resource("/").call(
+        "ping", {"address": b"10.0.0.2", "count": b"3"}
+    )
+    assert [r["received"] for r in replies] == [b"1", b"2", b"3"]
+    with pytest.raises(Exception, match="no such command"):
+        api.get_resource("/system/nada").get()
+
+
+def test_discovery_over_emulated_routers(routeros, network, monkeypatch):
+    monkeypatch.setattr(discovery_service, "resolve_alarm", lambda *a: None)
+    monkeypatch.setattr(discovery_service, "raise_alarm", lambda *a, **k: None)
+    uisp = Future()
+    uisp.set_result(network.uisp_devices())
+
+    topo = discovery_service.discover_topology(network.routers, uisp)
+    routers = {n["id"]: n["status"] for n in topo["nodes"] if n["type"] == "router"}
+    # El tercero rechaza el login
+    assert routers == {
+        network.routers[0]: True,
+        network.routers[1]: True,
+        network.routers[2]: False,
+    }
+    clients = [n for n in topo["nodes"] if n["type"] == "client"]
+    assert len(clients) == 40
+
+
+def test_trunk_topology(routeros, network):
+    trunk = trunk_service.get_trunk_topology(network.routers[:2])
+    assert {(e["source"], e["target"]) for e in trunk["edges"]} == {
+        (network.routers[0], network.routers[1]),
+        (network.routers[1], network.routers[0]),
+    }
+
+
+def test_capacity_test_uses_traffic_generator(routeros, network, monkeypatch):
+    monkeypatch.setattr(
+        monitoring_service, "time", SimpleNamespace(sleep=lambda s: None)
+    )
+    cap = monitoring_service._run_capacity_test(network.routers[0], "10.0.0.2")
+    assert cap == {"tx_rate": 9.4, "loss": 0.5}
+
+
+def test_slow_and_dropped_connections(monkeypatch, tmp_path, network):
+    slow, dropping, hung = network.routers
+    behaviors = {
+        slow: RouterBehavior(latency_ms=50),
+        dropping: RouterBehavior(drop_after=1),
+        hung: RouterBehavior(hang=True),
+    }
+    with RouterOsEmulator.from_network(network, behaviors) as emulator:
+        monkeypatch.setattr(mikrotik_service, "PORT", emulator.port)
+        monkeypatch.setattr(mikrotik_service, "TIMEOUT", 0.2)
+        monkeypatch.setattr(mikrotik_service, "PASSWORDS", ["admin"])
+        monkeypatch.setattr(
+            mikrotik_service, "CREDENTIALS_FILE", str(tmp_path / "creds.json")
+        )
+
+        api = mikrotik_service.connect_mikrotik_with_learning(slow)
+        assert len(api.get_resource("/queue/simple").get()) == 20
+
+        api = mikrotik_service.connect_mikrotik_with_learning(dropping)
+        api.get_resource("/interface").get()
+        with pytest.raises(Exception):
+            api.get_resource("/interface").get()
+        assert emulator.routers[dropping].stats.dropped == 1
+
+        # Timeout del socket: acepta la conexión pero no contesta el login
+        assert mikrotik_service.connect_mikrotik_with_learning(hung) is None
@@ -0,0 +1,29 @@
+import os
+
+from app.services import lifecycle
+from benchmarks.bench_startup import import_app
+
+# Margen amplio: hoy ronda 0.3 s; antes de diferir pandas/Supabase, ~0.9 s
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3"))
+
+
+def test_app_imports_without_heavy_modules_or_supabase_credentials():
+    seconds, heavy = import_app()
+    assert heavy == []
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_warm_up_continues_after_a_failing_step(monkeypatch):
+    calls = []
+
+    def failing():
+        raise RuntimeError("sin credenciales")
+
+    monkeypatch.setattr(
+        lifecycle,
+        "WARMUP_STEPS",
+        [("supabase", failing), ("clients_csv", lambda: calls.append("csv"))],
+    )
+    timings = lifecycle.warm_up()
+    assert calls == ["csv"]
+    assert list(timings) == ["clients_csv"]
@@ -0,0 +1,116 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import alarms_service
+from app.services.alarm_writer import AlarmWriter
+from app.services.metrics import STORAGE_WRITE_ROWS, render
+from app.services.storage import SqliteStorage, Storage, set_storage
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = SqliteStorage(str(tmp_path / "monitor360.db"))
+    set_storage(db)
+    yield db
+    db.close()
+
+
+def _alarms():
+    return [
+        {
+            "id": i,
+            "client_id": i % 3,
+            "severity": ("critical", "warning", "info")[i % 3],
+            "message": f"alarma {i}",
+            # Pares con el mismo instante y formatos distintos (Z, offset, µs)
+            "timestamp": (
+                f"2026-01-01T00:{i // 2:02d}:00Z"
+                if i % 2
+                else f"2026-01-01T01:{i // 2:02d}:00.000000+01:00"
+            ),
+        }
+        for i in range(1, 26)
+    ]
+
+
+def test_sqlite_keyset_pages_filters_and_counts(db):
+    db.insert_alarms(_alarms())
+    seen, cursor = [], None
+    while True:
+        page = alarms_service.query_alarms(limit=4, cursor=cursor)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(range(1, 26), key=lambda i: (i // 2, i), reverse=True)
+
+    since = datetime(2026, 1, 1, 0, 5, tzinfo=timezone.utc)
+    assert alarms_service.count_alarms(severity=["warning"]) == 9
+    assert alarms_service.count_alarms(since=since) == 16
+    page = alarms_service.query_alarms(client_id=0, fields=["id", "client_id"])
+    assert {item["client_id"] for item in page["items"]} == {0}
+    assert (
+        alarms_service.get_alarm(7)["timestamp"] == "2026-01-01T00:03:00.000000+00:00"
+    )
+    assert alarms_service.get_alarm(99) is None
+
+
+def test_sqlite_topology_upsert_merges_by_node(db):
+    db.upsert_topology(
+        [
+            {"ip": "10.0.0.1", "tipo": "router", "nombre": "r1", "last_seen": "t1"},
+            {"ip": "10.0.0.1", "tipo": "switch", "puerto": "ether2", "nombre": "e2"},
+            {"ip": "10.1.0.1", "tipo": "ap", "nombre": "AP", "last_seen": "t1"},
+            {"ip": "10.1.0.1", "tipo": "ap", "nombre": "AP", "last_seen": "t2"},
+        ]
+    )
+    # Solo actualiza las columnas presentes en la fila
+    db.upsert_topology([{"ip": "10.0.0.1", "tipo": "router", "last_seen": "t3"}])
+    with sqlite3.connect(db.path) as conn:
+        rows = conn.execute(
+            "SELECT ip, tipo, puerto, nombre, last_seen FROM topologia ORDER BY 1, 2"
+        ).fetchall()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM alarmas WHERE severity = 'info' "
+            "ORDER BY timestamp DESC, id DESC LIMIT 10"
+        ).fetchall()
+    assert rows == [
+        ("10.0.0.1", "router", "", "r1", "t3"),
+        ("10.0.0.1", "switch", "ether2", "e2", None),
+        ("10.1.0.1", "ap", "", "AP", "t2"),
+    ]
+    assert "alarmas_severity" in str(plan) and "TEMP B-TREE" not in str(plan)
+
+
+def test_alarm_writer_inserts_into_global_storage(db, tmp_path):
+    writer = AlarmWriter(flush_ms=10, spool_path=str(tmp_path / "spool.jsonl"))
+    for i in range(3):
+        writer.submit(
+            {
+                "client_id": i,
+                "severity": "info",
+                "message": f"m{i}",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+    writer.close()
+    assert writer.stats["written"] == 3
+    assert alarms_service.count_alarms() == 3
+
+
+def test_storage_interface_is_abstract_and_writes_are_labelled(db):
+    class Partial(Storage):
+        def upsert_topology(self, rows):
+            return 0
+
+    with pytest.raises(TypeError, match="insert_alarms"):
+        Partial()
+
+    before = STORAGE_WRITE_ROWS.value(backend="sqlite", table="alarmas", op="insert")
+    db.insert_alarms(_alarms()[:2])
+    after = STORAGE_WRITE_ROWS.value(backend="sqlite", table="alarmas", op="insert")
+    assert after == before + 2
+    assert "monitor360_supabase_write" not in render()
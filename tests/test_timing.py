@@ -0,0 +1,69 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.timing import (
+    SamplingProfiler,
+    ServerTimingMiddleware,
+    get_profile,
+    record,
+    span,
+)
+
+
+def slow_stage():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/topology")
+    def topology():
+        with span("load_clients_csv"):
+            slow_stage()
+        with span("supabase_upsert"):
+            pass
+        with span("supabase_upsert"):
+            pass
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_server_timing_header_lists_stages():
+    r = make_client().get("/topology")
+    header = r.headers["server-timing"]
+    assert "load_clients_csv;dur=" in header
+    assert "supabase_upsert;dur=" in header and 'desc="x2"' in header
+    assert header.split(", ")[-1].startswith("total;dur=")
+    assert "x-profile" not in r.headers
+
+
+def test_profile_query_param_stores_folded_stacks():
+    client = make_client()
+    r = client.get("/topology?profile=1")
+    path = r.headers["x-profile"]
+    folded = get_profile(path.rsplit("/", 1)[1])
+    assert folded is not None
+    assert any("slow_stage" in line for line in folded.splitlines())
+
+
+def test_spans_are_noops_outside_requests():
+    with span("sin_request"):
+        pass
+    record("sin_request", 1.0)
+
+
+def test_sampling_profiler_folded_format():
+    import threading
+
+    profiler = SamplingProfiler({threading.get_ident()}, interval_ms=1).start()
+    slow_stage()
+    folded = profiler.stop()
+    stack, count = folded.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and "slow_stage" in folded
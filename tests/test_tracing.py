@@ -0,0 +1,83 @@
+import pytest
+
+from app.services import metrics
+from app.services.tracing import (
+    Span,
+    child_span,
+    critical_path,
+    current_trace_id,
+    start_span,
+    use_span,
+)
+
+
+def by_name(spans, name):
+    return [s for s in spans if s["name"] == name]
+
+
+def test_child_span_is_noop_outside_a_trace(span_exporter):
+    with child_span("uisp.get") as span:
+        assert span is None
+    with metrics.observe_write("topologia", "upsert"):
+        pass
+    assert span_exporter.spans == []
+
+
+def test_nested_spans_share_trace_and_link_parents(span_exporter):
+    with start_span("discovery.run") as run:
+        trace_id = current_trace_id()
+        with start_span("discovery.router", {"router.ip": "10.0.0.1"}):
+            with metrics.observe_write("topologia", "upsert", rows=3):
+                pass
+    assert current_trace_id() is None
+
+    (root,) = by_name(span_exporter.spans, "discovery.run")
+    (router,) = by_name(span_exporter.spans, "discovery.router")
+    (write,) = by_name(span_exporter.spans, "db.upsert")
+    assert {s["traceId"] for s in span_exporter.spans} == {trace_id}
+    assert root["spanId"] == run.span_id and root["parentSpanId"] == ""
+    assert router["parentSpanId"] == root["spanId"]
+    assert write["parentSpanId"] == router["spanId"]
+    assert {"key": "db.rows", "value": {"intValue": "3"}} in write["attributes"]
+
+
+def test_exceptions_mark_span_as_error(span_exporter):
+    with pytest.raises(RuntimeError):
+        with start_span("monitoring.run"):
+            raise RuntimeError("router caído")
+    (span,) = span_exporter.spans
+    assert span["status"]["code"] == "STATUS_CODE_ERROR"
+    assert span["events"][0]["name"] == "exception"
+
+
+def test_explicit_span_survives_generator_yields(span_exporter):
+    def generator():
+        run = Span.start("discovery.run")
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            with use_span(run), start_span("discovery.router", {"router.ip": ip}):
+                pass
+            yield ip
+        run.end()
+
+    assert list(generator()) == ["10.0.0.1", "10.0.0.2"]
+    (run,) = by_name(span_exporter.spans, "discovery.run")
+    routers = by_name(span_exporter.spans, "discovery.router")
+    assert [r["parentSpanId"] for r in routers] == [run["spanId"]] * 2
+
+
+def test_critical_path_follows_latest_finishing_child():
+    def span(span_id, parent, start, end):
+        return {
+            "spanId": span_id,
+            "parentSpanId": parent,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(end),
+        }
+
+    spans = [
+        span("run", "", 0, 100),
+        span("fast", "run", 0, 30),
+        span("slow", "run", 10, 95),
+        span("cmd", "slow", 20, 90),
+    ]
+    assert [s["spanId"] for s in critical_path(spans)] == ["run", "slow", "cmd"]
@@ -0,0 +1,66 @@
+import json
+
+from app.services.uisp_service import UispDevice, parse_uisp_device_stream
+
+RAW = [
+    {
+        "id": "a1",
+        "ipAddress": "192.168.1.10",
+        "mac": "AA:BB:CC:DD:EE:FF",
+        "parentId": None,
+        "rssi": -61,
+        "identification": {
+            "id": "a1",
+            "name": "Señal Año",
+            "mac": "AA:BB:CC:DD:EE:FF",
+            "hostname": "dev1",
+            "model": "LBE",
+        },
+        "overview": {"cpu": 12, "nested": [1, 2, {"x": "y"}]},
+    },
+    {
+        "id": "b2",
+        "ipAddress": "192.168.1.20",
+        "parentId": "a1",
+        "identification": {"id": "b2", "name": "ClienteDos"},
+    },
+]
+
+
+def chunked(payload: bytes, size: int):
+    return (payload[i : i + size] for i in range(0, len(payload), size))
+
+
+def test_stream_parse_matches_full_parse_any_chunk_size():
+    payload = json.dumps(RAW, ensure_ascii=False).encode("utf-8")
+    expected = [UispDevice.from_dict(d) for d in RAW]
+    for size in (1, 3, 7, 64, len(payload)):
+        assert list(parse_uisp_device_stream(chunked(payload, size))) == expected
+
+
+def test_stream_parse_wrapped_data_and_empty():
+    payload = json.dumps({"data": RAW}).encode()
+    assert [d.id for d in parse_uisp_device_stream(chunked(payload, 5))] == [
+        "a1",
+        "b2",
+    ]
+    assert list(parse_uisp_device_stream([b" [ ] "])) == []
+
+
+def test_record_dict_compatible_access():
+    dev = UispDevice.from_dict(RAW[1])
+    assert dev["id"] == "b2"
+    assert dev.get("ipAddress") == "192.168.1.20"
+    assert dev["parentId"] == "a1"
+    assert dev.get("identification", {}).get("name") == "ClienteDos"
+    assert dev.get("mac") is None
+    assert dev.get("overview", {}) == {}
+    assert "hostname" not in dev.to_dict()["identification"]
+
+
+def test_device_without_name_falls_back_like_raw_dict():
+    raw = {"id": "c3", "ipAddress": "10.0.0.9", "identification": {"id": "c3"}}
+    dev = UispDevice.from_dict(raw)
+    for d in (raw, dev):
+        assert d.get("identification", {}).get("name", "10.0.0.9") == "10.0.0.9"
+    assert dev.identification == {"id": "c3"}
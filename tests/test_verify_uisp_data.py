@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import app.services.verify_uisp_data as verify_mod
+from app.services.uisp_service import UispDevice
+
+HEADER = '"Id","Nombre","Ip","Mac"\n'
+ROWS = '"1","Ana","10.0.0.1",""\n' '"2","Beto","10.0.0.2",""\n' '"3","Caro","",""\n'
+
+
+@pytest.fixture
+def devices(monkeypatch):
+    current = []
+    monkeypatch.setattr(verify_mod, "get_uisp_device_records", lambda: current)
+    return current
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_streaming_verify_and_diff(tmp_path, devices):
+    csv_path = tmp_path / "clientes.csv"
+    csv_path.write_text(HEADER + ROWS, encoding="utf-8")
+    out = tmp_path / "reports"
+
+    devices[:] = [
+        UispDevice(id="a", ip_address="10.0.0.1", ident_id="a"),
+        UispDevice(id="b", ip_address="10.0.0.2", ident_id="b"),
+    ]
+    resumen = verify_mod.verify(str(csv_path), str(out), chunk_size=2)
+    assert (resumen["matched"], resumen["unmatched"], resumen["chunks"]) == (2, 1, 2)
+    assert resumen["diff"] is None
+    assert [c["cliente_id"] for c in read_json(out / "clientes_sin_match.json")] == [
+        "3"
+    ]
+
+    devices[:] = [
+        UispDevice(id="z", ip_address="10.0.0.1", ident_id="z"),
+        UispDevice(id="c", ip_address="9.9.9.9", ident_id="c", name="caro"),
+    ]
+    resumen = verify_mod.verify(str(csv_path), str(out), chunk_size=2)
+    cambios = {
+        c["cliente_id"]: c["cambio"]
+        for c in read_json(out / "diff_uisp_vs_clients.json")
+    }
+    assert cambios == {
+        "1": "cambio_dispositivo",
+        "2": "nuevo_sin_match",
+        "3": "nuevo_match",
+    }
+    assert resumen["diff"]["cambio_dispositivo"] == 1
+
+
+def test_verify_empty_csv(tmp_path, devices):
+    csv_path = tmp_path / "clientes.csv"
+    csv_path.write_text(HEADER, encoding="utf-8")
+    resumen = verify_mod.verify(str(csv_path), str(tmp_path / "out"))
+    assert resumen["total_clients"] == 0
+    assert read_json(tmp_path / "out" / "clientes_sin_match.json") == []
@@ -0,0 +1,177 @@
+import os
+import threading
+
+import pytest
+
+from app.services import write_spool
+from app.services.metrics import SPOOL_BYTES, SPOOL_LAG_SECONDS, SPOOL_RECORDS
+from app.services.storage import Storage
+from app.services.write_spool import SpooledStorage, SpoolFull, SpoolLocked, WriteSpool
+
+
+class RejectedRow(Exception):
+    """Error permanente del destino (p. ej. columna inexistente)."""
+
+    code = "PGRST204"
+
+
+class FlakyStorage(Storage):
+    """Destino que falla mientras `down` y deduplica alarmas por clave."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.down = threading.Event()
+        self.calls = 0
+        self.fail_after_first_group = False
+        self.reject = False
+        self.topology = {}
+        self.alarms = {}
+
+    def _check(self):
+        self.calls += 1
+        if self.down.is_set():
+            raise ConnectionError("supabase caído")
+
+    def upsert_topology(self, rows):
+        self._check()
+        for row in rows:
+            self.topology[(row["ip"], row["tipo"])] = row
+        return len(rows)
+
+    def insert_alarms(self, rows):
+        self._check()
+        if self.reject:
+            raise RejectedRow("Could not find the 'idempotency_key' column")
+        for row in rows:
+            self.alarms.setdefault(row["idempotency_key"], row)
+        if self.fail_after_first_group:
+            # Escribió pero la respuesta se perdió: el shipper reintenta
+            self.fail_after_first_group = False
+            raise TimeoutError("timeout leyendo la respuesta")
+        return len(rows)
+
+    def query_alarms(self, columns, limit, **filters):
+        return list(self.alarms.values())[:limit]
+
+    def get_alarm(self, alarm_id, columns):
+        return None
+
+    def count_alarms(self, **filters):
+        return len(self.alarms)
+
+
+def _alarm(i):
+    return {"severity": "info", "message": f"m{i}", "timestamp": "2026-01-01T00:00Z"}
+
+
+def test_spool_skips_corrupt_and_torn_records_and_resumes(tmp_path):
+    spool = WriteSpool(str(tmp_path), segment_bytes=200, fsync=False)
+    for i in range(6):
+        spool.append({"key": str(i), "table": "t", "op": "o", "ts": 0, "rows": [i]})
+    spool.close()
+    segments = sorted(p for p in os.listdir(tmp_path) if p.startswith("seg-"))
+    assert len(segments) > 1
+
+    # Un byte alterado en el primer segmento y una línea cortada al final
+    first = tmp_path / segments[0]
+    data = bytearray(first.read_bytes())
+    data[12] ^= 0xFF
+    first.write_bytes(bytes(data))
+    with open(tmp_path / segments[-1], "ab") as f:
+        f.write(b'0000 {"cort')
+
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    entries, position = spool.read(max_rows=3)
+    assert [r["key"] for r, _ in entries] == ["1", "2", "3"]
+    spool.commit(position)
+    spool.close()
+
+    # Tras reiniciar sigue desde el checkpoint y borra lo ya enviado
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    entries, position = spool.read(max_rows=100)
+    assert [r["key"] for r, _ in entries] == ["4", "5"]
+    spool.commit(position)
+    assert spool.size() == 0
+    assert not [p for p in os.listdir(tmp_path) if p.startswith("seg-")]
+    with pytest.raises(SpoolLocked, match="en uso"):
+        WriteSpool(str(tmp_path))
+    spool.close()
+
+
+def test_spool_slots_per_process_and_size_cap(tmp_path):
+    first = WriteSpool.for_process(str(tmp_path), fsync=False, max_bytes=200)
+    # Otro worker (otro lock) toma el slot siguiente en vez de fallar
+    second = WriteSpool.for_process(str(tmp_path), fsync=False)
+    assert first.directory.endswith("worker-0")
+    assert second.directory.endswith("worker-1")
+    second.close()
+
+    record = {"key": "k", "table": "t", "op": "o", "ts": 0, "rows": ["x" * 60]}
+    first.append(record)
+    with pytest.raises(SpoolFull):
+        for _ in range(3):
+            first.append(record)
+    # Al enviar lo pendiente vuelve a aceptar escrituras
+    _, position = first.read(max_rows=100)
+    first.commit(position)
+    first.append(record)
+    first.close()
+
+
+def test_writes_survive_outage_and_replay_without_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_spool, "ALARM_IDEMPOTENCY_COLUMN", "idempotency_key")
+    inner = FlakyStorage()
+    inner.down.set()
+    storage = SpooledStorage(
+        inner, WriteSpool(str(tmp_path)), batch_rows=2, retry_seconds=0.01
+    )
+    # No bloquea aunque el destino esté caído
+    storage.upsert_topology([{"ip": "10.0.0.1", "tipo": "router"}])
+    storage.insert_alarms([_alarm(i) for i in range(3)])
+    assert not storage.flush(timeout=0.2)
+    assert inner.calls > 1  # reintentos
+    directory = str(tmp_path)
+    assert SPOOL_BYTES.value(spool=directory) > 0
+    assert SPOOL_LAG_SECONDS.value(spool=directory) > 0
+    storage.close(timeout=0.1)
+
+    # Otro proceso retoma el spool; el primer envío de alarmas "falla"
+    # después de escribir y se reenvía con las mismas claves
+    inner.down.clear()
+    inner.fail_after_first_group = True
+    storage = SpooledStorage(inner, WriteSpool(directory), retry_seconds=0.01)
+    assert storage.flush(timeout=5)
+    assert list(inner.topology) == [("10.0.0.1", "router")]
+    assert sorted(a["message"] for a in inner.alarms.values()) == ["m0", "m1", "m2"]
+    assert SPOOL_BYTES.value(spool=directory) == 0
+    assert SPOOL_LAG_SECONDS.value(spool=directory) == 0
+    storage.close()
+
+
+def test_rejected_record_goes_to_dead_letter_without_blocking(tmp_path):
+    inner = FlakyStorage()
+    inner.reject = True
+    storage = SpooledStorage(
+        inner, WriteSpool(str(tmp_path)), retry_seconds=0.01, max_attempts=3
+    )
+    storage.insert_alarms([_alarm(0)])
+    storage.upsert_topology([{"ip": "10.0.0.1", "tipo": "router"}])
+    # La topología detrás de la alarma rechazada llega igual
+    assert storage.flush(timeout=5)
+    assert list(inner.topology) == [("10.0.0.1", "router")]
+    assert SPOOL_RECORDS.value(spool=str(tmp_path), result="dead_letter") == 1
+    dead = (tmp_path / "dead-letter.log").read_bytes().splitlines()
+    assert len(dead) == 1 and b'"m0"' in dead[0]
+    storage.close()
+
+
+def test_lock_errors_other_than_busy_are_not_reported_as_locked(tmp_path, monkeypatch):
+    import fcntl
+
+    def denied(fd, op):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(fcntl, "flock", denied)
+    with pytest.raises(PermissionError):
+        WriteSpool.for_process(str(tmp_path))